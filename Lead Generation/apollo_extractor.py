@@ -0,0 +1,439 @@
+import asyncio
+import contextvars
+import json
+import os
+import re
+from langchain_core.tools import StructuredTool
+from lead_index import normalize_linkedin
+from lead_utils import lead_value, normalize_domain
+from snapshot_compression import parse_snapshot
+
+# Result pages one extract_apollo_leads call may walk through (Apollo shows 25 people per page)
+APOLLO_EXTRACT_MAX_PAGES = int(os.getenv("APOLLO_EXTRACT_MAX_PAGES", "40"))
+# Click "Access email" for people whose address is still hidden. Every reveal spends an Apollo credit, so this
+# is off by default and, when on, capped at `max_leads` reveals per extract_apollo_leads call
+APOLLO_REVEAL_EMAILS = os.getenv("APOLLO_REVEAL_EMAILS", "false").lower() in ("1", "true", "yes")
+# How long to wait for the next page of results to render after clicking "Next page"
+APOLLO_PAGE_WAIT_SECONDS = float(os.getenv("APOLLO_PAGE_WAIT_SECONDS", "10"))
+
+EXTRACT_TOOL_NAME = "extract_apollo_leads"
+
+# Set by the pipelined runner to an async callable that receives each lead the moment it is extracted
+lead_listener = contextvars.ContextVar("apollo_lead_listener", default=None)
+# Keys of the people extract_apollo_leads offered in the current run; run_agent sets a fresh set per run
+offered_people = contextvars.ContextVar("apollo_offered_people", default=None)
+
+_EMAIL = re.compile(r"[\w.+'-]+@[\w-]+(?:\.[\w-]+)+")
+_RANGE = re.compile(r"(\d[\d,]*)\s*-\s*(\d[\d,]*)\s+of\s+(\d[\d,]*)")
+_PAGE = re.compile(r"Page (\d+) of (\d+)")
+_REF = re.compile(r"\[ref=([^\]]+)\]")
+_YAML_BLOCK = re.compile(r"```yaml\n(.*?)\n?```", re.DOTALL)
+_EVALUATE_RESULT = re.compile(r"### Result\s*\n")
+
+# Apollo's placeholder for an email that has not been unlocked yet
+_LOCKED_EMAIL_DOMAIN = "domain.com"
+
+# Column header keywords -> the lead field read from that column
+_COLUMNS = [
+    ("name", "name"),
+    ("title", "designation"),
+    ("company", "company name"),
+    ("email", "email"),
+    ("phone", "mobile number"),
+    ("employees", "employee count"),
+    ("industry", "company type"),
+]
+
+# Runs in the page: keeps the latest People search response the app receives, so later pages can be read as JSON
+_CAPTURE_JS = (
+    "() => { if (!window.__leadgenApolloHook) { window.__leadgenApolloHook = true; window.__leadgenApolloPeople = null;"
+    " const keep = (url, body) => { if (!/people\\/search/.test(url)) return;"
+    " try { const data = JSON.parse(body); if (data && data.people) window.__leadgenApolloPeople = data; } catch (e) {} };"
+    " const fetch = window.fetch; window.fetch = async (...args) => { const response = await fetch(...args);"
+    " try { const url = (args[0] && args[0].url) || String(args[0]);"
+    " if (/people\\/search/.test(url)) response.clone().text().then(body => keep(url, body)); } catch (e) {}"
+    " return response; };"
+    " const open = XMLHttpRequest.prototype.open; XMLHttpRequest.prototype.open = function (method, url, ...rest) {"
+    " this.addEventListener('load', () => keep(String(url), this.responseText)); return open.call(this, method, url, ...rest); }; }"
+    " return 'installed'; }"
+)
+# Reads the captured response back, reduced to the fields a lead needs
+_READ_JS = (
+    "() => { const data = window.__leadgenApolloPeople; if (!data) return null;"
+    " return {pagination: data.pagination, people: (data.people || []).map(p => ({name: p.name, first_name: p.first_name,"
+    " last_name: p.last_name, title: p.title, linkedin_url: p.linkedin_url, email: p.email, email_status: p.email_status,"
+    " phone_numbers: p.phone_numbers, organization: p.organization && {name: p.organization.name,"
+    " website_url: p.organization.website_url, primary_domain: p.organization.primary_domain,"
+    " estimated_num_employees: p.organization.estimated_num_employees, industry: p.organization.industry}}))}; }"
+)
+
+
+def _ref(node) -> str:
+    match = _REF.search("".join(node.attrs))
+    return match.group(1) if match else None
+
+
+def _walk(node):
+    """The node and everything under it, in document order."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+def _texts(node) -> list:
+    """Visible names and texts in a subtree, without link targets."""
+    texts = []
+    for item in _walk(node):
+        if item.role == "/url":
+            continue
+        for text in (item.name, item.value, item.raw):
+            if text and text not in texts:
+                texts.append(text)
+    return texts
+
+
+def _links(node) -> list:
+    """(link name, target) pairs in a subtree."""
+    links = []
+    for item in _walk(node):
+        if item.role == "link":
+            target = next((child.value for child in item.children if child.role == "/url"), "") or ""
+            links.append((item.name or "", target.strip('"')))
+    return links
+
+
+def _website(links: list) -> str:
+    for name, url in links:
+        if name.lower() == "website" and url:
+            return url
+    for name, url in links:
+        host = normalize_domain(url) if url.startswith("http") else ""
+        if host and not any(site in host for site in ("apollo.io", "linkedin.com", "facebook.com", "twitter.com", "x.com")):
+            return url
+    return ""
+
+
+def _read_cell(field: str, cell, lead: dict, row: dict):
+    texts = _texts(cell)
+    links = _links(cell)
+    if field == "name":
+        person = next((name for name, url in links if "#/people/" in url), "")
+        lead["name"] = cell.name or person or (texts[0] if texts else "")
+        lead["linkedIn link"] = next((url for _, url in links if "linkedin.com/in/" in url), "")
+    elif field == "company name":
+        organization = next((name for name, url in links if "#/organizations/" in url), "")
+        lead["company name"] = cell.name or organization or (texts[0] if texts else "")
+        lead["company website link"] = _website(links)
+    elif field == "email":
+        lead["email"] = next((match.group(0) for text in texts for match in [_EMAIL.search(text)] if match), "")
+        reveal = next((item for item in _walk(cell) if item.role == "button" and "email" in (item.name or "").lower()), None)
+        if not lead["email"] and reveal is not None:
+            row["reveal_ref"] = _ref(reveal)
+    elif field == "mobile number":
+        phone = next((text for text in texts if sum(ch.isdigit() for ch in text) >= 7 and "@" not in text), "")
+        lead["mobile number"] = phone
+    else:
+        lead[field] = cell.name or (texts[0] if texts else "")
+
+
+def _person_key(lead: dict) -> str:
+    """Identity of a person row before their email is known."""
+    linkedin = normalize_linkedin(lead_value(lead, "linkedIn link"))
+    if linkedin:
+        return f"linkedin:{linkedin}"
+    company = normalize_domain(lead_value(lead, "company website link")) or lead_value(lead, "company name").lower()
+    return f"person:{lead_value(lead, 'name').lower()}|{company}"
+
+
+def parse_people_snapshot(text: str) -> dict:
+    """
+    Reads the People results table out of a Playwright snapshot.
+
+    Returns {"rows": [{"key", "lead", "reveal_ref"}], "page", "pages",
+    "total", "next_ref"}; "rows" is empty when the page has no results table.
+    Lead fields use the workflow's names (name, designation, email, ...).
+    """
+    match = _YAML_BLOCK.search(text)
+    roots = parse_snapshot(match.group(1) if match else text)
+    page = {"rows": [], "page": None, "pages": None, "total": None, "next_ref": None}
+
+    for node in (item for root in roots for item in _walk(root)):
+        for value in (node.value, node.name, node.raw):
+            if not value:
+                continue
+            if page["total"] is None and (found := _RANGE.search(value)):
+                page["total"] = int(found.group(3).replace(",", ""))
+            if page["page"] is None and (found := _PAGE.search(value)):
+                page["page"], page["pages"] = int(found.group(1)), int(found.group(2))
+        if node.role == "button" and (node.name or "").lower() in ("next page", "next", "go to next page"):
+            if not any(attr.strip() == "[disabled]" for attr in node.attrs):
+                page["next_ref"] = _ref(node)
+
+    table = next((item for root in roots for item in _walk(root)
+                  if item.role in ("table", "grid") and any(sub.role == "columnheader" for sub in _walk(item))), None)
+    if table is None:
+        return page
+
+    rows = [item for item in _walk(table) if item.role == "row"]
+    headers = next(([cell.name or " ".join(_texts(cell)) for cell in row.children if cell.role == "columnheader"]
+                    for row in rows if any(cell.role == "columnheader" for cell in row.children)), [])
+    fields = []
+    for header in headers:
+        lowered = header.lower()
+        fields.append(next((field for keyword, field in _COLUMNS if keyword in lowered), None))
+
+    for row_node in rows:
+        cells = [cell for cell in row_node.children if cell.role in ("cell", "gridcell")]
+        if not cells:
+            continue
+        # Rows start with a selection checkbox cell that has no column header
+        cells = cells[max(0, len(cells) - len(fields)):]
+        lead = {}
+        row = {"reveal_ref": None}
+        for field, cell in zip(fields, cells):
+            if field:
+                _read_cell(field, cell, lead, row)
+        if not lead.get("name"):
+            continue
+        row["lead"] = {key: value for key, value in lead.items() if value}
+        row["key"] = _person_key(row["lead"])
+        page["rows"].append(row)
+    return page
+
+
+def parse_people_json(payload) -> dict:
+    """
+    Reads Apollo's People search API response (or the reduced copy captured
+    in the page) into the same shape as parse_people_snapshot; there are no
+    refs, so rows with a locked email cannot be revealed from here.
+    """
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    pagination = (payload or {}).get("pagination") or {}
+    page = {"rows": [], "page": pagination.get("page"), "pages": pagination.get("total_pages"),
+            "total": pagination.get("total_entries"), "next_ref": None}
+    for person in (payload or {}).get("people") or []:
+        organization = person.get("organization") or {}
+        email = person.get("email") or ""
+        if email.endswith("@" + _LOCKED_EMAIL_DOMAIN):
+            email = ""
+        website = organization.get("website_url") or (f"https://{organization['primary_domain']}" if organization.get("primary_domain") else "")
+        phones = person.get("phone_numbers") or []
+        lead = {
+            "name": person.get("name") or " ".join(filter(None, [person.get("first_name"), person.get("last_name")])),
+            "designation": person.get("title") or "",
+            "email": email,
+            "linkedIn link": person.get("linkedin_url") or "",
+            "company name": organization.get("name") or "",
+            "company website link": website,
+            "employee count": str(organization.get("estimated_num_employees") or ""),
+            "company type": organization.get("industry") or "",
+            "mobile number": (phones[0] or {}).get("sanitized_number", "") if phones else "",
+        }
+        lead = {key: value for key, value in lead.items() if value}
+        if lead.get("name"):
+            page["rows"].append({"key": _person_key(lead), "lead": lead, "reveal_ref": None})
+    return page
+
+
+def _evaluate_result(text: str):
+    """Decodes the value printed after '### Result' by browser_evaluate."""
+    match = _EVALUATE_RESULT.search(text or "")
+    if not match:
+        return None
+    try:
+        return json.JSONDecoder().raw_decode(text[match.end():].lstrip())[0]
+    except ValueError:
+        return None
+
+
+class ApolloResultsExtractor:
+    """
+    Turns the filtered People results into lead records without the LLM
+    reading them: it parses the results table from the page snapshot (filling
+    gaps from Apollo's own search responses when they could be captured),
+    reveals hidden emails, and clicks through the result pages.
+
+    `call_tool(name, arguments)` runs a Playwright MCP tool on the agent's
+    browser session and returns its text. People already offered in the
+    current run (see `offered_people`) are skipped, so a second call (e.g. for
+    replacements after deduplication) continues with people not offered
+    before; outside a run each call starts afresh. The extractor itself is
+    cached with the agent on a pooled session, so it keeps no per-run state.
+    Each accepted lead is also handed to `lead_listener`, if one is set,
+    while the extraction continues.
+    """
+
+    def __init__(self, call_tool, max_pages: int = APOLLO_EXTRACT_MAX_PAGES, reveal_emails: bool = APOLLO_REVEAL_EMAILS,
+                 page_wait_seconds: float = APOLLO_PAGE_WAIT_SECONDS):
+        self.call_tool = call_tool
+        self.max_pages = max_pages
+        self.reveal_emails = reveal_emails
+        self.page_wait_seconds = page_wait_seconds
+        self.pages_read = 0
+        self.rows_read = 0
+        self.emails_revealed = 0
+        self.without_email = 0
+        self.json_pages = 0
+        self._capture_installed = False
+
+    async def _snapshot(self, text: str = None) -> dict:
+        """Parses `text` if it holds a snapshot, otherwise takes a fresh one."""
+        if not text or "```yaml" not in text:
+            text = await self.call_tool("browser_snapshot", {})
+        return parse_people_snapshot(text)
+
+    async def _merge_captured(self, page: dict):
+        """Fills fields the table does not show from the captured search response for the same page."""
+        try:
+            if not self._capture_installed:
+                await self.call_tool("browser_evaluate", {"function": _CAPTURE_JS})
+                self._capture_installed = True
+            captured = _evaluate_result(await self.call_tool("browser_evaluate", {"function": _READ_JS}))
+        except Exception as e:
+            print(f"Could not read Apollo search responses, using the table only: {e}")
+            return
+        if not isinstance(captured, dict) or not captured.get("people"):
+            return
+        data = parse_people_json(captured)
+        if page["page"] is not None and data["page"] is not None and data["page"] != page["page"]:
+            return  # Captured before this page loaded
+        by_key = {row["key"]: row["lead"] for row in data["rows"]}
+        merged = False
+        for row in page["rows"]:
+            extra = by_key.get(row["key"])
+            if extra:
+                row["lead"] = {**extra, **row["lead"]}
+                merged = True
+        self.json_pages += int(merged)
+
+    async def _next_page(self, page: dict) -> dict:
+        """Clicks "Next page" and waits until different results are shown."""
+        first = page["rows"][0]["key"] if page["rows"] else None
+        text = await self.call_tool("browser_click", {"element": "Next page button of the results table", "ref": page["next_ref"]})
+        waited = 0.0
+        while True:
+            following = await self._snapshot(text)
+            if not following["rows"] or following["rows"][0]["key"] != first or waited >= self.page_wait_seconds:
+                return following
+            await asyncio.sleep(0.5)
+            waited += 0.5
+            text = None
+
+    async def _reveal(self, row: dict) -> dict:
+        """Clicks the row's "Access email" button; returns the page as shown afterwards."""
+        text = await self.call_tool("browser_click", {"element": f"Access email button of {row['lead'].get('name', 'this row')}",
+                                                      "ref": row["reveal_ref"]})
+        self.emails_revealed += 1
+        return await self._snapshot(text)
+
+    async def extract(self, max_leads: int) -> tuple:
+        """Returns (lead records with an email, summary dict) for up to `max_leads` people not offered before."""
+        seen = offered_people.get()
+        if seen is None:
+            seen = set()
+        reveals_left = max_leads if self.reveal_emails else 0
+        records = []
+        page = await self._snapshot()
+        if not page["rows"]:
+            return records, {"leads": 0, "pages": 0, "total_results": page["total"], "has_more": False,
+                             "error": "No People results table on the current page; apply the filters and open the People search first."}
+        pages = 0
+        while True:
+            pages += 1
+            self.pages_read += 1
+            await self._merge_captured(page)
+            position = 0
+            while position < len(page["rows"]) and len(records) < max_leads:
+                row = page["rows"][position]
+                position += 1
+                if row["key"] in seen:
+                    continue
+                self.rows_read += 1
+                if not row["lead"].get("email") and reveals_left > 0 and row["reveal_ref"]:
+                    reveals_left -= 1
+                    try:
+                        revealed = await self._reveal(row)
+                        keys = [other["key"] for other in revealed["rows"]]
+                        if row["key"] in keys:
+                            page = revealed
+                            position = keys.index(row["key"]) + 1
+                            row = page["rows"][position - 1]
+                    except Exception as e:
+                        print(f"Error revealing the email of {row['lead'].get('name')}: {e}")
+                seen.add(row["key"])
+                if not row["lead"].get("email"):
+                    self.without_email += 1
+                    continue
+                records.append(dict(row["lead"]))
+                listener = lead_listener.get()
+                if listener is not None:
+                    await listener(dict(row["lead"]))
+            if len(records) >= max_leads or not page["next_ref"] or pages >= self.max_pages:
+                break
+            page = await self._next_page(page)
+            if not page["rows"]:
+                break
+
+        summary = {
+            "leads": len(records),
+            "pages": pages,
+            "total_results": page["total"],
+            "has_more": bool(page["next_ref"]) or position < len(page["rows"]),
+        }
+        return records, summary
+
+    def stats(self) -> dict:
+        return {"pages": self.pages_read, "rows": self.rows_read, "emails_revealed": self.emails_revealed,
+                "without_email": self.without_email, "json_pages": self.json_pages}
+
+
+def apollo_results_tool(call_tool, extractor: ApolloResultsExtractor = None) -> StructuredTool:
+    """
+    The `extract_apollo_leads` tool for ApolloAgent. The model only sees a
+    short summary; the lead records travel as the tool message's artifact and
+    are turned into lead patches by the agent node (see extracted_leads).
+    """
+    extractor = extractor or ApolloResultsExtractor(call_tool)
+
+    async def extract_apollo_leads(max_leads: int = 25) -> tuple:
+        try:
+            records, summary = await extractor.extract(max(1, int(max_leads)))
+        except Exception as e:
+            print(f"Error extracting Apollo results: {e}")
+            return f"Error: could not read the results table ({e}). Check the page and try again.", []
+        if summary.get("error"):
+            return f"Error: {summary['error']}", []
+        names = ", ".join(record["name"] for record in records[:10]) + (" ..." if len(records) > 10 else "")
+        content = (
+            f"Extracted {summary['leads']} leads with emails from {summary['pages']} result page(s) "
+            f"({summary['total_results'] or 'unknown'} results in total, more available: {summary['has_more']}). "
+            f"They are added to information_list automatically; do not transcribe them. Leads: {names}"
+        )
+        return content, records
+
+    return StructuredTool.from_function(
+        coroutine=extract_apollo_leads,
+        name=EXTRACT_TOOL_NAME,
+        description=(
+            "Reads the People search results currently shown in Apollo (after all filters are applied) into lead "
+            "records: name, title, email, LinkedIn, company, website, employee count and industry. Pages through "
+            "the results until `max_leads` people with an email are found" + (
+                ", revealing hidden emails (at most `max_leads` reveals, each uses an Apollo credit)"
+                if extractor.reveal_emails else "; people whose email is hidden are skipped"
+            ) + ". People returned by an earlier call in this run are skipped. "
+            "The leads are added to information_list automatically."
+        ),
+        response_format="content_and_artifact",
+    )
+
+
+def extracted_leads(messages: list) -> list:
+    """The lead records returned by extract_apollo_leads calls in an agent's message history."""
+    records = []
+    for message in messages:
+        if getattr(message, "name", None) == EXTRACT_TOOL_NAME and isinstance(getattr(message, "artifact", None), list):
+            records.extend(message.artifact)
+    return records
@@ -0,0 +1,310 @@
+"""
+Synthetic Apollo People search pages, as Playwright MCP tool results.
+
+Used to write the fixtures in benchmarks/fixtures/snapshots and by the stub
+MCP server, which serves any number of result pages from it. The pages
+follow the layout of Apollo's People search: navigation, the filter panel,
+the results table (emails either shown or behind "Access email") and the
+pagination controls.
+
+    python benchmarks/apollo_pages.py   # rewrites the fixtures
+"""
+import json
+import pathlib
+import random
+
+SNAPSHOTS_DIR = pathlib.Path(__file__).resolve().parent / "fixtures" / "snapshots"
+SEARCH_URL = (
+    "https://app.apollo.io/#/people?personTitles[]=owner&organizationNumEmployeesRanges[]=21%2C50"
+    "&organizationIndustryTagIds[]=computer%20hardware"
+)
+PAGE_SIZE = 25
+
+FIRST = ["Jane", "Marco", "Priya", "Tom", "Aisha", "Lukas", "Sofia", "Daniel", "Mei", "Carlos", "Olivia", "Ahmed", "Hannah",
+         "Ravi", "Elena", "Noah", "Grace", "Kenji", "Fatima", "Peter", "Laura", "Diego", "Chloe", "Samuel", "Ingrid", "Omar",
+         "Julia", "Victor", "Amara", "Henrik", "Nina", "Pablo", "Zoe", "Arjun", "Clara", "Felix", "Yara", "Leo", "Maya", "Ivan"]
+LAST = ["Doe", "Rossi", "Sharma", "Becker", "Khan", "Novak", "Garcia", "Meyer", "Chen", "Silva", "Brown", "Hassan", "Schmidt",
+        "Patel", "Ivanova", "Wilson", "Kim", "Tanaka", "Ali", "Jensen", "Martin", "Lopez", "Dubois", "Okafor", "Larsen",
+        "Farouk", "Weber", "Costa", "Nwosu", "Berg"]
+COMPANY_A = ["Acme", "Northwind", "Bolt", "Granite", "Vertex", "Pioneer", "Summit", "Ironclad", "Bluefin", "Redwood",
+             "Keystone", "Atlas", "Crescent", "Harbor", "Quantum", "Sterling", "Falcon", "Cobalt", "Evergreen", "Orbit"]
+COMPANY_B = ["Hardware", "Systems", "Devices", "Computing", "Electronics", "Micro", "Circuits", "Embedded", "Labs", "Technologies"]
+TITLES = ["Owner", "Owner & CEO", "Co-Owner", "Owner / Managing Director", "Founder & Owner", "Owner and President"]
+CITIES = ["Austin, Texas, United States", "Denver, Colorado, United States", "Raleigh, North Carolina, United States",
+          "Portland, Oregon, United States", "Columbus, Ohio, United States", "San Jose, California, United States",
+          "Madison, Wisconsin, United States", "Boise, Idaho, United States"]
+INDUSTRY_OPTIONS = [
+    "Computer hardware", "Computer networking", "Computer software", "Consumer electronics",
+    "Electrical & electronic manufacturing", "Semiconductors", "Information technology & services", "Industrial automation",
+    "Telecommunications", "Internet", "Wireless", "Computer & network security", "Machinery", "Renewables & environment",
+    "Mechanical or industrial engineering", "Defense & space", "Medical devices", "Oil & energy", "Automotive",
+    "Aviation & aerospace", "Logistics & supply chain", "Retail", "Wholesale", "Printing", "Packaging & containers",
+    "Plastics", "Chemicals", "Construction", "Building materials", "Architecture & planning", "Civil engineering",
+    "Facilities services", "Environmental services", "Utilities", "Mining & metals", "Glass, ceramics & concrete",
+    "Furniture", "Textiles", "Sporting goods", "Consumer goods",
+]
+NAV_ITEMS = ["Home", "Search", "People", "Companies", "Lists", "Sequences", "Tasks", "Calls", "Meetings", "Conversations",
+             "Deals", "Analytics", "Data enrichment", "Plays", "Settings"]
+FILTER_SECTIONS = ["Lists", "Persona", "Email Status", "Job Titles", "Company", "Location", "Employees",
+                   "Industry & Keywords", "Buying Intent", "Scores", "Technologies", "Revenue", "Funding", "Job Postings"]
+COLUMNS = ["Name", "Job title", "Company", "Emails", "Phone numbers", "Actions", "Location", "# Employees", "Industry"]
+
+
+def _slug(text: str) -> str:
+    return text.lower().replace(" ", "").replace("&", "")
+
+
+def people(seed: int, count: int, start: int = 0, unique: bool = False, email_share: float = 0.6) -> list:
+    """`count` people from a seeded generator; `unique` numbers the companies so no two share a domain."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(start, start + count):
+        first, last = rnd.choice(FIRST), rnd.choice(LAST)
+        company = f"{rnd.choice(COMPANY_A)} {rnd.choice(COMPANY_B)}" + (f" {i + 1}" if unique else "")
+        domain = f"{_slug(company)}.com"
+        rows.append({
+            "id": f"{rnd.getrandbits(48):012x}",
+            "org_id": f"{rnd.getrandbits(48):012x}",
+            "name": f"{first} {last}",
+            "first_name": first,
+            "last_name": last,
+            "title": rnd.choice(TITLES),
+            "company": company,
+            "domain": domain,
+            "linkedin": f"http://www.linkedin.com/in/{first.lower()}-{last.lower()}-{rnd.randint(1000, 99999):x}",
+            "email": f"{first.lower()}.{last.lower()}@{domain}",
+            "email_shown": rnd.random() < email_share,
+            "location": rnd.choice(CITIES),
+            "employees": str(rnd.randint(21, 50)),
+            "industry": "Computer Hardware",
+        })
+    return rows
+
+
+def people_snapshot(page: int, total: int, rows: list, verified_checked: bool = True, revealed: set = None,
+                    actions: dict = None) -> str:
+    """
+    The aria snapshot YAML of one results page. `revealed` holds the ids of
+    people whose email was unlocked; `actions`, if given, is filled with
+    ref -> ("next_page",) / ("previous_page",) / ("reveal", person id).
+    """
+    revealed = revealed or set()
+    counter = [0]
+    lines = []
+
+    def ref():
+        counter[0] += 1
+        return f"[ref=e{counter[0]}]"
+
+    def add(depth, text):
+        lines.append("  " * depth + "- " + text)
+
+    def action(kind, *args):
+        reference = ref()
+        if actions is not None:
+            actions[reference[5:-1]] = (kind, *args)
+        return reference
+
+    add(0, f"generic [active] {ref()}:")
+    add(1, f"generic {ref()}:")
+    add(2, f"navigation \"Main\" {ref()}:")
+    for item in NAV_ITEMS:
+        add(3, f"link \"{item}\" {ref()} [cursor=pointer]:")
+        add(4, f"/url: \"#/{item.lower().replace(' ', '-')}\"")
+        add(4, f"img {ref()}")
+    add(2, f"generic {ref()}:")
+    add(3, f"generic {ref()}:")
+    add(4, f"button \"Upgrade\" {ref()} [cursor=pointer]")
+    add(4, f"button \"Notifications\" {ref()} [cursor=pointer]:")
+    add(5, f"img {ref()}")
+    add(4, f"button \"Account\" {ref()} [cursor=pointer]:")
+    add(5, f"img \"Avatar\" {ref()}")
+    add(1, f"main {ref()}:")
+    add(2, f"generic {ref()}:")
+    add(3, f"heading \"Find people\" [level=1] {ref()}")
+    add(3, f"generic {ref()}:")
+    add(4, f"tablist {ref()}:")
+    for tab, selected in [("Total", True), ("Net New", False), ("Saved", False)]:
+        add(5, f"tab \"{tab}\"{' [selected]' if selected else ''} {ref()} [cursor=pointer]")
+    add(4, f"button \"Save search\" {ref()} [cursor=pointer]")
+    add(2, f"complementary \"Filters\" {ref()}:")
+    add(3, f"generic {ref()}:")
+    add(4, f"generic {ref()}:")
+    add(5, "text: Filters")
+    add(5, f"button \"Clear all\" {ref()} [cursor=pointer]")
+    for section in FILTER_SECTIONS:
+        add(4, f"generic {ref()}:")
+        expanded = section in ("Email Status", "Job Titles", "Industry & Keywords")
+        add(5, f"button \"{section}\" [expanded={'true' if expanded else 'false'}] {ref()} [cursor=pointer]:")
+        add(6, f"img {ref()}")
+        add(6, f"generic: {section}")
+        if section == "Email Status":
+            add(5, f"group {ref()}:")
+            for option in ["Verified", "Unverified", "Likely to engage", "Unavailable"]:
+                checked = option == "Verified" and verified_checked
+                add(6, f"generic {ref()}:")
+                add(7, f"checkbox \"{option}\"{' [checked]' if checked else ''} {ref()} [cursor=pointer]")
+                add(7, f"generic: {option}")
+        if section == "Job Titles":
+            add(5, f"group {ref()}:")
+            add(6, f"combobox \"Search for a job title\" {ref()}")
+            add(6, f"generic {ref()}:")
+            add(7, "generic: owner")
+            add(7, f"button \"Remove owner\" {ref()} [cursor=pointer]:")
+            add(8, f"img {ref()}")
+        if section == "Industry & Keywords":
+            add(5, f"group {ref()}:")
+            add(6, f"combobox \"Search industries\" {ref()}")
+            add(6, f"listbox \"Industries\" {ref()}:")
+            for option in INDUSTRY_OPTIONS:
+                add(7, f"option \"{option}\"{' [selected]' if option == 'Computer hardware' else ''} {ref()} [cursor=pointer]")
+        add(4, f"separator {ref()}")
+    add(2, f"generic {ref()}:")
+    add(3, f"generic {ref()}:")
+    first = (page - 1) * PAGE_SIZE + 1
+    add(4, f"generic: {first} - {first + len(rows) - 1} of {total:,}")
+    add(4, f"button \"Select all\" {ref()} [cursor=pointer]")
+    add(4, f"button \"Add to list\" [disabled] {ref()}")
+    add(4, f"button \"Export\" {ref()} [cursor=pointer]")
+    add(3, f"table {ref()}:")
+    add(4, f"rowgroup {ref()}:")
+    add(5, f"row \"{' '.join(COLUMNS)}\" {ref()}:")
+    for header in COLUMNS:
+        add(6, f"columnheader \"{header}\" {ref()}:")
+        add(7, f"generic: {header}")
+    add(4, f"rowgroup {ref()}:")
+    for person in rows:
+        shown = person["email_shown"] or person["id"] in revealed
+        email_text = person["email"] if shown else "Access email"
+        add(5, f"row \"{person['name']} {person['title']} {person['company']} {email_text} Access Mobile "
+               f"{person['location']} {person['employees']} {person['industry']}\" {ref()}:")
+        add(6, f"cell {ref()}:")
+        add(7, f"checkbox \"Select {person['name']}\" {ref()} [cursor=pointer]")
+        add(6, f"cell \"{person['name']}\" {ref()}:")
+        add(7, f"generic {ref()}:")
+        add(8, f"img \"{person['name']}\" {ref()}")
+        add(8, f"generic {ref()}:")
+        add(9, f"link \"{person['name']}\" {ref()} [cursor=pointer]:")
+        add(10, f"/url: \"#/people/{person['id']}\"")
+        add(9, f"generic {ref()}:")
+        add(10, f"link \"LinkedIn\" {ref()} [cursor=pointer]:")
+        add(11, f"/url: {person['linkedin']}")
+        add(11, f"img {ref()}")
+        add(6, f"cell \"{person['title']}\" {ref()}:")
+        add(7, f"generic: {person['title']}")
+        add(6, f"cell \"{person['company']}\" {ref()}:")
+        add(7, f"generic {ref()}:")
+        add(8, f"img \"{person['company']}\" {ref()}")
+        add(8, f"link \"{person['company']}\" {ref()} [cursor=pointer]:")
+        add(9, f"/url: \"#/organizations/{person['org_id']}\"")
+        add(8, f"generic {ref()}:")
+        add(9, f"link \"Website\" {ref()} [cursor=pointer]:")
+        add(10, f"/url: http://www.{person['domain']}")
+        add(10, f"img {ref()}")
+        add(9, f"link \"LinkedIn company page\" {ref()} [cursor=pointer]:")
+        add(10, f"/url: http://www.linkedin.com/company/{_slug(person['company'])}")
+        add(10, f"img {ref()}")
+        add(6, f"cell {ref()}:")
+        if shown:
+            add(7, f"generic {ref()}:")
+            add(8, f"generic: {person['email']}")
+            add(8, f"img \"Verified\" {ref()}")
+        else:
+            add(7, f"button \"Access email\" {action('reveal', person['id'])} [cursor=pointer]:")
+            add(8, f"img {ref()}")
+        add(6, f"cell {ref()}:")
+        add(7, f"button \"Access Mobile\" {ref()} [cursor=pointer]:")
+        add(8, f"img {ref()}")
+        add(6, f"cell {ref()}:")
+        add(7, f"generic {ref()}:")
+        add(8, f"button \"Add to sequence\" {ref()} [cursor=pointer]:")
+        add(9, f"img {ref()}")
+        add(8, f"button \"Save\" {ref()} [cursor=pointer]:")
+        add(9, f"img {ref()}")
+        add(8, f"button \"More\" {ref()} [cursor=pointer]:")
+        add(9, f"img {ref()}")
+        add(6, f"cell \"{person['location']}\" {ref()}:")
+        add(7, f"generic: {person['location']}")
+        add(6, f"cell \"{person['employees']}\" {ref()}:")
+        add(7, f"generic: {person['employees']}")
+        add(6, f"cell \"{person['industry']}\" {ref()}:")
+        add(7, f"generic: {person['industry']}")
+    pages = -(-total // PAGE_SIZE)
+    add(3, f"navigation \"Pagination\" {ref()}:")
+    if page == 1:
+        add(4, f"button \"Previous page\" [disabled] {ref()}")
+    else:
+        add(4, f"button \"Previous page\" {action('previous_page')} [cursor=pointer]")
+    add(4, f"generic: Page {page} of {pages}")
+    if page >= pages:
+        add(4, f"button \"Next page\" [disabled] {ref()}")
+    else:
+        add(4, f"button \"Next page\" {action('next_page')} [cursor=pointer]")
+    return "\n".join(lines)
+
+
+def people_json(page: int, total: int, rows: list, revealed: set = None) -> dict:
+    """The same page as Apollo's mixed_people/search API answers it; locked emails use Apollo's placeholder."""
+    revealed = revealed or set()
+    return {
+        "pagination": {"page": page, "per_page": PAGE_SIZE, "total_entries": total, "total_pages": -(-total // PAGE_SIZE)},
+        "people": [{
+            "id": person["id"],
+            "first_name": person["first_name"],
+            "last_name": person["last_name"],
+            "name": person["name"],
+            "title": person["title"],
+            "linkedin_url": person["linkedin"],
+            "email": person["email"] if person["email_shown"] or person["id"] in revealed else "email_not_unlocked@domain.com",
+            "email_status": "verified",
+            "city": person["location"].split(", ")[0],
+            "organization": {
+                "id": person["org_id"],
+                "name": person["company"],
+                "website_url": f"http://www.{person['domain']}",
+                "primary_domain": person["domain"],
+                "estimated_num_employees": int(person["employees"]),
+                "industry": person["industry"].lower(),
+            },
+        } for person in rows],
+    }
+
+
+def tool_result(code: str, url: str, yaml: str) -> str:
+    """Wraps a snapshot the way Playwright MCP returns it from an action tool."""
+    return (f"### Ran Playwright code\n```js\n{code}\n```\n\n### Page state\n- Page URL: {url}\n"
+            f"- Page Title: People - Apollo\n- Page Snapshot:\n```yaml\n{yaml}\n```\n")
+
+
+def write_fixtures(directory: pathlib.Path = SNAPSHOTS_DIR):
+    directory.mkdir(parents=True, exist_ok=True)
+    total = 37
+    page1, page2 = people(1, PAGE_SIZE), people(2, total - PAGE_SIZE)
+    page1_text = tool_result("await page.getByRole('checkbox', { name: 'Verified' }).click();",
+                             SEARCH_URL + "&page=1", people_snapshot(1, total, page1))
+    fixtures = {
+        "apollo_people_unfiltered.md": tool_result(
+            "await page.getByRole('combobox', { name: 'Search industries' }).click();",
+            SEARCH_URL + "&page=1", people_snapshot(1, 2431, people(9, PAGE_SIZE), verified_checked=False)),
+        "apollo_people_page1.md": page1_text,
+        "apollo_people_page2.md": tool_result("await page.getByRole('button', { name: 'Next page' }).click();",
+                                              SEARCH_URL + "&page=2", people_snapshot(2, total, page2)),
+    }
+
+    # The first row ticked: a handful of lines change on the same page
+    first = page1[0]["name"]
+    selected = page1_text.replace("await page.getByRole('checkbox', { name: 'Verified' }).click();",
+                                  f"await page.getByRole('checkbox', {{ name: 'Select {first}' }}).click();")
+    selected = selected.replace(f"checkbox \"Select {first}\" [ref=", f"checkbox \"Select {first}\" [checked] [ref=", 1)
+    selected = selected.replace("button \"Add to list\" [disabled] [ref=e", "button \"Add to list\" [ref=e", 1)
+    selected = selected.replace("button \"Select all\" [ref=", "text: 1 selected\n        - button \"Select all\" [ref=", 1)
+    fixtures["apollo_people_page1_selected.md"] = selected
+    fixtures["apollo_people_page1.json"] = json.dumps(people_json(1, total, page1), indent=2) + "\n"
+
+    for name, text in fixtures.items():
+        (directory / name).write_text(text, encoding="utf-8")
+        print(f"{name}: {len(text)} characters")
+
+
+if __name__ == "__main__":
+    write_fixtures()
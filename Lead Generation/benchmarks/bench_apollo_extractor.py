@@ -0,0 +1,166 @@
+"""
+Checks and benchmark of the Apollo results extractor.
+
+First parses the saved People search fixtures (benchmarks/fixtures/snapshots)
+and compares every row with the people the fixtures were generated from,
+exiting with an error on any mismatch. Then starts the stub Playwright MCP
+server and extracts the requested numbers of leads through a real MCP
+session, paging through the results and revealing hidden emails, and prints
+how long that took.
+
+    python benchmarks/bench_apollo_extractor.py --leads 100 500
+    python benchmarks/bench_apollo_extractor.py --fixtures-only
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from apollo_extractor import ApolloResultsExtractor, parse_people_json, parse_people_snapshot
+from apollo_pages import PAGE_SIZE, SEARCH_URL, SNAPSHOTS_DIR, people
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+
+# Fixture -> (people it shows, page, pages, total results, has a "Next page" button)
+EXPECTED = {
+    "apollo_people_unfiltered.md": (people(9, PAGE_SIZE), 1, 98, 2431, True),
+    "apollo_people_page1.md": (people(1, PAGE_SIZE), 1, 2, 37, True),
+    "apollo_people_page1_selected.md": (people(1, PAGE_SIZE), 1, 2, 37, True),
+    "apollo_people_page2.md": (people(2, 12), 2, 2, 37, False),
+}
+
+
+def expected_lead(person: dict, email: bool) -> dict:
+    lead = {
+        "name": person["name"],
+        "designation": person["title"],
+        "linkedIn link": person["linkedin"],
+        "company name": person["company"],
+        "company website link": f"http://www.{person['domain']}",
+        "employee count": person["employees"],
+    }
+    if email:
+        lead["email"] = person["email"]
+    return lead
+
+
+def check_page(name: str, page: dict, expected: tuple, from_json: bool = False) -> list:
+    """Differences between a parsed page and the people it was generated from."""
+    persons, number, pages, total, has_next = expected
+    errors = []
+    if (page["page"], page["pages"], page["total"]) != (number, pages, total):
+        errors.append(f"{name}: page {page['page']}/{page['pages']} of {page['total']}, expected {number}/{pages} of {total}")
+    if not from_json and bool(page["next_ref"]) != has_next:
+        errors.append(f"{name}: next page ref {page['next_ref']!r}, expected one: {has_next}")
+    if len(page["rows"]) != len(persons):
+        errors.append(f"{name}: {len(page['rows'])} rows, expected {len(persons)}")
+    for row, person in zip(page["rows"], persons):
+        wanted = expected_lead(person, person["email_shown"])
+        got = {key: row["lead"].get(key) for key in wanted}
+        if "email" not in wanted and row["lead"].get("email"):
+            errors.append(f"{name}: {person['name']} shows locked email {row['lead']['email']}")
+        if got != wanted:
+            errors.append(f"{name}: {person['name']} parsed as {got}")
+        if not from_json and not person["email_shown"] and not row["reveal_ref"]:
+            errors.append(f"{name}: {person['name']} has no 'Access email' ref")
+    return errors
+
+
+def check_fixtures() -> int:
+    errors = []
+    for fixture, expected in EXPECTED.items():
+        text = (SNAPSHOTS_DIR / fixture).read_text(encoding="utf-8")
+        started = time.perf_counter()
+        page = parse_people_snapshot(text)
+        elapsed = time.perf_counter() - started
+        found = check_page(fixture, page, expected)
+        errors.extend(found)
+        print(f"{fixture:<34} {len(page['rows']):>3} rows  {elapsed * 1000:6.1f} ms  {'ok' if not found else 'FAILED'}")
+
+    fixture = "apollo_people_page1.json"
+    page = parse_people_json((SNAPSHOTS_DIR / fixture).read_text(encoding="utf-8"))
+    found = check_page(fixture, page, EXPECTED["apollo_people_page1.md"], from_json=True)
+    table = parse_people_snapshot((SNAPSHOTS_DIR / "apollo_people_page1.md").read_text(encoding="utf-8"))
+    if [row["key"] for row in page["rows"]] != [row["key"] for row in table["rows"]]:
+        found.append(f"{fixture}: rows do not line up with the results table")
+    errors.extend(found)
+    print(f"{fixture:<34} {len(page['rows']):>3} rows  {'':>9}  {'ok' if not found else 'FAILED'}")
+
+    for error in errors:
+        print(f"MISMATCH {error}")
+    return len(errors)
+
+
+async def extract(max_leads: int, results: int, reveal_emails: bool = True) -> dict:
+    """Extracts `max_leads` leads from a fresh session of the stub server."""
+    from mcp_utils import PlaywrightSessionPool, get_mcp_clients
+
+    pool = PlaywrightSessionPool(get_mcp_clients(os.environ["PLAYWRIGHT_MCP_URL"]), size=1)
+    await pool.start()
+    try:
+        async with pool.lease() as slot:
+            await slot.call_tool("browser_navigate", {"url": SEARCH_URL})
+            extractor = ApolloResultsExtractor(slot.call_tool, reveal_emails=reveal_emails)
+            started = time.perf_counter()
+            records, summary = await extractor.extract(max_leads)
+            elapsed = time.perf_counter() - started
+    finally:
+        await pool.close()
+
+    # Every record must be a distinct person of the search, with their real email
+    by_linkedin = {person["linkedin"]: person for person in people(7, results, unique=True)}
+    wrong = sum(1 for record in records if by_linkedin.get(record.get("linkedIn link"), {}).get("email") != record.get("email"))
+    return {"records": len(records), "unique": len({record["email"] for record in records}), "wrong": wrong,
+            "seconds": elapsed, **summary, **extractor.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Apollo results extractor and measure bulk extraction")
+    parser.add_argument("--leads", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--results", type=int, default=1000, help="People in the stub's search results")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per stub browser tool call")
+    parser.add_argument("--port", type=int, default=8944)
+    parser.add_argument("--fixtures-only", action="store_true", help="Only check the saved fixtures")
+    parser.add_argument("--no-reveal", action="store_true", help="Skip people whose email is hidden instead of revealing it")
+    args = parser.parse_args()
+
+    mismatches = check_fixtures()
+    if mismatches or args.fixtures_only:
+        sys.exit(1 if mismatches else 0)
+
+    work_dir = tempfile.TemporaryDirectory()
+    os.environ["PLAYWRIGHT_MCP_URL"] = f"http://127.0.0.1:{args.port}/mcp"
+    os.environ["PLAYWRIGHT_STORAGE_STATE"] = str(pathlib.Path(work_dir.name) / "storage_state.json")
+    from bench_research import wait_for_port
+
+    server = subprocess.Popen([
+        sys.executable, str(BENCH_DIR / "stub_mcp_server.py"), "--port", str(args.port),
+        "--latency", str(args.latency), "--apollo-results", str(args.results),
+    ])
+    failed = False
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        print()
+        for max_leads in args.leads:
+            result = asyncio.run(extract(max_leads, args.results, reveal_emails=not args.no_reveal))
+            failed |= result["records"] != min(max_leads, args.results) or result["unique"] != result["records"] or bool(result["wrong"])
+            print(
+                f"leads={max_leads:<5} extracted={result['records']:<5} unique={result['unique']:<5} wrong={result['wrong']:<3} "
+                f"pages={result['pages']:<4} revealed={result['emails_revealed']:<4} json_pages={result['json_pages']:<4} "
+                f"time={result['seconds']:.2f}s ({result['records'] / result['seconds']:.0f} leads/s)"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+        work_dir.cleanup()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
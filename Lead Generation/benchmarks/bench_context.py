@@ -0,0 +1,91 @@
+"""
+Prompt size per hop with and without context compaction.
+
+Runs the real Supervisor and compact_context nodes in a small graph for many
+Supervisor loops, with a stand-in agent that appends an update of a fixed
+size every loop, and prints the Supervisor's prompt tokens per hop as
+RunMetrics reports them. Without compaction the prompt grows with every
+loop; with it the prompt levels off at the token budget.
+
+    python benchmarks/bench_context.py --loops 60
+    python benchmarks/bench_context.py --loops 200 --update-chars 3000 --budget 2000 --modes llm extractive off
+"""
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from bench_workflow import install_fake_llm
+
+
+async def run_loops(main, mode: str, loops: int, update_chars: int, budget: int) -> dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import END, StateGraph
+    from context_compaction import ContextCompactor, compaction_node_factory
+    from fake_llm import ScriptedChatModel
+    from instrumentation import RunMetrics
+    from lead_utils import empty_lead
+
+    model = ScriptedChatModel()
+    compactor = ContextCompactor(model, token_budget=0 if mode == "off" else budget,
+                                 mode="extractive" if mode == "off" else mode)
+    update = ("Apollo page read: filters applied, verified emails only, next page pending. " * 100)[:update_chars]
+
+    done = 0
+
+    async def agent(state):
+        nonlocal done
+        done += 1
+        return {"subgraph_messages": state["subgraph_messages"] + [AIMessage(content=f"Loop {done}: {update}")]}
+
+    def loops_left(state):
+        return "compact_context" if done < loops else END
+
+    workflow = StateGraph(main.GraphState)
+    workflow.add_node("supervisor", main.supervisor_node_factory(model, "You are the Supervisor Agent."))
+    workflow.add_node("agent", RunnableLambda(agent))
+    workflow.add_node("compact_context", compaction_node_factory(compactor))
+    workflow.set_entry_point("supervisor")
+    workflow.add_edge("supervisor", "agent")
+    workflow.add_conditional_edges("agent", loops_left, {"compact_context": "compact_context", END: END})
+    workflow.add_edge("compact_context", "supervisor")
+    app = workflow.compile()
+
+    metrics = RunMetrics(f"context-{mode}")
+    state = {"subgraph_messages": [HumanMessage(content="Find verified business owners on Apollo.")],
+             "next_agent": "supervisor", "information_list": [empty_lead()], "long_term_summary": ""}
+    started = time.perf_counter()
+    final = await app.ainvoke(state, {"callbacks": [metrics], "recursion_limit": 10 * loops + 10})
+    seconds = time.perf_counter() - started
+    prompts = [hop["prompt_tokens"] for hop in metrics.hop_stats()["steps"] if hop["nodes"] == ["supervisor"]]
+    return {"prompts": prompts, "run_seconds": seconds, "messages": len(final["subgraph_messages"]),
+            "summary_tokens": len(final.get("long_term_summary") or "") // 4, **compactor.stats.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Supervisor prompt size per hop with context compaction")
+    parser.add_argument("--loops", type=int, default=60)
+    parser.add_argument("--update-chars", type=int, default=1500, help="Size of the update an agent adds per loop")
+    parser.add_argument("--budget", type=int, default=3000, help="Context token budget")
+    parser.add_argument("--modes", nargs="+", default=["llm", "extractive", "off"], choices=["llm", "extractive", "off"])
+    args = parser.parse_args()
+
+    install_fake_llm(0.0)
+    import main as workflow_main
+
+    for mode in args.modes:
+        result = asyncio.run(run_loops(workflow_main, mode, args.loops, args.update_chars, args.budget))
+        prompts = result["prompts"]
+        checkpoints = sorted({1, len(prompts) // 4, len(prompts) // 2, len(prompts)} - {0})
+        per_hop = "  ".join(f"loop {n}: {prompts[n - 1]}" for n in checkpoints)
+        print(f"{mode:<10} supervisor prompt tokens  {per_hop}  max {max(prompts)}  total {sum(prompts)}  "
+              f"messages kept {result['messages']}  summary {result['summary_tokens']} tokens  "
+              f"compactions {result['compactions']}  time {result['run_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
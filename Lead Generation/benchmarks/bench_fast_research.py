@@ -0,0 +1,96 @@
+"""
+Benchmark for the HTTP fast path of company research.
+
+Serves the fixture sites in benchmarks/fixtures/sites from a local HTTP
+server, runs FastResearcher over them and shows which sites are summarized
+over plain HTTP and which fall back to the Playwright ResearchAgent (and why).
+It then researches many copies of the static site to show throughput.
+
+    python benchmarks/bench_fast_research.py --copies 50
+"""
+import argparse
+import asyncio
+import functools
+import pathlib
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from fake_llm import ScriptedChatModel
+from fast_research import FastResearcher
+from lead_utils import empty_lead
+
+SITES_DIR = pathlib.Path(__file__).resolve().parent / "fixtures" / "sites"
+
+# Fixture site -> expected outcome of the fast path
+EXPECTED = {
+    "acme-hardware": "summarized",
+    "js-app": "JavaScript-rendered page",
+    "captcha-shop": "bot protection / CAPTCHA",
+    "missing-site": "HTTP 404",
+}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    """Serves the fixture sites on a free local port from a background thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(SITES_DIR)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def lead_for(base_url: str, site: str) -> dict:
+    lead = empty_lead()
+    lead.update({"company name": site, "company website link": f"{base_url}/{site}/"})
+    return lead
+
+
+async def run(base_url: str, copies: int, llm_latency: float) -> bool:
+    researcher = FastResearcher(ScriptedChatModel(latency=llm_latency))
+    ok = True
+    try:
+        for site, expected in EXPECTED.items():
+            before = dict(researcher.fallbacks)
+            started = time.perf_counter()
+            updates = await researcher.research(lead_for(base_url, site))
+            elapsed = time.perf_counter() - started
+            outcome = "summarized" if updates else next(
+                reason for reason, count in researcher.fallbacks.items() if count != before.get(reason, 0))
+            ok = ok and outcome == expected
+            print(f"{site:<14} {outcome:<28} expected={expected:<28} {elapsed * 1000:.0f}ms")
+
+        leads = [lead_for(base_url, "acme-hardware") for _ in range(copies)]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(researcher.research(lead) for lead in leads))
+        elapsed = time.perf_counter() - started
+        print(f"{copies} static sites researched in {elapsed:.2f}s "
+              f"({copies / elapsed:.1f} sites/s, {sum(1 for r in results if r)} summarized)")
+    finally:
+        await researcher.aclose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP fast path for company research")
+    parser.add_argument("--copies", type=int, default=50, help="Concurrent researches of the static fixture site")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake summary call")
+    args = parser.parse_args()
+
+    server = start_fixture_server()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        ok = asyncio.run(run(base_url, args.copies, args.llm_latency))
+    finally:
+        server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark for the parallel research stage and the research cache.
+
+Starts the stub Playwright MCP server, then researches the same set of leads
+with a pool of one browser session (the old sequential behaviour) and with a
+larger pool, and prints the wall time and speedup.
+
+    python benchmarks/bench_research.py --leads 12 --pool-size 4 --latency 0.3
+"""
+import argparse
+import asyncio
+import pathlib
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from typing import Annotated
+from typing_extensions import TypedDict
+from langgraph.graph import StateGraph, END
+from fake_llm import ScriptedChatModel
+from lead_utils import apply_lead_patches, empty_lead
+from mcp_utils import PlaywrightSessionPool, get_mcp_clients
+from research_cache import ResearchCache
+from research_stage import research_fanout, research_lead_node_factory, research_merge_node
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+
+
+class ResearchState(TypedDict):
+    subgraph_messages: list
+    next_agent: str
+    information_list: Annotated[list, apply_lead_patches]
+    research_attempts: dict
+
+
+def wait_for_port(host: str, port: int, timeout: float = 15.0):
+    """Blocks until the stub server accepts connections."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Stub MCP server did not start on {host}:{port}")
+
+
+def make_leads(count: int) -> list:
+    """Builds leads that only need research."""
+    leads = []
+    for i in range(count):
+        lead = empty_lead()
+        lead.update({
+            "name": f"Owner {i}",
+            "email": f"owner{i}@company{i}.example",
+            "company name": f"Company {i}",
+            "company website link": f"https://company{i}.example",
+        })
+        leads.append(lead)
+    return leads
+
+
+async def run_research(url: str, leads: list, pool_size: int, llm_latency: float, cache: ResearchCache = None) -> tuple:
+    """Runs the research stage once and returns (seconds, researched lead count)."""
+    model = ScriptedChatModel(latency=llm_latency)
+    async with PlaywrightSessionPool(get_mcp_clients(url), size=pool_size) as session_pool:
+        graph = StateGraph(ResearchState)
+        graph.add_node("research_lead", research_lead_node_factory(session_pool, model=model, cache=cache))
+        graph.add_node("research_merge", research_merge_node())
+        graph.set_conditional_entry_point(research_fanout, ["research_lead", "research_merge"])
+        graph.add_edge("research_lead", "research_merge")
+        graph.add_edge("research_merge", END)
+        app = graph.compile()
+
+        started = time.perf_counter()
+        final = await app.ainvoke({
+            "subgraph_messages": [],
+            "next_agent": "ResearchAgent",
+            "information_list": leads,
+        })
+        elapsed = time.perf_counter() - started
+
+    researched = sum(1 for lead in final["information_list"] if lead["company details"])
+    return elapsed, researched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs pooled company research")
+    parser.add_argument("--leads", type=int, default=12)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per stub browser tool call")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="Seconds per fake LLM call")
+    parser.add_argument("--port", type=int, default=8940)
+    args = parser.parse_args()
+
+    server = subprocess.Popen([
+        sys.executable, str(BENCH_DIR / "stub_mcp_server.py"),
+        "--port", str(args.port), "--latency", str(args.latency),
+    ])
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        url = f"http://127.0.0.1:{args.port}/mcp"
+
+        results = {}
+        for pool_size in (1, args.pool_size):
+            elapsed, researched = asyncio.run(run_research(url, make_leads(args.leads), pool_size, args.llm_latency))
+            results[pool_size] = elapsed
+            print(f"pool_size={pool_size:<3} leads={args.leads:<4} researched={researched:<4} wall={elapsed:.2f}s")
+
+        print(f"speedup: {results[1] / results[args.pool_size]:.2f}x with {args.pool_size} sessions")
+
+        # Second campaign over the same companies: the cache should answer every lead
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResearchCache(str(pathlib.Path(cache_dir) / "research_cache.sqlite"))
+            for label in ("cold cache", "warm cache"):
+                elapsed, researched = asyncio.run(
+                    run_research(url, make_leads(args.leads), args.pool_size, args.llm_latency, cache=cache))
+                print(f"{label:<10} leads={args.leads:<4} researched={researched:<4} wall={elapsed:.2f}s {cache.stats()}")
+            cache.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
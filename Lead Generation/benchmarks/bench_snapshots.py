@@ -0,0 +1,75 @@
+"""
+Token savings of the snapshot compressor on Apollo People search pages.
+
+Replays the tool results of a typical ApolloAgent session (the fixtures in
+benchmarks/fixtures/snapshots) through a SnapshotCompressor and prints, per
+step, the size the agent would have received before and after compression.
+
+    python benchmarks/bench_snapshots.py
+    python benchmarks/bench_snapshots.py --max-list-items 10 --max-text 80 --no-diff
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from snapshot_compression import (SNAPSHOT_DIFF_MAX_RATIO, SNAPSHOT_MAX_CHARS, SNAPSHOT_MAX_LIST_ITEMS,
+                                  SNAPSHOT_MAX_TEXT, SnapshotCompressor, SnapshotLimits)
+
+SNAPSHOTS_DIR = pathlib.Path(__file__).resolve().parent / "fixtures" / "snapshots"
+
+# (tool, fixture) in the order an agent session produces them
+SESSION = [
+    ("browser_click", "apollo_people_unfiltered.md"),      # Industry picked, results not yet filtered by email status
+    ("browser_click", "apollo_people_page1.md"),           # "Verified" ticked: new result rows on the same page
+    ("browser_click", "apollo_people_page1_selected.md"),  # One row selected: a handful of lines change
+    ("browser_snapshot", "apollo_people_page1_selected.md"),  # Nothing changed
+    ("browser_click", "apollo_people_page2.md"),           # Next page
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count at ~4 characters per token, as in the run reports."""
+    return len(text) // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure snapshot compression on recorded Apollo pages")
+    parser.add_argument("--max-list-items", type=int, default=SNAPSHOT_MAX_LIST_ITEMS)
+    parser.add_argument("--max-text", type=int, default=SNAPSHOT_MAX_TEXT)
+    parser.add_argument("--max-chars", type=int, default=SNAPSHOT_MAX_CHARS)
+    parser.add_argument("--diff-max-ratio", type=float, default=SNAPSHOT_DIFF_MAX_RATIO)
+    parser.add_argument("--no-diff", action="store_true", help="Always send full snapshots")
+    parser.add_argument("--show", type=int, metavar="STEP", help="Print the compressed output of one step (1-based)")
+    args = parser.parse_args()
+
+    limits = SnapshotLimits(args.max_list_items, args.max_text, args.max_chars)
+    compressor = SnapshotCompressor(limits=limits, enabled=True, diff=not args.no_diff, diff_max_ratio=args.diff_max_ratio)
+    raw_tokens = compressed_tokens = 0
+    history_raw = history_compressed = 0
+    for step, (tool, fixture) in enumerate(SESSION, start=1):
+        text = (SNAPSHOTS_DIR / fixture).read_text(encoding="utf-8")
+        started = time.perf_counter()
+        output = compressor.compress_text(text)
+        elapsed = time.perf_counter() - started
+        raw_tokens += estimate_tokens(text)
+        compressed_tokens += estimate_tokens(output)
+        # Every later LLM step of the ReAct loop re-reads the whole history
+        history_raw += raw_tokens
+        history_compressed += compressed_tokens
+        mode = "unchanged" if "(unchanged" in output else "diff" if "```diff" in output else "full"
+        print(f"{step}. {tool:<17} {fixture:<34} {estimate_tokens(text):>7} -> {estimate_tokens(output):>6} tokens "
+              f"({mode}, {elapsed * 1000:.1f} ms)")
+        if args.show == step:
+            print(output)
+
+    print(f"\nTool output: {raw_tokens} -> {compressed_tokens} tokens ({1 - compressed_tokens / raw_tokens:.0%} saved)")
+    print(f"Prompt tokens re-read over the {len(SESSION)} following LLM steps: {history_raw} -> {history_compressed} "
+          f"({1 - history_compressed / history_raw:.0%} saved)")
+    print(f"Compressor stats: {compressor.stats.stats()}")
+
+
+if __name__ == "__main__":
+    main()
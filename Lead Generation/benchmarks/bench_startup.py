@@ -0,0 +1,110 @@
+"""
+Cold start benchmark for the workflow modules.
+
+Each measurement runs in a fresh interpreter, with `LLMConfig` replaced by
+the scripted fake model so no provider credentials are needed:
+
+  - import main       importing the workflow module (what tests and tools pay)
+  - cli --help        printing the CLI help
+  - first model       importing main and building the shared model client
+
+Point --source-dir at another checkout (e.g. a `git worktree` of an older
+commit) to compare; measurements a tree does not support are shown as n/a.
+
+    python benchmarks/bench_startup.py --repeat 7 --top 10
+    git worktree add /tmp/before HEAD~1
+    python benchmarks/bench_startup.py --source-dir "/tmp/before/Lead Generation"
+"""
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+SOURCE_DIR = BENCH_DIR.parent
+
+# Python snippets timed in the child; each prints its own duration in seconds
+SNIPPETS = {
+    "import main": "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)",
+    "cli --help": (
+        "import contextlib, io, time; t = time.perf_counter(); import cli\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    try: cli.main(['--help'])\n"
+        "    except SystemExit: pass\n"
+        "print(time.perf_counter() - t)"
+    ),
+    "first model": (
+        "import time; t = time.perf_counter(); import main\n"
+        "from resources import get_model; get_model(); print(time.perf_counter() - t)"
+    ),
+}
+
+FAKE_LLM_CONFIG = (
+    "import sys\n"
+    "sys.path.insert(0, {bench_dir!r})\n"
+    "from fake_llm import ScriptedChatModel\n"
+    "def llm():\n"
+    "    return ScriptedChatModel()\n"
+)
+
+
+def child_env(config_dir: str, source_dir: pathlib.Path) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([config_dir, str(source_dir)])
+    env["LLM_CACHE_MODE"] = "off"
+    return env
+
+
+def time_snippet(snippet: str, env: dict, cwd: pathlib.Path, repeat: int):
+    """Median seconds over `repeat` fresh interpreters, or None if the snippet fails in this tree."""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", snippet], env=env, cwd=cwd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def slowest_imports(env: dict, cwd: pathlib.Path, top: int) -> list:
+    """The `top` slowest first-level imports of `import main`, from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            env=env, cwd=cwd, capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        # Direct imports of main are indented by exactly two spaces
+        if len(parts) == 3 and parts[2].startswith("   ") and not parts[2].startswith("    "):
+            try:
+                imports.append((int(parts[1]), parts[2].strip()))
+            except ValueError:
+                continue
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the workflow modules")
+    parser.add_argument("--source-dir", default=str(SOURCE_DIR), help="Lead Generation directory to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest imports of main")
+    args = parser.parse_args()
+
+    source_dir = pathlib.Path(args.source_dir).resolve()
+    with tempfile.TemporaryDirectory() as config_dir:
+        pathlib.Path(config_dir, "LLMConfig.py").write_text(FAKE_LLM_CONFIG.format(bench_dir=str(BENCH_DIR)))
+        env = child_env(config_dir, source_dir)
+        # Run from the scratch directory so nothing the workflow opens lands in the source tree
+        for name, snippet in SNIPPETS.items():
+            seconds = time_snippet(snippet, env, pathlib.Path(config_dir), args.repeat)
+            print(f"{name:<12} {'n/a' if seconds is None else f'{seconds * 1000:.1f} ms':>10}")
+        if args.top:
+            print(f"\nSlowest imports of main ({source_dir}):")
+            for microseconds, module in slowest_imports(env, pathlib.Path(config_dir), args.top):
+                print(f"  {microseconds / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
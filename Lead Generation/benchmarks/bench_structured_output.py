@@ -0,0 +1,141 @@
+"""
+Checks and benchmark of the streaming structured-output parser.
+
+First parses a set of awkward model answers (prose around the JSON, code
+fences, braces inside strings, an example object before the real one, text
+after it) whole and one character at a time, and compares the result with
+the expected object, exiting with an error on any mismatch. The old greedy
+`\\{.*\\}` extraction is run on the same answers for comparison.
+
+Then streams Supervisor and email answers from the scripted model, with a
+delay per chunk and chatty prose after the JSON, and prints how long it took
+to know the route and to have the whole answer compared with reading the
+full completion first.
+
+    python benchmarks/bench_structured_output.py
+    python benchmarks/bench_structured_output.py --chunk-latency 0.02 --trailing-chars 600
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import re
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from fake_llm import ScriptedChatModel
+from structured_output import JSONStreamParser, astream_structured
+
+SUPERVISOR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "next_agent": {"type": "string", "enum": ["ApolloAgent", "ResearchAgent", "EmailGenerator", "end"]},
+        "message": {"type": "string"},
+        "lead_patches": {"type": "array", "items": {"type": "object"}},
+    },
+    "required": ["next_agent"],
+}
+
+DECISION = {"next_agent": "ResearchAgent", "message": "Research the {new} leads", "lead_patches": [
+    {"lead_id": "lead-1", "set": {"company_name": "Acme {Rugged} \"Systems\""}}]}
+
+# Name -> (model answer, expected object or None)
+CASES = {
+    "plain": (json.dumps(DECISION), DECISION),
+    "fenced with prose": ("Here is my decision:\n```json\n" + json.dumps(DECISION, indent=2) + "\n```\nLet me know!", DECISION),
+    "braces and escapes in strings": (json.dumps({"next_agent": "end", "message": "} { \\\" ] ["}),
+                                      {"next_agent": "end", "message": "} { \\\" ] ["}),
+    "example object first": ('Format: {"next_agent": "<ApolloAgent | end>"}\nAnswer: ' + json.dumps(DECISION), DECISION),
+    "text and object after": (json.dumps(DECISION) + '\nAlternatively {"next_agent": "end"} would also work.', DECISION),
+    "numbers, booleans, null": ('{"next_agent": "end", "lead_patches": [], "score": -1.5e3, "ok": true, "why": null}',
+                                {"next_agent": "end", "lead_patches": [], "score": -1500.0, "ok": True, "why": None}),
+    "unknown route": ('{"next_agent": "Planner", "message": "plan first"}', None),
+    "truncated": ('{"next_agent": "ApolloAgent", "message": "find lea', None),
+    "no json": ("I think we should research the leads next.", None),
+}
+
+
+def greedy(text: str):
+    """What the old `\\{.*\\}` extraction made of an answer."""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    try:
+        return json.loads(match.group(0) if match else text)
+    except ValueError:
+        return None
+
+
+def check_cases() -> int:
+    errors = []
+    for name, (text, expected) in CASES.items():
+        whole = JSONStreamParser(SUPERVISOR_SCHEMA)
+        whole.feed(text)
+        streamed = JSONStreamParser(SUPERVISOR_SCHEMA)
+        fields = [field for char in text for field in streamed.feed(char)]
+        found = []
+        if whole.result != expected:
+            found.append(f"{name}: parsed {whole.result!r}, expected {expected!r}")
+        if streamed.result != whole.result:
+            found.append(f"{name}: parsed {streamed.result!r} one character at a time")
+        if expected is not None and dict(fields) != expected:
+            found.append(f"{name}: streamed fields {dict(fields)!r}")
+        errors.extend(found)
+        old = "ok" if greedy(text) == expected else "wrong"
+        print(f"{name:<32} {'ok' if not found else 'FAILED':<7} (greedy regex: {old})")
+    for error in errors:
+        print(f"MISMATCH {error}")
+    return len(errors)
+
+
+async def measure(model, prompt: str, schema: dict, stop_after=None) -> dict:
+    """Time to the first field and to a usable answer, streaming vs reading the whole completion first."""
+    started = time.perf_counter()
+    text = ""
+    async for chunk in model.astream(prompt):
+        text += chunk.content
+    full_seconds = time.perf_counter() - started
+    baseline = greedy(text)
+
+    answer = await astream_structured(model, prompt, schema, stop_after=stop_after, native_fallback=False)
+    return {"full": full_seconds, "route": answer.first_field_seconds, "answer": answer.seconds, "via": answer.via,
+            "same": baseline is None or all(baseline.get(key) == value for key, value in answer.value.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the streaming JSON parser and measure early routing")
+    parser.add_argument("--chunk-chars", type=int, default=8)
+    parser.add_argument("--chunk-latency", type=float, default=0.01, help="Seconds between streamed chunks")
+    parser.add_argument("--trailing-chars", type=int, default=400, help="Prose the model adds after its JSON")
+    parser.add_argument("--checks-only", action="store_true", help="Only run the parser checks")
+    args = parser.parse_args()
+
+    mismatches = check_cases()
+    if mismatches or args.checks_only:
+        sys.exit(1 if mismatches else 0)
+
+    trailing = "\n\n" + ("Let me explain my reasoning in more detail. " * 100)[:args.trailing_chars]
+    model = ScriptedChatModel(chunk_chars=args.chunk_chars, chunk_latency=args.chunk_latency, trailing_text=trailing)
+    researched = {"lead_id": "lead-1", "email": "a@b.example", "company details": "Rugged PCs", "company name": "Acme"}
+    runs = {
+        "supervisor -> ResearchAgent": ("You are the Supervisor Agent.\n\nCurrent information_list:\n"
+                                        + json.dumps([{"lead_id": "lead-1", "email": "a@b.example",
+                                                       "company website link": "https://acme.example"}]), None),
+        "supervisor -> end": ("You are the Supervisor Agent.\n\nCurrent information_list:\n"
+                              + json.dumps([{**researched, "personalized email body": "Hi"}]),
+                              lambda name, value: name == "next_agent" and value == "end"),
+        "email": ("You are **EmailAgent**.\n\n**Lead:**\n" + json.dumps(researched), None),
+    }
+    from roleFunctions import EMAIL_SCHEMA
+
+    print()
+    for name, (prompt, stop_after) in runs.items():
+        schema = EMAIL_SCHEMA if name == "email" else SUPERVISOR_SCHEMA
+        result = asyncio.run(measure(model, prompt, schema, stop_after))
+        print(f"{name:<28} full completion {result['full']:.3f}s  first field {result['route']:.3f}s  "
+              f"answer {result['answer']:.3f}s ({result['via']}, {1 - result['answer'] / result['full']:.0%} sooner)  "
+              f"{'same' if result['same'] else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Offline end-to-end benchmark of the main.py workflow.
+
+Starts the stub Playwright MCP server, makes `LLMConfig.llm()` return the
+scripted fake model, and runs the full Supervisor -> ApolloAgent ->
+ResearchAgent -> EmailGenerator graph for each lead count. Reports wall time,
+the time until the first lead was complete, graph hops, LLM and tool calls,
+and memory, and can compare against a saved baseline to catch regressions.
+`--mode pipeline` runs the same stages as a LeadPipeline instead.
+
+    python benchmarks/bench_workflow.py --leads 5 50 500
+    python benchmarks/bench_workflow.py --leads 200 --mode graph pipeline --latency 0.05 --llm-latency 0.2
+    python benchmarks/bench_workflow.py --save baseline.json
+    python benchmarks/bench_workflow.py --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from fake_llm import ScriptedChatModel
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+
+
+def install_fake_llm(latency: float):
+    """Makes `LLMConfig.llm()` return the scripted model for every workflow module imported afterwards."""
+    module = types.ModuleType("LLMConfig")
+    module.llm = lambda: ScriptedChatModel(latency=latency)
+    sys.modules["LLMConfig"] = module
+
+
+async def run_workflow(main, lead_count: int, pool_size: int, work_dir: pathlib.Path, mode: str = "graph") -> dict:
+    """Runs one complete workflow and returns its measurements."""
+    from checkpointing import new_run_id
+    from instrumentation import RunMetrics
+    from lead_index import LeadIndex
+    from lead_sink import LeadSink, lead_is_complete
+    from lead_utils import leads_from_state
+    from mcp_utils import close_session_pools
+    from research_cache import ResearchCache
+
+    class TimedSink(LeadSink):
+        """Notes when the first complete lead reached the output."""
+        first_written = None
+
+        def write(self, lead: dict) -> bool:
+            written = super().write(lead)
+            if written and self.first_written is None:
+                self.first_written = time.perf_counter()
+            return written
+
+    run_id = f"bench-{mode}-{lead_count}-{new_run_id()}"
+    metrics = RunMetrics(run_id)
+    research_cache = ResearchCache(str(work_dir / f"{run_id}-research.sqlite"))
+    lead_index = LeadIndex(str(work_dir / f"{run_id}-lead-index.sqlite"))
+    lead_sink = TimedSink(run_id, output_dir=str(work_dir), parquet=False)
+    try:
+        started = time.perf_counter()
+        final_state = await main.run_agent(
+            main.human_instructions,
+            pool_size=pool_size,
+            research_cache=research_cache,
+            run_id=run_id,
+            checkpoint_path=str(work_dir / f"{run_id}-checkpoints.sqlite"),
+            use_fast_research=False,
+            lead_count=lead_count,
+            lead_sink=lead_sink,
+            metrics=metrics,
+            report_dir=str(work_dir),
+            lead_index=lead_index,
+            pipeline=mode == "pipeline",
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        research_cache.close()
+        lead_index.close()
+        await close_session_pools()
+
+    leads = leads_from_state((final_state or {}).get("information_list"))
+    totals = metrics.totals()
+    return {
+        "mode": mode,
+        "leads": lead_count,
+        "completed": sum(1 for lead in leads if lead_is_complete(lead)),
+        "wall_seconds": round(elapsed, 3),
+        "first_lead_seconds": round(lead_sink.first_written - started, 3) if lead_sink.first_written else None,
+        "hops": sum(stats["runs"] for stats in metrics.nodes.values()),
+        "supervisor_hops": metrics.nodes.get("supervisor", {}).get("runs", 0),
+        "llm_calls": totals["llm_calls"],
+        "tokens": totals["prompt_tokens"] + totals["completion_tokens"],
+        "tool_calls": totals["tool_calls"],
+    }
+
+
+def measure(main, lead_count: int, pool_size: int, work_dir: pathlib.Path, verbose: bool, mode: str = "graph") -> dict:
+    """Runs the workflow under tracemalloc, silencing the workflow's own prints unless `verbose`."""
+    tracemalloc.start()
+    try:
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            result = asyncio.run(run_workflow(main, lead_count, pool_size, work_dir, mode))
+        result["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+    finally:
+        tracemalloc.stop()
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["max_rss_mb"] = round(maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+    return result
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Returns a message for every mode and lead count whose wall time or hops grew past `tolerance`."""
+    baseline = {(entry.get("mode", "graph"), entry["leads"]): entry for entry in json.loads(pathlib.Path(baseline_path).read_text())}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["mode"], result["leads"]))
+        if not before:
+            continue
+        for key in ("wall_seconds", "hops", "llm_calls", "peak_traced_mb"):
+            if before.get(key) and result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{result['mode']} leads={result['leads']}: {key} {before[key]} -> {result[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the lead generation workflow")
+    parser.add_argument("--leads", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--mode", nargs="+", choices=["graph", "pipeline"], default=["graph"],
+                        help="Run the Supervisor graph, the LeadPipeline, or both for every lead count")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds per stub browser tool call")
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="Seconds per fake LLM call")
+    parser.add_argument("--port", type=int, default=8942)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed growth over the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the workflow's own output")
+    args = parser.parse_args()
+
+    work_dir = tempfile.TemporaryDirectory()
+    # Configure the workflow before its modules read their settings at import time
+    os.environ["PLAYWRIGHT_MCP_URL"] = f"http://127.0.0.1:{args.port}/mcp"
+    os.environ["PLAYWRIGHT_STORAGE_STATE"] = str(pathlib.Path(work_dir.name) / "storage_state.json")
+    os.environ["LLM_CACHE_MODE"] = "off"
+    install_fake_llm(args.llm_latency)
+    from bench_research import wait_for_port
+    import main as workflow
+
+    server = subprocess.Popen([
+        sys.executable, str(BENCH_DIR / "stub_mcp_server.py"),
+        "--port", str(args.port), "--latency", str(args.latency),
+    ])
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        results = []
+        for lead_count in args.leads:
+            for mode in args.mode:
+                result = measure(workflow, lead_count, args.pool_size, pathlib.Path(work_dir.name), args.verbose, mode)
+                results.append(result)
+                print(
+                    f"{mode:<8} leads={result['leads']:<5} completed={result['completed']:<5} wall={result['wall_seconds']:.2f}s "
+                    f"first_lead={result['first_lead_seconds']}s "
+                    f"hops={result['hops']:<5} supervisor={result['supervisor_hops']:<3} llm_calls={result['llm_calls']:<5} "
+                    f"tool_calls={result['tool_calls']:<5} tokens={result['tokens']:<8} "
+                    f"peak_traced={result['peak_traced_mb']}MB max_rss={result['max_rss_mb']}MB"
+                )
+    finally:
+        server.terminate()
+        server.wait()
+        work_dir.cleanup()
+
+    if args.save:
+        pathlib.Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"Results saved to {args.save}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
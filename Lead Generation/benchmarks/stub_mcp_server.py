@@ -0,0 +1,121 @@
+"""
+Local stand-in for the Playwright MCP server used by the benchmarks.
+
+It exposes the browser_* tools the agents call and answers them with canned
+page content after a fixed delay, so runs are repeatable without a browser.
+app.apollo.io URLs show a People search with `--apollo-results` synthetic
+people (see apollo_pages.py): "Next page" and "Access email" can be
+clicked, and the page's search response can be read with browser_evaluate.
+
+    python benchmarks/stub_mcp_server.py --port 8940 --latency 0.5 --apollo-results 1000
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import urlparse
+from mcp.server.fastmcp import Context, FastMCP
+from apollo_pages import PAGE_SIZE, people, people_json, people_snapshot, tool_result
+
+
+def build_server(host: str, port: int, latency: float, apollo_results: int = 1000) -> FastMCP:
+    """Creates the stub server; every tool call sleeps `latency` seconds to mimic page loads."""
+    server = FastMCP("stub-playwright", host=host, port=port, log_level="WARNING")
+    # Each MCP session gets its own "page", like a separate browser context
+    pages = {}
+    # One Apollo search shared by all sessions; what each session has paged to and unlocked is its own
+    apollo_people = people(7, apollo_results, unique=True)
+    apollo = {}  # session id -> {"page", "revealed", "actions"}
+
+    def apollo_page(ctx: Context, code: str) -> str:
+        state = apollo[id(ctx.session)]
+        start = (state["page"] - 1) * PAGE_SIZE
+        state["actions"] = {}
+        yaml = people_snapshot(state["page"], apollo_results, apollo_people[start:start + PAGE_SIZE],
+                               revealed=state["revealed"], actions=state["actions"])
+        return tool_result(code, f"{pages[id(ctx.session)]}&page={state['page']}", yaml)
+
+    def on_apollo(ctx: Context) -> bool:
+        return (urlparse(pages.get(id(ctx.session), "")).hostname or "") == "app.apollo.io" and id(ctx.session) in apollo
+
+    @server.tool()
+    async def browser_navigate(url: str, ctx: Context) -> str:
+        """Navigate to a URL"""
+        await asyncio.sleep(latency)
+        pages[id(ctx.session)] = url
+        if urlparse(url).hostname == "app.apollo.io":
+            apollo[id(ctx.session)] = {"page": 1, "revealed": set(), "actions": {}}
+            return apollo_page(ctx, f"await page.goto('{url}');")
+        return f"### Page state\n- Page URL: {url}\n- Page Title: {urlparse(url).hostname}"
+
+    @server.tool()
+    async def browser_snapshot(ctx: Context) -> str:
+        """Capture accessibility snapshot of the current page"""
+        await asyncio.sleep(latency)
+        if on_apollo(ctx):
+            return apollo_page(ctx, "")
+        url = pages.get(id(ctx.session), "about:blank")
+        host = urlparse(url).hostname or "example"
+        return (
+            f"### Page state\n- Page URL: {url}\n"
+            "- Page Snapshot:\n```yaml\n"
+            f"- heading \"{host} builds industrial IoT hardware\" [level=1]\n"
+            "- paragraph: We design rugged edge computers and sensor gateways for factories.\n"
+            "- link \"About us\"\n- link \"Services\"\n```"
+        )
+
+    @server.tool()
+    async def browser_click(element: str, ref: str, ctx: Context) -> str:
+        """Perform click on a web page"""
+        await asyncio.sleep(latency)
+        action = apollo[id(ctx.session)]["actions"].get(ref) if on_apollo(ctx) else None
+        if action is None:
+            return f"Error: ref {ref} not found in the current page snapshot. Capture a new snapshot."
+        state = apollo[id(ctx.session)]
+        if action[0] == "next_page":
+            state["page"] += 1
+        elif action[0] == "previous_page":
+            state["page"] -= 1
+        else:
+            state["revealed"].add(action[1])
+        return apollo_page(ctx, f"await page.getByRole('button', {{ name: '{element}' }}).click();")
+
+    @server.tool()
+    async def browser_tab_new(ctx: Context, url: str = "") -> str:
+        """Open a new tab"""
+        await asyncio.sleep(latency)
+        pages[id(ctx.session)] = url or "about:blank"
+        return f"### Open tabs\n- 0: (current) [{pages[id(ctx.session)]}]"
+
+    @server.tool()
+    async def browser_evaluate(function: str, ctx: Context) -> str:
+        """Evaluate JavaScript expression on page"""
+        url = urlparse(pages.get(id(ctx.session), "about:blank"))
+        if "localStorage.setItem" in function:
+            return '### Result\n"restored"'
+        if "__leadgenApolloPeople" in function:
+            if "window.fetch" in function or not on_apollo(ctx):
+                return '### Result\n"installed"' if "window.fetch" in function else "### Result\nnull"
+            state = apollo[id(ctx.session)]
+            start = (state["page"] - 1) * PAGE_SIZE
+            return "### Result\n" + json.dumps(people_json(state["page"], apollo_results,
+                                                            apollo_people[start:start + PAGE_SIZE], state["revealed"]))
+        origin = f"{url.scheme}://{url.netloc}" if url.netloc else "null"
+        return "### Result\n" + json.dumps({"origin": origin, "cookies": "session=stub", "localStorage": {}}, indent=2)
+
+    @server.tool()
+    async def browser_close(ctx: Context) -> str:
+        """Close the page"""
+        pages.pop(id(ctx.session), None)
+        return "No open tabs."
+
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Playwright MCP server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8940)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each browser tool call takes")
+    parser.add_argument("--apollo-results", type=int, default=1000, help="People in the Apollo search results")
+    args = parser.parse_args()
+    build_server(args.host, args.port, args.latency, args.apollo_results).run(transport="streamable-http")
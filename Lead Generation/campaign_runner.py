@@ -0,0 +1,183 @@
+"""
+Runs many lead generation campaigns concurrently in one process.
+
+Each campaign spec is a JSON file like overall_executional_steps.json; its
+text becomes the run's instructions. A spec may instead be an object with
+"instructions" (list or text) plus optional "name" and "lead_count". All
+campaigns share the warm Playwright session pool, the research cache, the
+lead index and one LLM concurrency budget.
+
+    python cli.py batch campaigns/ --concurrency 4 --llm-concurrency 8
+"""
+import asyncio
+import json
+import os
+import pathlib
+import time
+from checkpointing import new_run_id
+from lead_index import LeadIndex
+from lead_sink import LEAD_OUTPUT_DIR, LeadSink
+from llm_budget import LLM_MAX_CONCURRENCY, LLMBudget
+from main import LEAD_COUNT, run_agent
+from mcp_utils import PLAYWRIGHT_POOL_SIZE, close_session_pools, get_session_pool
+from research_cache import ResearchCache
+from resources import get_mcp_client
+
+# Default share of the batch's LLM budget per concurrent campaign, when LLM_MAX_CONCURRENCY is unset
+BATCH_LLM_CONCURRENCY_PER_CAMPAIGN = int(os.getenv("BATCH_LLM_CONCURRENCY_PER_CAMPAIGN", "4"))
+
+
+def load_campaigns(paths: list) -> list:
+    """Reads campaign specs from files and directories of *.json files, in name order."""
+    files = []
+    for path in map(pathlib.Path, paths):
+        files.extend(sorted(path.glob("*.json")) if path.is_dir() else [path])
+
+    campaigns = []
+    for file in files:
+        try:
+            text = file.read_text(encoding="utf-8")
+            spec = json.loads(text)
+        except Exception as e:
+            print(f"Error reading campaign {file}: {e}")
+            continue
+        campaign = {"name": file.stem, "instructions": text, "lead_count": LEAD_COUNT}
+        if isinstance(spec, dict) and "instructions" in spec:
+            instructions = spec["instructions"]
+            campaign.update({
+                "name": spec.get("name", file.stem),
+                "instructions": instructions if isinstance(instructions, str) else json.dumps(instructions, indent=2),
+                "lead_count": int(spec.get("lead_count", LEAD_COUNT)),
+            })
+        campaigns.append(campaign)
+    return campaigns
+
+
+class BatchStatus:
+    """Per-campaign status of a batch, rewritten atomically to `batch_status.json` on every change."""
+
+    def __init__(self, output_dir: pathlib.Path, campaigns: list):
+        self.path = output_dir / "batch_status.json"
+        self.started = time.time()
+        self.campaigns = {
+            campaign["name"]: {"status": "queued", "run_id": None, "leads": 0, "seconds": None, "error": None}
+            for campaign in campaigns
+        }
+        self.save()
+
+    def update(self, name: str, **fields):
+        self.campaigns[name].update(fields)
+        self.save()
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"started_at": self.started, "campaigns": self.campaigns}, indent=2))
+        os.replace(tmp_path, self.path)
+
+    def summary(self, extra: dict = None) -> dict:
+        elapsed = time.time() - self.started
+        states = [entry["status"] for entry in self.campaigns.values()]
+        leads = sum(entry["leads"] for entry in self.campaigns.values())
+        return {
+            "campaigns": len(states),
+            "done": states.count("done"),
+            "failed": states.count("failed"),
+            "leads": leads,
+            "wall_seconds": round(elapsed, 1),
+            "leads_per_minute": round(leads * 60 / elapsed, 2) if elapsed else 0.0,
+            **(extra or {}),
+        }
+
+
+async def run_campaign(campaign: dict, output_dir: pathlib.Path, status: BatchStatus, shared: dict,
+                       pool_size: int, excel: bool):
+    """Runs one campaign with its own outputs and checkpoint thread, on the shared resources."""
+    name = campaign["name"]
+    run_id = f"{name}-{new_run_id()}"
+    campaign_dir = output_dir / name
+    lead_sink = LeadSink(run_id, output_dir=str(campaign_dir))
+    status.update(name, status="running", run_id=run_id)
+    started = time.perf_counter()
+    try:
+        final_state = await run_agent(
+            campaign["instructions"],
+            pool_size=pool_size,
+            research_cache=shared["research_cache"],
+            lead_index=shared["lead_index"],
+            llm_budget=shared["llm_budget"],
+            run_id=run_id,
+            lead_count=campaign["lead_count"],
+            lead_sink=lead_sink,
+            excel_path=str(campaign_dir / f"{name}.xlsx") if excel else None,
+            report_dir=str(campaign_dir),
+        )
+        error = None if final_state is not None else "run ended with an error, see the log"
+    except Exception as e:
+        print(f"Error running campaign {name}: {e}")
+        error = str(e)
+    status.update(
+        name,
+        status="failed" if error else "done",
+        leads=len(lead_sink.written_ids),
+        seconds=round(time.perf_counter() - started, 1),
+        error=error,
+    )
+
+
+async def run_batch(paths: list, output_dir: str = LEAD_OUTPUT_DIR, concurrency: int = 4,
+                    pool_size: int = PLAYWRIGHT_POOL_SIZE, llm_concurrency: int = None,
+                    excel: bool = False) -> dict:
+    """
+    Runs every campaign found in `paths` with at most `concurrency` at a time; returns the batch summary.
+
+    All campaigns share one budget of `llm_concurrency` model calls in flight
+    (0 = unlimited). It defaults to LLM_MAX_CONCURRENCY, or when that is
+    unlimited to BATCH_LLM_CONCURRENCY_PER_CAMPAIGN per concurrent campaign,
+    so a batch never runs without a cap unless asked to.
+    """
+    if llm_concurrency is None:
+        llm_concurrency = LLM_MAX_CONCURRENCY or BATCH_LLM_CONCURRENCY_PER_CAMPAIGN * max(1, concurrency)
+    campaigns = load_campaigns(paths)
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    status = BatchStatus(output_dir, campaigns)
+
+    shared = {"research_cache": None, "lead_index": None, "llm_budget": LLMBudget(llm_concurrency)}
+    try:
+        shared["research_cache"] = ResearchCache()
+        shared["lead_index"] = LeadIndex()
+    except Exception as e:
+        print(f"Error opening shared caches: {e}")
+
+    queue = asyncio.Queue()
+    for campaign in campaigns:
+        queue.put_nowait(campaign)
+
+    async def worker():
+        while not queue.empty():
+            campaign = queue.get_nowait()
+            await run_campaign(campaign, output_dir, status, shared, pool_size, excel)
+
+    try:
+        try:
+            # Open the shared browser sessions once, before the campaigns start leasing them
+            await get_session_pool(get_mcp_client(), size=pool_size)
+        except Exception as e:
+            print(f"Error starting Playwright MCP sessions: {e}")
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(campaigns))))))
+    finally:
+        await close_session_pools()
+        for resource in (shared["research_cache"], shared["lead_index"]):
+            if resource is not None:
+                resource.close()
+
+    summary = status.summary({"llm_budget": shared["llm_budget"].stats()})
+    (output_dir / "batch_summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    # Same as `python cli.py batch ...`
+    import sys
+    from cli import main as cli_main
+    sys.exit(cli_main(["batch", *sys.argv[1:]]))
@@ -0,0 +1,45 @@
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+# SQLite file holding a GraphState checkpoint after every node
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "workflow_checkpoints.sqlite")
+
+
+def new_run_id() -> str:
+    """Returns a sortable, unique id for a workflow run, e.g. '20250101-120000-1a2b3c'."""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def run_config(run_id: str, recursion_limit: int = 1000) -> dict:
+    """LangGraph config that stores the run's checkpoints under its run id."""
+    return {"recursion_limit": recursion_limit, "configurable": {"thread_id": run_id}}
+
+
+@asynccontextmanager
+async def open_checkpointer(path: str = CHECKPOINT_PATH):
+    """
+    Opens the SQLite checkpointer. WAL journaling with synchronous=NORMAL keeps
+    each per-node write to an append plus a cheap commit, without a full fsync.
+    """
+    conn = await aiosqlite.connect(path)
+    try:
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        yield AsyncSqliteSaver(conn)
+    finally:
+        await conn.close()
+
+
+async def resume_point(app, config: dict):
+    """
+    Returns (last completed step, nodes that will run next) for a checkpointed
+    run, or None if the run has no checkpoint or has already finished.
+    """
+    snapshot = await app.aget_state(config)
+    if not snapshot.values or not snapshot.next:
+        return None
+    return (snapshot.metadata or {}).get("step"), list(snapshot.next)
@@ -0,0 +1,123 @@
+"""
+Command line entry point for the lead generation workflow.
+
+    python cli.py run --leads 10 --live-metrics
+    python cli.py run --resume 20250101-120000-1a2b3c
+    python cli.py run --leads 200 --pipeline
+    python cli.py batch campaigns/ --concurrency 4 --llm-concurrency 8
+
+Only the standard library is imported until a command actually runs, so
+`--help` and argument errors return immediately; the workflow modules, the
+LLM client and the MCP client are loaded after the arguments are parsed.
+Options left unset fall back to the environment settings the workflow
+modules read (LEAD_COUNT, CHECKPOINT_PATH, RUN_REPORT_DIR, ...).
+"""
+import argparse
+import asyncio
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="leadgen", description="Find, research and email business leads")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the workflow once", description="Run the lead generation workflow")
+    run.add_argument("--run-id", help="Id to checkpoint this run under (generated if omitted)")
+    run.add_argument("--resume", metavar="RUN_ID", help="Resume a checkpointed run from its last completed node")
+    run.add_argument("--checkpoint-db", help="SQLite file holding run checkpoints (default: $CHECKPOINT_PATH)")
+    run.add_argument("--leads", type=int, help="Number of leads to find and contact (default: $LEAD_COUNT)")
+    run.add_argument("--instructions", help="JSON file with the run's instructions (default: overall_executional_steps.json)")
+    run.add_argument("--excel", default="leads_data.xlsx", help="Excel file exported at the end of the run")
+    run.add_argument("--no-excel", action="store_true", help="Only write the streamed JSONL/CSV/Parquet outputs")
+    run.add_argument("--live-metrics", action="store_true", help="Print node timings, tokens and tool calls after every step")
+    run.add_argument("--report-dir", help="Directory for the JSON and Prometheus run reports (default: $RUN_REPORT_DIR)")
+    run.add_argument("--pipeline", action="store_true", default=None,
+                     help="Run Apollo, research and email as concurrent stages instead of the Supervisor graph "
+                          "(default: $PIPELINE_MODE)")
+
+    batch = commands.add_parser("batch", help="Run several campaigns concurrently",
+                                description="Run several lead generation campaigns concurrently")
+    batch.add_argument("specs", nargs="+", help="Campaign spec files or directories of *.json specs")
+    batch.add_argument("--output-dir", help="Where per-campaign outputs and the batch status go (default: $LEAD_OUTPUT_DIR)")
+    batch.add_argument("--concurrency", type=int, default=4, help="Campaigns running at the same time")
+    batch.add_argument("--pool-size", type=int, help="Browser sessions shared by all campaigns (default: $PLAYWRIGHT_POOL_SIZE)")
+    batch.add_argument("--llm-concurrency", type=int,
+                       help="LLM calls in flight across all campaigns, 0 = unlimited "
+                            "(default: $LLM_MAX_CONCURRENCY, else $BATCH_LLM_CONCURRENCY_PER_CAMPAIGN per concurrent campaign)")
+    batch.add_argument("--excel", action="store_true", help="Also export an Excel file per campaign")
+    return parser
+
+
+def given(**options) -> dict:
+    """Keeps only the options set on the command line, so the rest use the workflow's own defaults."""
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def run_command(args) -> int:
+    import pathlib
+    import main as workflow
+    from mcp_utils import close_session_pools
+
+    instructions = workflow.human_instructions
+    if args.instructions:
+        try:
+            instructions = pathlib.Path(args.instructions).read_text()
+        except Exception as e:
+            print(f"Error reading instructions {args.instructions}: {e}")
+            return 1
+
+    async def run():
+        try:
+            return await workflow.run_agent(
+                instructions,
+                run_id=args.resume or args.run_id,
+                resume=bool(args.resume),
+                excel_path=None if args.no_excel else args.excel,
+                live_metrics=args.live_metrics,
+                **given(checkpoint_path=args.checkpoint_db, lead_count=args.leads, report_dir=args.report_dir,
+                        pipeline=args.pipeline),
+            )
+        finally:
+            # Close the warm browser sessions, saving any signed-in storage state
+            await close_session_pools()
+
+    try:
+        final_state = asyncio.run(run())
+    except Exception as e:
+        print(f"Error running main async function: {e}")
+        return 1
+    print("final state ->", final_state, "\n")
+
+    # Leads were streamed to disk during the run; the Excel file is exported from that output at the end
+    if final_state and final_state.get("excel_path"):
+        print(f"✅ Excel file '{final_state['excel_path']}' created with all values as strings!")
+    elif not args.no_excel:
+        print(f"Excel file '{args.excel}' was not created, see the errors above.")
+    return 0 if final_state is not None else 1
+
+
+def batch_command(args) -> int:
+    from campaign_runner import run_batch
+
+    summary = asyncio.run(run_batch(
+        args.specs,
+        concurrency=args.concurrency,
+        excel=args.excel,
+        **given(output_dir=args.output_dir, pool_size=args.pool_size, llm_concurrency=args.llm_concurrency),
+    ))
+    print(
+        f"Batch: {summary['done']}/{summary['campaigns']} campaigns done, {summary['failed']} failed, "
+        f"{summary['leads']} leads in {summary['wall_seconds']}s ({summary['leads_per_minute']} leads/min), "
+        f"LLM budget {summary['llm_budget']}"
+    )
+    return 1 if summary["failed"] else 0
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    commands = {"run": run_command, "batch": batch_command}
+    return commands[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import os
+import time
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from llm_budget import ainvoke_with_retry
+
+# Fold older messages into long_term_summary once the history is estimated above this many tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Most recent messages every node still sees verbatim after a compaction
+CONTEXT_KEEP_RECENT = int(os.getenv("CONTEXT_KEEP_RECENT", "4"))
+# Upper bound on long_term_summary
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "500"))
+# "llm" asks the model to merge old messages into the summary, "extractive" keeps a clipped line per message
+CONTEXT_SUMMARY_MODE = os.getenv("CONTEXT_SUMMARY_MODE", "llm")
+
+# Characters of one message kept by the extractive summary
+_LINE_CHARS = 240
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count at ~4 characters per token, as in the run reports."""
+    return len(text if isinstance(text, str) else str(text)) // 4
+
+
+def _role(message) -> str:
+    return "Task" if isinstance(message, HumanMessage) else "Agent" if isinstance(message, AIMessage) else message.type
+
+
+def _text(message) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def render_history(messages: list) -> str:
+    """The message history as one `role: text` line per message, for prompts that embed it as text."""
+    return "\n".join(f"{_role(message)}: {_text(message)}" for message in messages)
+
+
+def context_messages(messages: list, summary: str = None) -> list:
+    """
+    What a node should send its model: the task (the run's first message),
+    the rolling summary of everything compacted so far, then the recent turns.
+    """
+    if not summary:
+        return list(messages)
+    note = HumanMessage(content=f"Summary of the earlier steps of this run:\n{summary}")
+    if messages and isinstance(messages[0], HumanMessage):
+        return [messages[0], note] + list(messages[1:])
+    return [note] + list(messages)
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Keeps the end of `text` within `max_tokens`; the latest steps matter most."""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    return "..." + text[len(text) - limit + 3:]
+
+
+class ContextStats:
+    """How often the history was compacted and how much it shrank."""
+
+    def __init__(self):
+        self.checks = 0
+        self.compactions = 0
+        self.folded_messages = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.max_tokens = 0
+        self.summary_calls = 0
+        self.summary_errors = 0
+        self.seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "compactions": self.compactions,
+            "folded_messages": self.folded_messages,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "max_history_tokens": self.max_tokens,
+            "summary_calls": self.summary_calls,
+            "summary_errors": self.summary_errors,
+            "seconds": round(self.seconds, 3),
+        }
+
+    def summary(self) -> str:
+        return (f"Context: {self.compactions} compactions folded {self.folded_messages} messages "
+                f"({self.tokens_before} -> {self.tokens_after} tokens), largest history {self.max_tokens} tokens")
+
+
+class ContextCompactor:
+    """
+    Keeps the shared message history within a token budget.
+
+    Once the task, the summary and the messages are estimated above
+    `token_budget` tokens, every message but the task and the last
+    `keep_recent` ones is folded into the rolling summary, which is itself
+    capped at `summary_max_tokens`. The history a node sees is therefore
+    bounded however many Supervisor loops a run takes. In "llm" mode the
+    model rewrites the summary with the folded messages; in "extractive"
+    mode, or when that call fails, a clipped line per message is appended.
+    """
+
+    def __init__(self, model=None, token_budget: int = CONTEXT_TOKEN_BUDGET, keep_recent: int = CONTEXT_KEEP_RECENT,
+                 summary_max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS, mode: str = CONTEXT_SUMMARY_MODE):
+        self.model = model
+        self.token_budget = token_budget
+        self.keep_recent = max(1, keep_recent)
+        self.summary_max_tokens = summary_max_tokens
+        self.mode = mode if model is not None else "extractive"
+        self.stats = ContextStats()
+
+    def history_tokens(self, messages: list, summary: str = None) -> int:
+        return sum(estimate_tokens(_text(message)) for message in messages) + estimate_tokens(summary or "")
+
+    async def compact(self, messages: list, summary: str = None):
+        """Returns (messages, summary), compacted if the history is over budget."""
+        self.stats.checks += 1
+        tokens = self.history_tokens(messages, summary)
+        self.stats.max_tokens = max(self.stats.max_tokens, tokens)
+        if self.token_budget <= 0 or tokens <= self.token_budget:
+            return messages, summary
+
+        pinned = messages[:1] if messages and isinstance(messages[0], HumanMessage) else []
+        rest = messages[len(pinned):]
+        # Fold at least down to keep_recent, and further while the recent turns alone break the budget
+        keep = min(self.keep_recent, len(rest))
+        while keep > 1 and self.history_tokens(pinned + rest[-keep:]) + self.summary_max_tokens > self.token_budget:
+            keep -= 1
+        folded, recent = rest[:len(rest) - keep], rest[len(rest) - keep:]
+        if not folded:
+            return messages, summary
+
+        started = time.perf_counter()
+        summary = await self._fold(summary, folded)
+        compacted = pinned + recent
+        self.stats.seconds += time.perf_counter() - started
+        self.stats.compactions += 1
+        self.stats.folded_messages += len(folded)
+        self.stats.tokens_before += tokens
+        self.stats.tokens_after += self.history_tokens(compacted, summary)
+        return compacted, summary
+
+    async def _fold(self, summary: str, folded: list) -> str:
+        if self.mode == "llm":
+            self.stats.summary_calls += 1
+            try:
+                response = await ainvoke_with_retry(self.model, [HumanMessage(content=self._prompt(summary, folded))])
+                text = _text(response).strip()
+                if text:
+                    return _clip(text, self.summary_max_tokens)
+                raise ValueError("empty summary")
+            except Exception as e:
+                self.stats.summary_errors += 1
+                print(f"Error summarizing the message history, keeping clipped lines instead: {e}")
+        lines = [f"- {_role(message)}: {' '.join(_text(message).split())[:_LINE_CHARS]}" for message in folded]
+        return _clip("\n".join(([summary] if summary else []) + lines), self.summary_max_tokens)
+
+    def _prompt(self, summary: str, folded: list) -> str:
+        words = self.summary_max_tokens * 3 // 4
+        return (
+            "You maintain the running summary of a lead generation run in which a Supervisor directs an ApolloAgent "
+            "(finds leads), a ResearchAgent (researches company websites) and an EmailGenerator.\n\n"
+            f"Merge the earlier summary and the messages below into one updated summary of at most {words} words. "
+            "Keep what each agent did and how it went, lead counts, failures still worth retrying, filters and "
+            "instructions that still apply. Leave out individual lead details; the lead list is kept separately. "
+            "Answer with the summary text only.\n\n"
+            f"**Earlier summary:**\n{summary or '(none)'}\n\n"
+            f"**Messages to fold in:**\n{render_history(folded)}"
+        )
+
+
+def compaction_node_factory(compactor: ContextCompactor) -> RunnableLambda:
+    """Creates the node that compacts subgraph_messages into long_term_summary before every Supervisor turn."""
+
+    async def compact_context(state: dict) -> dict:
+        messages = state.get("subgraph_messages", [])
+        summary = state.get("long_term_summary")
+        try:
+            compacted, summary = await compactor.compact(messages, summary)
+        except Exception as e:
+            print(f"Error compacting the message history: {e}")
+            return {}
+        if compacted is messages:
+            return {}
+        print(f"Context: folded {len(messages) - len(compacted)} messages into the run summary\n")
+        return {"subgraph_messages": compacted, "long_term_summary": summary}
+
+    return RunnableLambda(compact_context)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+import httpx
+from langchain_core.messages import HumanMessage
+from lead_utils import extract_json, lead_value, normalize_domain
+from llm_budget import ainvoke_with_retry
+
+# Limits for the HTTP fast path
+FAST_RESEARCH_TIMEOUT = float(os.getenv("FAST_RESEARCH_TIMEOUT", "10"))
+FAST_RESEARCH_MAX_CONNECTIONS = int(os.getenv("FAST_RESEARCH_MAX_CONNECTIONS", "20"))
+FAST_RESEARCH_MIN_TEXT = int(os.getenv("FAST_RESEARCH_MIN_TEXT", "400"))   # Less visible text than this suggests a JS-rendered page
+FAST_RESEARCH_PAGE_CHARS = int(os.getenv("FAST_RESEARCH_PAGE_CHARS", "3000"))  # Text kept per page in the summary prompt
+
+# Link text / paths worth following from the homepage, in priority order
+FOLLOW_KEYWORDS = {
+    "about": ("about", "company", "who-we-are", "who we are", "overview"),
+    "services": ("services", "solutions", "products", "what-we-do", "what we do", "offerings"),
+}
+
+# Markers of bot walls, CAPTCHAs and pages that only render with JavaScript
+BLOCK_MARKERS = ("captcha", "cf-challenge", "just a moment...", "attention required", "are you a robot",
+                 "access denied", "verify you are human")
+JS_MARKERS = ("enable javascript", "javascript is required", "you need to enable javascript")
+
+_SKIP_TAGS = {"script", "style", "noscript", "svg", "nav", "footer", "header", "form", "template", "iframe"}
+
+
+class PageTextExtractor(HTMLParser):
+    """Collects a page's title, visible main text and links, skipping navigation and scripts."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.links = []  # (href, link text)
+        self.script_count = 0
+        self._chunks = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._href = None
+        self._link_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script":
+            self.script_count += 1
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            self._href = dict(attrs).get("href")
+            self._link_text = []
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag == "a" and self._href:
+            self.links.append((self._href, " ".join(self._link_text).strip()))
+            self._href = None
+
+    def handle_data(self, data):
+        text = " ".join(data.split())
+        if not text:
+            return
+        if self._in_title:
+            self.title += text
+        if self._href is not None:
+            self._link_text.append(text)
+        if not self._skip_depth and not self._in_title:
+            self._chunks.append(text)
+
+    @property
+    def text(self) -> str:
+        return " ".join(self._chunks)
+
+
+def extract_page(html: str) -> PageTextExtractor:
+    """Parses an HTML document into its title, visible text and links."""
+    extractor = PageTextExtractor()
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except Exception as e:
+        print(f"Error parsing HTML: {e}")
+    return extractor
+
+
+def pick_follow_links(base_url: str, links: list) -> list:
+    """Chooses the most likely About and Services pages on the same site."""
+    domain = normalize_domain(base_url)
+    chosen = []
+    for keywords in FOLLOW_KEYWORDS.values():
+        for href, text in links:
+            url = urljoin(base_url, href).split("#")[0]
+            if not url.startswith("http") or normalize_domain(url) != domain or url in chosen:
+                continue
+            haystack = f"{urlparse(url).path} {text}".lower()
+            if any(keyword in haystack for keyword in keywords):
+                chosen.append(url)
+                break
+    return chosen
+
+
+def blocked_reason(status: int, html: str, page: PageTextExtractor):
+    """Returns why a page needs the real browser (blocked, CAPTCHA, JS-rendered), or None."""
+    if status >= 400:
+        return f"HTTP {status}"
+    lowered = html[:20000].lower()
+    if any(marker in lowered for marker in BLOCK_MARKERS):
+        return "bot protection / CAPTCHA"
+    if len(page.text) < FAST_RESEARCH_MIN_TEXT:
+        if page.script_count or any(marker in lowered for marker in JS_MARKERS):
+            return "JavaScript-rendered page"
+        return "too little text"
+    return None
+
+
+class FastResearcher:
+    """
+    Researches a company over plain HTTP: fetches the homepage and its likely
+    About and Services pages with a pooled client, extracts the main text
+    locally and summarizes it in a single LLM call. Returns None when the site
+    needs the Playwright ResearchAgent instead.
+    """
+
+    def __init__(self, model, client: httpx.AsyncClient = None, timeout: float = FAST_RESEARCH_TIMEOUT,
+                 max_connections: int = FAST_RESEARCH_MAX_CONNECTIONS):
+        self.model = model
+        self.client = client or httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"User-Agent": "Mozilla/5.0 (compatible; LeadResearch/1.0)"},
+        )
+        self.researched = 0
+        self.fallbacks = {}
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def fetch(self, url: str):
+        """Returns (status, final url, html) for a page; status 0 on a network error."""
+        try:
+            response = await self.client.get(url)
+            content_type = response.headers.get("content-type", "")
+            html = response.text if "html" in content_type or not content_type else ""
+            return response.status_code, str(response.url), html
+        except httpx.HTTPError as e:
+            print(f"Error fetching {url}: {e}")
+            return 0, url, ""
+
+    def _fallback(self, website: str, reason: str):
+        print(f"Fast research fallback for {website}: {reason}")
+        self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        return None
+
+    async def research(self, lead: dict):
+        """Returns the research fields for a lead, or None to fall back to the browser."""
+        website = lead_value(lead, "company website link")
+        if "://" not in website:
+            website = "https://" + website
+
+        status, final_url, html = await self.fetch(website)
+        if status == 0:
+            return self._fallback(website, "network error")
+        homepage = extract_page(html)
+        reason = blocked_reason(status, html, homepage)
+        if reason:
+            return self._fallback(website, reason)
+
+        # Fetch the About / Services pages concurrently; ones that fail are simply left out
+        pages = [(final_url, homepage)]
+        follow = pick_follow_links(final_url, homepage.links)
+        for url, (sub_status, _, sub_html) in zip(follow, await asyncio.gather(*(self.fetch(url) for url in follow))):
+            sub_page = extract_page(sub_html)
+            if 0 < sub_status < 400 and sub_page.text:
+                pages.append((url, sub_page))
+
+        try:
+            updates = await self.summarize(lead, pages)
+        except Exception as e:
+            print(f"Error summarizing {website}: {e}")
+            return self._fallback(website, "summary failed")
+        self.researched += 1
+        return updates
+
+    async def summarize(self, lead: dict, pages: list) -> dict:
+        """One compact LLM call over the extracted page text."""
+        website_text = "\n\n".join(
+            f"[{url}] {page.title}\n{page.text[:FAST_RESEARCH_PAGE_CHARS]}" for url, page in pages
+        )
+        prompt = (
+            "You are **ResearchAgent**, a professional business research analyst for a hardware computer store.\n\n"
+            f"Company: {lead_value(lead, 'company name')}\n"
+            f"Known company type: {lead_value(lead, 'company type') or 'unknown'}\n\n"
+            "**Website text:**\n"
+            f"{website_text}\n\n"
+            "Using only the text above, summarize the company overview, key products or services, industry focus, "
+            "technology or IT usage, and how our hardware/computer solutions could help, in 2–4 lines. "
+            "Never invent details.\n\n"
+            "**Output Format:**\n"
+            "{\"company_details\": \"<2–4 line summary>\", \"company_type\": \"<e.g. SaaS, FinTech, IT Services>\"}"
+        )
+        response = await ainvoke_with_retry(self.model, [HumanMessage(content=prompt)])
+        parsed = json.loads(extract_json(response.content))
+        details = str(parsed.get("company_details", "")).strip()
+        if not details:
+            raise ValueError("empty company_details")
+        updates = {"company details": details, "website_inaccessible": False, "security_error": False}
+        if parsed.get("company_type"):
+            updates["company type"] = str(parsed["company_type"])
+        return updates
+
+    def stats(self) -> dict:
+        return {"researched": self.researched, "fallbacks": dict(self.fallbacks)}
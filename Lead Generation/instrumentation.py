@@ -0,0 +1,286 @@
+import json
+import os
+import pathlib
+import time
+from langchain_core.callbacks import BaseCallbackHandler, adispatch_custom_event
+
+# Where the end-of-run JSON and Prometheus reports are written
+RUN_REPORT_DIR = os.getenv("RUN_REPORT_DIR", "run_reports")
+
+# Custom callback event raised by nodes that retry work themselves
+RETRY_EVENT = "lead_generation_retry"
+
+
+async def record_retry(reason: str, **details):
+    """Reports a node-level retry to the run's RunMetrics; a no-op outside a graph run."""
+    try:
+        await adispatch_custom_event(RETRY_EVENT, {"reason": reason, **details})
+    except Exception:
+        pass
+
+
+def _payload_size(value) -> int:
+    try:
+        return len(value if isinstance(value, str) else json.dumps(value, default=str))
+    except Exception:
+        return len(str(value))
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _token_usage(response):
+    """Returns (prompt tokens, completion tokens) from an LLMResult, whichever way the provider reports them."""
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += usage.get("input_tokens", 0)
+            completion_tokens += usage.get("output_tokens", 0)
+    if not prompt_tokens and not completion_tokens:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+class RunMetrics(BaseCallbackHandler):
+    """
+    Callback handler that records where a workflow run spends its time.
+
+    Pass it in the graph config's callbacks; it follows LangChain's run tree
+    so every LLM call and MCP tool call, including those made inside the
+    ReAct agents, is attributed to the top-level graph node that caused it.
+    Per node it keeps wall time, runs, LLM calls and tokens, tool calls,
+    errors, payload sizes and retries; per hop (graph step) the nodes that
+    ran and the tokens they used.
+    """
+
+    run_inline = True
+
+    def __init__(self, run_id: str = ""):
+        self.run_id = run_id
+        self.started = time.time()
+        self.nodes = {}
+        self.tools = {}
+        self.hops = {}          # Graph step -> nodes that ran and the tokens they used
+        self._run_node = {}     # LangChain run id -> graph node
+        self._run_step = {}     # LangChain run id -> graph step
+        self._summarized_tokens = 0
+        self._open = {}         # run id -> (kind, name, node, start time, payload size)
+        self._finished = []     # Node runs finished since the last step summary
+
+    # Aggregation helpers
+
+    def _node_stats(self, node: str) -> dict:
+        return self.nodes.setdefault(node or "<graph>", {
+            "runs": 0, "seconds": 0.0, "errors": 0, "retries": 0,
+            "llm_calls": 0, "llm_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+            "prompt_bytes": 0, "completion_bytes": 0, "tool_calls": 0, "tool_seconds": 0.0,
+        })
+
+    def _tool_stats(self, node: str, tool: str) -> dict:
+        return self.tools.setdefault(f"{node or '<graph>'}/{tool}", {
+            "node": node or "<graph>", "tool": tool, "calls": 0, "errors": 0, "seconds": 0.0,
+            "input_bytes": 0, "output_bytes": 0,
+        })
+
+    def _hop(self, step) -> dict:
+        return self.hops.setdefault(step, {"step": step, "nodes": [], "llm_calls": 0, "prompt_tokens": 0,
+                                           "completion_tokens": 0})
+
+    def _start(self, kind, name, run_id, parent_run_id, metadata, payload=0):
+        parent_node = self._run_node.get(parent_run_id)
+        node = parent_node or (metadata or {}).get("langgraph_node")
+        self._run_node[run_id] = node
+        # Calls inside a ReAct agent belong to the outer graph's step, not to the agent's own steps
+        step = self._run_step.get(parent_run_id) if parent_node else (metadata or {}).get("langgraph_step")
+        self._run_step[run_id] = step
+        # A graph node's own run: assigned from metadata rather than inherited
+        if kind == "chain":
+            kind = "node" if parent_node is None and node and name == node and not node.startswith("__") else None
+            if kind and step is not None:
+                self._hop(step)["nodes"].append(node)
+        if kind:
+            self._open[run_id] = (kind, name, node, time.perf_counter(), payload)
+
+    def _end(self, run_id, error=False, output=None, response=None):
+        self._run_node.pop(run_id, None)
+        step = self._run_step.pop(run_id, None)
+        opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        kind, name, node, started, payload = opened
+        seconds = time.perf_counter() - started
+        stats = self._node_stats(node)
+        if kind == "node":
+            stats["runs"] += 1
+            stats["seconds"] += seconds
+            stats["errors"] += int(error)
+            self._finished.append((node, seconds))
+        elif kind == "llm":
+            stats["llm_calls"] += 1
+            stats["llm_seconds"] += seconds
+            stats["prompt_bytes"] += payload
+            if response is not None:
+                prompt_tokens, completion_tokens = _token_usage(response)
+                stats["prompt_tokens"] += prompt_tokens
+                stats["completion_tokens"] += completion_tokens
+                if step is not None:
+                    hop = self._hop(step)
+                    hop["llm_calls"] += 1
+                    hop["prompt_tokens"] += prompt_tokens
+                    hop["completion_tokens"] += completion_tokens
+                stats["completion_bytes"] += sum(len(g.text or "") for gens in response.generations for g in gens)
+            stats["errors"] += int(error)
+        elif kind == "tool":
+            stats["tool_calls"] += 1
+            stats["tool_seconds"] += seconds
+            tool = self._tool_stats(node, name)
+            tool["calls"] += 1
+            tool["errors"] += int(error)
+            tool["seconds"] += seconds
+            tool["input_bytes"] += payload
+            tool["output_bytes"] += _payload_size(getattr(output, "content", output)) if output is not None else 0
+
+    # LangChain callbacks
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start("chain", kwargs.get("name") or (serialized or {}).get("name"), run_id, parent_run_id, metadata)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # LangGraph control flow (e.g. interrupts) is raised as an exception but is not a failure
+        self._end(run_id, error=not type(error).__module__.startswith("langgraph"))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        size = sum(_payload_size(message.content) for batch in messages for message in batch)
+        self._start("llm", "chat_model", run_id, parent_run_id, metadata, size)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start("llm", "llm", run_id, parent_run_id, metadata, sum(len(prompt) for prompt in prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, response=response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        # A stream the caller closed once it had what it needed ends with GeneratorExit; that is not a failure
+        closed = isinstance(error, GeneratorExit)
+        self._end(run_id, error=not closed, response=kwargs.get("response") if closed else None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._start("tool", name, run_id, parent_run_id, metadata, _payload_size(input_str))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output=output)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        self._node_stats(self._run_node.get(run_id))["retries"] += 1
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        if name == RETRY_EVENT:
+            self._node_stats(self._run_node.get(run_id))["retries"] += 1
+
+    # Reporting
+
+    def totals(self) -> dict:
+        totals = {"seconds": round(time.time() - self.started, 3)}
+        for key in ("llm_calls", "prompt_tokens", "completion_tokens", "tool_calls", "retries", "errors"):
+            totals[key] = sum(stats[key] for stats in self.nodes.values())
+        return totals
+
+    def step_summary(self) -> str:
+        """One line describing the node runs finished since the previous call."""
+        finished, self._finished = self._finished, []
+        totals = self.totals()
+        tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        step_tokens, self._summarized_tokens = tokens - self._summarized_tokens, tokens
+        nodes = ", ".join(f"{node} {seconds:.2f}s" for node, seconds in finished) or "no node finished"
+        return (
+            f"{nodes} ({step_tokens} tokens) | total {totals['seconds']:.1f}s, {totals['llm_calls']} LLM calls, "
+            f"{tokens} tokens, {totals['tool_calls']} tool calls"
+        )
+
+    def hop_stats(self) -> dict:
+        """Tokens per hop: every graph step in order, and the largest and mean prompt of a single hop."""
+        hops = [self.hops[step] for step in sorted(self.hops)]
+        prompts = [hop["prompt_tokens"] for hop in hops if hop["llm_calls"]]
+        return {
+            "hops": len(hops),
+            "max_prompt_tokens": max(prompts, default=0),
+            "mean_prompt_tokens": round(sum(prompts) / len(prompts), 1) if prompts else 0,
+            "steps": hops,
+        }
+
+    def report(self, components: dict = None) -> dict:
+        """The full run report; `components` adds stats from caches, pools and other helpers."""
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started,
+            "totals": self.totals(),
+            "nodes": {node: {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+                      for node, stats in self.nodes.items()},
+            "tools": sorted(self.tools.values(), key=lambda tool: -tool["seconds"]),
+            "hops": self.hop_stats(),
+            "components": components or {},
+        }
+
+    def prometheus(self) -> str:
+        """The node and tool counters in Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP leadgen_{name} {help_text}")
+            lines.append(f"# TYPE leadgen_{name} {'counter' if name.endswith('_total') else 'gauge'}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_label_value(val)}"' for key, val in {"run_id": self.run_id, **labels}.items())
+                lines.append(f"leadgen_{name}{{{label_text}}} {value}")
+
+        node_metrics = [
+            ("node_runs_total", "runs", "Graph node executions"),
+            ("node_seconds_total", "seconds", "Wall time spent in each graph node"),
+            ("node_errors_total", "errors", "Failed node runs and LLM calls"),
+            ("node_retries_total", "retries", "Retries made inside each node"),
+            ("llm_calls_total", "llm_calls", "LLM calls made by each node"),
+            ("llm_seconds_total", "llm_seconds", "Wall time spent waiting on the LLM"),
+            ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent by each node"),
+            ("llm_completion_tokens_total", "completion_tokens", "Completion tokens received by each node"),
+            ("llm_prompt_bytes_total", "prompt_bytes", "Size of the prompts sent by each node"),
+            ("llm_completion_bytes_total", "completion_bytes", "Size of the completions received by each node"),
+        ]
+        for name, key, help_text in node_metrics:
+            metric(name, help_text, [({"node": node}, stats[key]) for node, stats in sorted(self.nodes.items())])
+
+        tool_metrics = [
+            ("tool_calls_total", "calls", "MCP tool calls"),
+            ("tool_errors_total", "errors", "Failed MCP tool calls"),
+            ("tool_seconds_total", "seconds", "Wall time spent in MCP tool calls"),
+            ("tool_input_bytes_total", "input_bytes", "Size of MCP tool arguments"),
+            ("tool_output_bytes_total", "output_bytes", "Size of MCP tool results"),
+        ]
+        for name, key, help_text in tool_metrics:
+            metric(name, help_text, [({"node": tool["node"], "tool": tool["tool"]}, tool[key])
+                                     for _, tool in sorted(self.tools.items())])
+
+        hops = self.hop_stats()
+        metric("hops_total", "Graph steps run", [({}, hops["hops"])])
+        metric("hop_prompt_tokens_max", "Prompt tokens of the largest single hop", [({}, hops["max_prompt_tokens"])])
+        metric("run_seconds", "Wall time of the run so far", [({}, self.totals()["seconds"])])
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, report_dir: str = RUN_REPORT_DIR, components: dict = None) -> tuple:
+        """Writes `<run_id>.json` and `<run_id>.prom` and returns their paths."""
+        directory = pathlib.Path(report_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        json_path = directory / f"{self.run_id or 'run'}.json"
+        prom_path = directory / f"{self.run_id or 'run'}.prom"
+        json_path.write_text(json.dumps(self.report(components), indent=2, default=str), encoding="utf-8")
+        prom_path.write_text(self.prometheus(), encoding="utf-8")
+        return json_path, prom_path
@@ -0,0 +1,215 @@
+import hashlib
+import math
+import os
+import sqlite3
+import time
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from lead_utils import empty_lead, lead_value, leads_from_state, normalize_domain
+
+# Persistent index of contacts and companies that earlier runs already emailed
+LEAD_INDEX_PATH = os.getenv("LEAD_INDEX_PATH", "lead_index.sqlite")
+LEAD_INDEX_CAPACITY = int(os.getenv("LEAD_INDEX_CAPACITY", "100000"))
+LEAD_INDEX_ERROR_RATE = float(os.getenv("LEAD_INDEX_ERROR_RATE", "0.001"))
+# Skip a company entirely once anyone there was contacted
+LEAD_DEDUP_DOMAINS = os.getenv("LEAD_DEDUP_DOMAINS", "true").lower() in ("1", "true", "yes")
+# How many times ApolloAgent is sent back for replacements before duplicate slots are dropped
+DEDUP_MAX_REPLACEMENT_ROUNDS = int(os.getenv("DEDUP_MAX_REPLACEMENT_ROUNDS", "3"))
+
+
+def normalize_linkedin(url: str) -> str:
+    """Reduces a LinkedIn profile link to 'linkedin.com/in/<slug>' so spelling variants match."""
+    url = (url or "").strip().lower().split("?")[0].split("#")[0].rstrip("/")
+    for prefix in ("https://", "http://", "www."):
+        if url.startswith(prefix):
+            url = url[len(prefix):]
+    return url
+
+
+def lead_identities(lead: dict, domains: bool = LEAD_DEDUP_DOMAINS) -> list:
+    """Returns the (kind, value) pairs a lead is indexed and checked under."""
+    identities = []
+    email = lead_value(lead, "email").lower()
+    if email:
+        identities.append(("email", email))
+    linkedin = normalize_linkedin(lead_value(lead, "linkedIn link"))
+    if linkedin:
+        identities.append(("linkedin", linkedin))
+    domain = normalize_domain(lead_value(lead, "company website link"))
+    if domains and domain:
+        identities.append(("domain", domain))
+    return identities
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives, `error_rate` false positives at `capacity` items."""
+
+    def __init__(self, capacity: int = LEAD_INDEX_CAPACITY, error_rate: float = LEAD_INDEX_ERROR_RATE):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class LeadIndex:
+    """
+    Remembers every contacted lead's email, LinkedIn profile and company
+    domain across runs.
+
+    Entries live in SQLite; a Bloom filter loaded at startup answers most
+    lookups in memory, and only possible hits are confirmed with a query.
+    The filter is rebuilt at twice the size when it fills up.
+    """
+
+    def __init__(self, path: str = LEAD_INDEX_PATH, capacity: int = LEAD_INDEX_CAPACITY,
+                 error_rate: float = LEAD_INDEX_ERROR_RATE, domains: bool = LEAD_DEDUP_DOMAINS):
+        self.path = path
+        self.domains = domains
+        self.error_rate = error_rate
+        self.lookups = 0
+        self.filter_skips = 0
+        self.duplicates = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS contacted_leads ("
+            " kind TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " run_id TEXT NOT NULL,"
+            " added_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, value))"
+        )
+        self._conn.commit()
+        rows = self._conn.execute("SELECT COUNT(*) FROM contacted_leads").fetchone()[0]
+        self._build_filter(max(capacity, rows * 2))
+
+    def _build_filter(self, capacity: int):
+        self._filter = BloomFilter(capacity, self.error_rate)
+        for kind, value in self._conn.execute("SELECT kind, value FROM contacted_leads"):
+            self._filter.add(f"{kind}:{value}")
+
+    def contains(self, kind: str, value: str, exclude_run: str = None) -> bool:
+        """True if the identity was contacted before, ignoring entries added by `exclude_run`."""
+        self.lookups += 1
+        if f"{kind}:{value}" not in self._filter:
+            self.filter_skips += 1
+            return False
+        row = self._conn.execute(
+            "SELECT 1 FROM contacted_leads WHERE kind = ? AND value = ? AND run_id != ?",
+            (kind, value, exclude_run or ""),
+        ).fetchone()
+        return row is not None
+
+    def duplicate_reason(self, lead: dict, exclude_run: str = None):
+        """Returns e.g. 'email a@b.com' when the lead was contacted in another run, or None."""
+        for kind, value in lead_identities(lead, self.domains):
+            if self.contains(kind, value, exclude_run):
+                self.duplicates += 1
+                return f"{kind} {value}"
+        return None
+
+    def add(self, lead: dict, run_id: str = ""):
+        """Records a contacted lead under all of its identities."""
+        now = time.time()
+        for kind, value in lead_identities(lead, self.domains):
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO contacted_leads VALUES (?, ?, ?, ?)", (kind, value, run_id, now)
+            ).rowcount
+            if inserted:
+                self._filter.add(f"{kind}:{value}")
+        self._conn.commit()
+        if self._filter.count > self._filter.capacity:
+            self._build_filter(self._filter.capacity * 2)
+
+    def stats(self) -> dict:
+        return {"lookups": self.lookups, "filter_skips": self.filter_skips, "duplicates": self.duplicates,
+                "indexed": self._filter.count}
+
+    def close(self):
+        self._conn.close()
+
+
+def dedup_node_factory(index: LeadIndex, run_id: str = "", max_rounds: int = DEDUP_MAX_REPLACEMENT_ROUNDS) -> RunnableLambda:
+    """
+    Creates the node that runs after ApolloAgent. Leads contacted in an earlier
+    run, or repeating a person or company already accepted in this run, are
+    cleared and ApolloAgent is sent back to fill the empty slots. After
+    `max_rounds` replacement rounds the remaining duplicate slots are dropped.
+
+    The accepted identities and the round count are kept in the graph state
+    (`dedup_accepted`, `dedup_rounds`), so both survive a checkpoint resume.
+    """
+
+    async def dedup_node(state):
+        messages = state.get("subgraph_messages", [])
+        leads = leads_from_state(state.get("information_list", []))
+        # lead_id -> "kind:value" identities of leads that passed the check
+        accepted = {lead_id: list(identities) for lead_id, identities in (state.get("dedup_accepted") or {}).items()}
+        rounds = state.get("dedup_rounds") or 0
+        seen = {identity for identities in accepted.values() for identity in identities}
+
+        rejected = []
+        for lead in leads:
+            if not lead_value(lead, "email"):
+                continue
+            identities = [f"{kind}:{value}" for kind, value in lead_identities(lead, index.domains)]
+            if accepted.get(lead["lead_id"]) == identities:
+                continue
+            # The slot was refilled with a different lead; forget what it held before
+            seen.difference_update(accepted.pop(lead["lead_id"], ()))
+            reason = index.duplicate_reason(lead, exclude_run=run_id)
+            if reason is None:
+                clash = next((identity for identity in identities if identity in seen), None)
+                reason = "{} {} repeated in this run".format(*clash.split(":", 1)) if clash else None
+            if reason:
+                rejected.append((lead["lead_id"], reason))
+            else:
+                accepted[lead["lead_id"]] = identities
+                seen.update(identities)
+
+        if not rejected:
+            return {"subgraph_messages": messages, "next_agent": "supervisor", "dedup_accepted": accepted}
+
+        reasons = "; ".join(reason for _, reason in rejected[:20])
+        print(f"Deduplication: {len(rejected)} duplicate leads ({reasons})\n")
+        if rounds < max_rounds:
+            rounds += 1
+            # Blank the duplicate slots and ask Apollo to fill them again
+            patches = [empty_lead(lead_id) for lead_id, _ in rejected]
+            content = (
+                f"Deduplication: {len(rejected)} leads duplicate earlier contacts or other leads and have been cleared ({reasons}). "
+                f"ApolloAgent: find {len(rejected)} new verified leads for the empty lead_ids "
+                "and do not return these people or companies again."
+            )
+            next_agent = "ApolloAgent"
+        else:
+            patches = [{"lead_id": lead_id, "remove": True} for lead_id, _ in rejected]
+            content = (
+                f"Deduplication: dropped {len(rejected)} duplicate leads after {rounds} replacement rounds ({reasons}); "
+                f"continuing with {len(leads) - len(rejected)} leads."
+            )
+            next_agent = "supervisor"
+
+        updated_messages = messages + [AIMessage(content=content)]
+        return {"subgraph_messages": updated_messages, "next_agent": next_agent, "information_list": patches,
+                "dedup_accepted": accepted, "dedup_rounds": rounds}
+
+    return RunnableLambda(dedup_node)
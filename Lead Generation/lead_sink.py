@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+import os
+import pathlib
+from lead_utils import FLAG_FIELDS, LEAD_FIELDS, lead_value, leads_from_state
+
+# Where each run's streamed leads are written, and how many leads go into one Parquet part
+LEAD_OUTPUT_DIR = os.getenv("LEAD_OUTPUT_DIR", "lead_output")
+LEAD_SINK_BATCH_SIZE = int(os.getenv("LEAD_SINK_BATCH_SIZE", "50"))
+
+# Column order shared by the CSV, Parquet and Excel outputs
+SINK_COLUMNS = ["lead_id"] + LEAD_FIELDS + list(FLAG_FIELDS)
+# The Excel export also lists the leads that never completed, with where they stopped
+EXCEL_COLUMNS = SINK_COLUMNS + ["status"]
+
+_pyarrow = None
+
+
+def load_pyarrow():
+    """Returns (pyarrow, pyarrow.parquet), or (None, None) when it is not installed; imported on first use."""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            _pyarrow = (pyarrow, pyarrow.parquet)
+        except ImportError:  # Parquet output is optional
+            _pyarrow = (None, None)
+    return _pyarrow
+
+
+def lead_is_complete(lead: dict) -> bool:
+    """A lead is ready to export once it has an email address and its outreach email."""
+    return bool(lead_value(lead, "email") and lead_value(lead, "personalized email body"))
+
+
+def lead_status(lead: dict) -> str:
+    """Where a lead stopped in the workflow, as shown in the Excel export."""
+    if lead_is_complete(lead):
+        return "complete"
+    if not lead_value(lead, "email"):
+        return "no email"
+    if lead.get("website_inaccessible"):
+        return "website inaccessible"
+    if lead.get("security_error"):
+        return "blocked by security check"
+    if not lead_value(lead, "company details"):
+        return "not researched"
+    return "not emailed"
+
+
+def sink_row(lead: dict) -> dict:
+    """Flattens a lead onto SINK_COLUMNS with every value as a string."""
+    row = {}
+    for column in SINK_COLUMNS:
+        if column in FLAG_FIELDS:
+            row[column] = str(bool(lead.get(column)))
+        else:
+            row[column] = lead_value(lead, column) if column != "lead_id" else str(lead.get("lead_id", ""))
+    return row
+
+
+def append_line(path: pathlib.Path, text: str):
+    """Appends one complete record in a single write and fsyncs it, so a crash never leaves half a line."""
+    with open(path, "ab") as f:
+        f.write(text.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def repair_tail(path: pathlib.Path):
+    """Drops a partial last line left behind by a crash mid-write."""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back in blocks to the last complete line
+        cut = end
+        while cut > 0:
+            start = max(0, cut - 4096)
+            f.seek(start)
+            block = f.read(cut - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                cut = start + newline + 1
+                break
+            cut = start
+        f.truncate(cut)
+        print(f"Dropped a partial record at the end of {path}")
+
+
+def write_atomic(path: pathlib.Path, write):
+    """Calls `write(tmp_path)` and moves the finished file into place, so readers never see a partial file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class LeadSink:
+    """
+    Streams completed leads to disk while the workflow runs.
+
+    Each lead is appended to `<run_id>.jsonl` and `<run_id>.csv` as soon as it
+    is complete, and Parquet parts of `batch_size` leads are written under
+    `<run_id>/`. Only lead ids and the current Parquet batch are kept in
+    memory. Re-opening the sink for the same run id (e.g. on resume) skips the
+    leads that were already written.
+    """
+
+    def __init__(self, run_id: str, output_dir: str = LEAD_OUTPUT_DIR, batch_size: int = LEAD_SINK_BATCH_SIZE,
+                 parquet: bool = True):
+        self.run_id = run_id
+        self.output_dir = pathlib.Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.jsonl_path = self.output_dir / f"{run_id}.jsonl"
+        self.csv_path = self.output_dir / f"{run_id}.csv"
+        self.parquet_dir = self.output_dir / run_id
+        self.batch_size = max(1, batch_size)
+        self.parquet = parquet and load_pyarrow()[1] is not None
+        if parquet and not self.parquet:
+            print("pyarrow is not installed, skipping Parquet output")
+
+        self.written_ids = set()
+        self._batch = []
+        self._part = 0
+
+        repair_tail(self.jsonl_path)
+        repair_tail(self.csv_path)
+        self._load_existing()
+
+    def _load_existing(self):
+        """Re-reads the ids already written by an earlier attempt at this run."""
+        if self.jsonl_path.exists():
+            with open(self.jsonl_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.written_ids.add(json.loads(line)["lead_id"])
+                    except Exception as e:
+                        print(f"Error reading streamed lead: {e}")
+        if not self.parquet:
+            return
+
+        # Leads that reached the JSONL file but not a Parquet part go back into the batch
+        pq = load_pyarrow()[1]
+        parquet_ids = set()
+        parts = sorted(self.parquet_dir.glob("part-*.parquet")) if self.parquet_dir.exists() else []
+        for part in parts:
+            parquet_ids.update(pq.read_table(part, columns=["lead_id"]).column("lead_id").to_pylist())
+        self._part = len(parts)
+        if self.written_ids - parquet_ids:
+            for row in self.iter_rows():
+                if row["lead_id"] not in parquet_ids:
+                    self._batch.append(row)
+
+    def write(self, lead: dict) -> bool:
+        """Appends a completed lead once; returns False if it was already written."""
+        lead_id = str(lead.get("lead_id", ""))
+        if not lead_id or lead_id in self.written_ids:
+            return False
+        row = sink_row(lead)
+
+        append_line(self.jsonl_path, json.dumps(row, ensure_ascii=False) + "\n")
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=SINK_COLUMNS, lineterminator="\n")
+        if not self.csv_path.exists() or self.csv_path.stat().st_size == 0:
+            writer.writeheader()
+        writer.writerow(row)
+        append_line(self.csv_path, buffer.getvalue())
+        self.written_ids.add(lead_id)
+
+        if self.parquet:
+            self._batch.append(row)
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+        return True
+
+    def write_completed(self, information_list) -> list:
+        """Writes every complete lead in the state that has not been written yet; returns the newly written leads."""
+        return [lead for lead in leads_from_state(information_list) if lead_is_complete(lead) and self.write(lead)]
+
+    def flush(self):
+        """Writes the pending leads as the next Parquet part."""
+        if not self.parquet or not self._batch:
+            return
+        self.parquet_dir.mkdir(parents=True, exist_ok=True)
+        pa, pq = load_pyarrow()
+        table = pa.Table.from_pylist(self._batch, schema=pa.schema([(column, pa.string()) for column in SINK_COLUMNS]))
+        path = self.parquet_dir / f"part-{self._part:05d}.parquet"
+        write_atomic(path, lambda tmp_path: pq.write_table(table, tmp_path))
+        self._part += 1
+        self._batch = []
+
+    def iter_rows(self):
+        """Yields the written leads back from the JSONL file one at a time."""
+        if not self.jsonl_path.exists():
+            return
+        with open(self.jsonl_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def export_excel(self, path: str, information_list=None):
+        """
+        Builds an Excel sheet in openpyxl's streaming write-only mode: the
+        completed leads row by row from the JSONL file, then every lead of the
+        final `information_list` that never completed (not researched, website
+        inaccessible, not emailed, ...), with its `status`.
+        """
+        from openpyxl import Workbook
+
+        def write(tmp_path):
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(EXCEL_COLUMNS)
+            for row in self.iter_rows():
+                sheet.append([row.get(column, "") for column in SINK_COLUMNS] + ["complete"])
+            for lead in leads_from_state(information_list or []):
+                if str(lead.get("lead_id", "")) not in self.written_ids:
+                    row = sink_row(lead)
+                    sheet.append([row[column] for column in SINK_COLUMNS] + [lead_status(lead)])
+            workbook.save(tmp_path)
+
+        write_atomic(pathlib.Path(path), write)
+
+    def close(self, excel_path: str = None, information_list=None):
+        """
+        Flushes the last Parquet batch and optionally exports every lead to
+        Excel; returns the Excel path once it was written, otherwise None.
+        """
+        self.flush()
+        if not excel_path:
+            return None
+        self.export_excel(excel_path, information_list)
+        return excel_path
+
+    def summary(self) -> str:
+        outputs = [str(self.jsonl_path), str(self.csv_path)]
+        if self.parquet:
+            outputs.append(f"{self.parquet_dir}{os.sep}part-*.parquet")
+        return f"Lead sink: {len(self.written_ids)} leads written to {', '.join(outputs)}"
@@ -0,0 +1,255 @@
+import json
+import re
+import uuid
+from urllib.parse import urlparse
+from structured_output import JSONStreamParser
+
+
+# Fields every lead record carries through the workflow
+LEAD_FIELDS = [
+    "name",
+    "designation",
+    "employee count",
+    "email",
+    "linkedIn link",
+    "company name",
+    "company website link",
+    "company details",
+    "company type",
+    "personalized email body",
+    "personalized email subject",
+]
+
+# Spellings agents use in their JSON output for the canonical lead fields
+LEAD_FIELD_ALIASES = {
+    "full_name": "name",
+    "employee_count": "employee count",
+    "LinkedIn_url": "linkedIn link",
+    "linkedin_url": "linkedIn link",
+    "company_name": "company name",
+    "company_website": "company website link",
+    "company_details": "company details",
+    "company_type": "company type",
+    "personalized_email_body": "personalized email body",
+    "personalized_email_subject": "personalized email subject",
+    "mobile_number": "mobile number",
+}
+
+# Research outcome flags and optional extras a patch may set besides LEAD_FIELDS
+FLAG_FIELDS = ("website_inaccessible", "security_error")
+EXTRA_FIELDS = ("mobile number",)
+PATCHABLE_FIELDS = set(LEAD_FIELDS) | set(FLAG_FIELDS) | set(EXTRA_FIELDS)
+
+
+def new_lead_id() -> str:
+    """Returns a short unique id that stays with a lead for the whole run."""
+    return f"lead-{uuid.uuid4().hex[:8]}"
+
+
+def empty_lead(lead_id: str = None) -> dict:
+    """Returns a lead record with a stable `lead_id` and every other field blank."""
+    lead = {"lead_id": lead_id or new_lead_id()}
+    lead.update({field: "" for field in LEAD_FIELDS})
+    return lead
+
+
+def leads_from_state(information_list) -> list:
+    """
+    Returns the list of lead records held in the state, whether it is stored
+    as a plain list or wrapped as {"information_list": [...]} by the Supervisor.
+    """
+    if isinstance(information_list, dict):
+        information_list = information_list.get("information_list", [])
+    if not isinstance(information_list, list):
+        return []
+    return [lead for lead in information_list if isinstance(lead, dict)]
+
+
+def lead_value(lead: dict, field: str) -> str:
+    """Reads a lead field by its spaced name, falling back to the snake_case spelling agents sometimes emit."""
+    value = lead.get(field)
+    if value in (None, ""):
+        value = lead.get(field.replace(" ", "_"))
+    if value in (None, ""):
+        value = lead.get(field.lower().replace(" ", "_"))
+    return "" if value is None else str(value).strip()
+
+
+def normalize_lead(record: dict) -> dict:
+    """Maps an agent-emitted lead onto the canonical field names, keeping any extra fields."""
+    lead = empty_lead(record.get("lead_id"))
+    for key, value in record.items():
+        field = LEAD_FIELD_ALIASES.get(key, key)
+        if value not in (None, "") or field not in lead:
+            lead[field] = value
+    return lead
+
+
+def lead_patch(lead_id: str, **fields) -> dict:
+    """Builds a field-level update: set these fields on lead `lead_id`."""
+    return {"lead_id": lead_id, "set": fields}
+
+
+def _validated_fields(fields: dict) -> dict:
+    """Keeps known, non-empty fields of a patch under their canonical names."""
+    valid = {}
+    for key, value in (fields or {}).items():
+        field = LEAD_FIELD_ALIASES.get(key, key)
+        if field not in PATCHABLE_FIELDS:
+            print(f"Ignoring patch to unknown lead field '{key}'")
+            continue
+        if value is None or value == "":
+            # A blank value never clears data another agent already found
+            continue
+        valid[field] = bool(value) if field in FLAG_FIELDS else str(value)
+    return valid
+
+
+def apply_lead_patches(current: list, update: list) -> list:
+    """
+    Reducer for `information_list`. Each item of `update` is either a patch
+    ({"lead_id": ..., "set": {...}}) that sets fields on an existing lead, or a
+    whole lead record that is inserted (or replaces the lead with its id).
+    Patches are validated: unknown leads and fields are dropped, and blank
+    values are ignored, so a node can never silently lose another node's data.
+    {"lead_id": ..., "remove": True} drops a lead from the list.
+    """
+    leads = list(current or [])
+    index = {lead.get("lead_id"): i for i, lead in enumerate(leads)}
+
+    for item in update or []:
+        if not isinstance(item, dict):
+            continue
+        if item.get("remove"):
+            if item.get("lead_id") in index:
+                leads = [lead for lead in leads if lead.get("lead_id") != item["lead_id"]]
+                index = {lead.get("lead_id"): i for i, lead in enumerate(leads)}
+        elif "set" in item:
+            i = index.get(item.get("lead_id"))
+            if i is None:
+                print(f"Ignoring patch for unknown lead '{item.get('lead_id')}'")
+                continue
+            fields = _validated_fields(item["set"])
+            if fields:
+                leads[i] = {**leads[i], **fields}
+        else:
+            lead = normalize_lead(item)
+            i = index.get(lead["lead_id"])
+            if i is None:
+                index[lead["lead_id"]] = len(leads)
+                leads.append(lead)
+            else:
+                leads[i] = lead
+    return leads
+
+
+def patches_from_agent_output(text: str, leads: list, fields=None) -> list:
+    """
+    Turns an agent's JSON answer into lead patches. Prefers an explicit
+    `lead_patches` list; otherwise maps an `updated_state.information_list`
+    onto the current leads by lead_id, then identity, then onto the next lead
+    that has no email yet. `fields` optionally limits which fields may change.
+    """
+    try:
+        parsed = json.loads(extract_json(text))
+    except Exception:
+        return []
+    return patches_from_answer(parsed, leads, fields)
+
+
+def _restrict_fields(values: dict, fields=None) -> dict:
+    """The entries of `values` whose field (after aliasing) is in `fields`; all of them when `fields` is None."""
+    if fields is None:
+        return values
+    return {key: value for key, value in values.items() if LEAD_FIELD_ALIASES.get(key, key) in fields}
+
+
+def patches_from_answer(parsed: dict, leads: list, fields=None) -> list:
+    """Lead patches from an agent answer that is already parsed; see patches_from_agent_output."""
+    if not isinstance(parsed, dict):
+        return []
+
+    if isinstance(parsed.get("lead_patches"), list):
+        return [
+            lead_patch(patch.get("lead_id"), **_restrict_fields(patch.get("set") or {}, fields))
+            for patch in parsed["lead_patches"] if isinstance(patch, dict)
+        ]
+
+    return patches_from_records(leads_from_state(parsed.get("updated_state", {})), leads, fields)
+
+
+def patches_from_records(records: list, leads: list, fields=None) -> list:
+    """
+    Maps lead records onto the current leads by lead_id, then identity, then
+    onto the next lead that has no email yet; records that fit nowhere are
+    dropped. `fields` optionally limits which fields may change.
+    """
+    patches = []
+    known_ids = {lead.get("lead_id") for lead in leads}
+    by_key = {lead_key(lead): lead.get("lead_id") for lead in leads if lead_value(lead, "email")}
+    open_slots = [lead.get("lead_id") for lead in leads if not lead_value(lead, "email")]
+    for record in records:
+        record = normalize_lead(record)
+        lead_id = record.pop("lead_id")
+        if lead_id not in known_ids:
+            lead_id = by_key.get(lead_key(record)) or (open_slots.pop(0) if open_slots else None)
+        elif lead_id in open_slots:
+            open_slots.remove(lead_id)
+        if lead_id is not None:
+            filled = {key: value for key, value in record.items() if value not in (None, "")}
+            patches.append(lead_patch(lead_id, **_restrict_fields(filled, fields)))
+    return patches
+
+
+def compact_leads(leads: list) -> str:
+    """Serializes leads with only their filled fields, to keep prompts short."""
+    return json.dumps(
+        [{key: value for key, value in lead.items() if value not in ("", None, False)} for lead in leads],
+        ensure_ascii=False,
+    )
+
+
+def normalize_domain(url: str) -> str:
+    """Reduces a website link to its bare lowercase host, e.g. 'https://www.Acme.com/about' -> 'acme.com'."""
+    if not url:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = "http://" + url
+    try:
+        host = urlparse(url).hostname or ""
+    except ValueError:
+        return ""
+    host = host.lower().rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def lead_key(lead: dict) -> str:
+    """
+    Builds a stable identity for a lead so results produced in parallel can be
+    merged back onto the right record, regardless of list order.
+    """
+    email = lead_value(lead, "email").lower()
+    if email:
+        return f"email:{email}"
+    linkedin = lead_value(lead, "linkedIn link").lower().rstrip("/")
+    if linkedin:
+        return f"linkedin:{linkedin}"
+    name = re.sub(r"\s+", " ", lead_value(lead, "name").lower())
+    domain = normalize_domain(lead_value(lead, "company website link"))
+    company = re.sub(r"\s+", " ", lead_value(lead, "company name").lower())
+    return f"lead:{name}|{domain or company}"
+
+
+def extract_json(text: str) -> str:
+    """
+    Returns the first complete JSON object in a model answer, skipping prose,
+    code fences and anything after the object (the text itself if it has none).
+    """
+    try:
+        parser = JSONStreamParser()
+        parser.feed(text)
+        return parser.result_text if parser.done else text
+    except Exception as e:
+        print(f"Error extracting JSON: {e}")
+        return text
@@ -0,0 +1,296 @@
+import asyncio
+import os
+import random
+import re
+import time
+from collections import deque
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from instrumentation import record_retry
+
+# Maximum model calls in flight across every run in the process; 0 means unlimited
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+# Starting request rate; 0 means no cap until the provider answers 429
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+# Floor the adaptive rate never drops below
+LLM_MIN_REQUESTS_PER_MINUTE = float(os.getenv("LLM_MIN_REQUESTS_PER_MINUTE", "6"))
+# Retries for rate-limited or transient model errors, and for whole agent runs cut short by a 429
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+AGENT_MAX_RETRIES = int(os.getenv("AGENT_MAX_RETRIES", "2"))
+
+_default_limiter = None
+_default_budget = None
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit(error) -> bool:
+    """True for a provider 429 / rate-limit error, however the client library reports it."""
+    if _status_code(error) == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text.replace(" ", "").replace("_", "") or bool(re.search(r"\b429\b", text)) or "too many requests" in text
+
+
+def is_transient(error) -> bool:
+    """True for errors worth retrying as-is: rate limits, timeouts, connection drops and 5xx answers."""
+    if is_rate_limit(error) or isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms headers), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    value = getattr(error, "retry_after", None)
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def retry_delay(attempt: int, error=None, base: float = 0.5, cap: float = 30.0) -> float:
+    """Jittered exponential backoff for `attempt` (0-based), never shorter than the provider's Retry-After."""
+    delay = min(cap, base * 2 ** attempt) * (0.5 + random.random())
+    wait = retry_after(error) if error is not None else None
+    return max(delay, wait or 0.0)
+
+
+class AdaptiveRateLimiter(BaseRateLimiter):
+    """
+    Token bucket shared by every model instance, which adapts to the provider.
+
+    It starts at `requests_per_minute` (or uncapped when 0). A 429 halves the
+    rate (starting from the rate actually observed over the last minute) and
+    holds every caller until its Retry-After has passed; each success then
+    raises it by 5% (at least one request/min) up to `max_requests_per_minute`. LangChain chat
+    models consult it before every request via their `rate_limiter` field.
+    """
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 min_requests_per_minute: float = LLM_MIN_REQUESTS_PER_MINUTE,
+                 max_requests_per_minute: float = None):
+        self.rate = requests_per_minute / 60 if requests_per_minute > 0 else None
+        self.min_rate = min_requests_per_minute / 60
+        self.max_rate = (max_requests_per_minute or requests_per_minute or 0) / 60 or None
+        self.rate_limited = 0
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._recent = deque()
+        self._last_error = None
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            burst = max(1.0, self.rate)
+            self._tokens = min(burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self) -> float:
+        """Takes a token if one is available; otherwise returns how long to wait for one."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self.rate is not None and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        if self.rate is not None:
+            self._tokens -= 1
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - 60:
+            self._recent.popleft()
+        return 0.0
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if not blocking:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+
+    def penalize(self, error=None):
+        """Backs off after a 429: halves the rate and pauses callers for the Retry-After period."""
+        if error is not None and error is self._last_error:
+            return  # Already seen through another path
+        self._last_error = error
+        self.rate_limited += 1
+        now = time.monotonic()
+        current = self.rate or (len(self._recent) / 60 if self._recent else None)
+        if current is not None:
+            self.rate = max(self.min_rate, current / 2)
+            self._tokens = min(self._tokens, 0.0)
+        wait = retry_after(error) or (1 / self.rate if self.rate else 1.0)
+        self._paused_until = max(self._paused_until, now + wait)
+        pace = f"{self.rate * 60:.1f} requests/min" if self.rate else "uncapped"
+        print(f"LLM rate limited, pausing {wait:.1f}s, then {pace}")
+
+    def reward(self):
+        """Creeps the rate back up after a successful call (5%, at least one request/min)."""
+        if self.rate is None:
+            return
+        self.rate += max(self.rate * 0.05, 1 / 60)
+        if self.max_rate is not None:
+            self.rate = min(self.rate, self.max_rate)
+
+    def stats(self) -> dict:
+        return {"requests_per_minute": round(self.rate * 60, 1) if self.rate else None,
+                "rate_limited": self.rate_limited}
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Returns the process-wide rate limiter shared by every model."""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = AdaptiveRateLimiter()
+    return _default_limiter
+
+
+def rate_limited(model, limiter: AdaptiveRateLimiter = None):
+    """Attaches the shared rate limiter to a LangChain chat model and returns it."""
+    try:
+        model.rate_limiter = limiter or get_rate_limiter()
+    except Exception as e:
+        print(f"Error attaching rate limiter to {type(model).__name__}: {e}")
+    return model
+
+
+async def call_with_retry(call, retry_on=is_transient, max_retries: int = LLM_MAX_RETRIES, label: str = "LLM call"):
+    """
+    Awaits `call()` and retries it with jittered exponential backoff (honouring
+    Retry-After) while it raises errors matching `retry_on`. A 429 also slows
+    the shared rate limiter, so concurrent callers back off together.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt >= max_retries or not retry_on(e):
+                raise
+            if is_rate_limit(e):
+                get_rate_limiter().penalize(e)
+            delay = retry_delay(attempt, e)
+            print(f"{label} failed ({type(e).__name__}), retrying in {delay:.1f}s (attempt {attempt + 2}/{max_retries + 1})")
+            await record_retry(label, error=type(e).__name__)
+            await asyncio.sleep(delay)
+
+
+async def ainvoke_with_retry(model, input, max_retries: int = LLM_MAX_RETRIES, **kwargs):
+    """`model.ainvoke(input)` with retries for rate limits and transient errors."""
+    return await call_with_retry(lambda: model.ainvoke(input, **kwargs), max_retries=max_retries)
+
+
+class LLMBudget(AsyncCallbackHandler):
+    """
+    Caps how many LLM calls are in flight at once, across every graph that
+    has it in its config callbacks.
+
+    LangChain awaits `on_chat_model_start` before sending a request, so
+    acquiring a slot there holds the call back until one is free; the slot
+    is released when the call ends or fails. This covers the Supervisor, the
+    email generator and the model calls inside the ReAct agents alike. Call
+    outcomes are also fed to the rate limiter so it adapts to 429s.
+
+    The semaphore is created on the running event loop when it is first
+    needed, and again for a new loop, so one budget can outlive an
+    `asyncio.run` (e.g. several CLI commands or benchmarks in one process).
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, rate_limiter: AdaptiveRateLimiter = None):
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self._semaphore = None
+        self._loop = None
+        self._held = set()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.wait_seconds = 0.0
+
+    def _semaphore_for_loop(self):
+        """The semaphore of the running loop; calls held on a previous loop are forgotten."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+            self._held.clear()
+            self.in_flight = 0
+        return self._semaphore
+
+    async def _acquire(self, run_id):
+        started = time.perf_counter()
+        semaphore = self._semaphore_for_loop()
+        if semaphore is not None:
+            await semaphore.acquire()
+        self.wait_seconds += time.perf_counter() - started
+        self._held.add(run_id)
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _release(self, run_id):
+        if run_id not in self._held:
+            return
+        self._held.discard(run_id)
+        self.in_flight -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        await self._acquire(run_id)
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        await self._acquire(run_id)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self._release(run_id)
+        self.rate_limiter.reward()
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._release(run_id)
+        if is_rate_limit(error):
+            self.rate_limiter.penalize(error)
+        elif isinstance(error, GeneratorExit):
+            # A stream closed early by its reader was answered fine
+            self.rate_limiter.reward()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "peak_in_flight": self.peak_in_flight,
+            "wait_seconds": round(self.wait_seconds, 3),
+            **self.rate_limiter.stats(),
+        }
+
+
+def get_llm_budget() -> LLMBudget:
+    """Returns the process-wide LLM budget used by runs that are not given their own."""
+    global _default_budget
+    if _default_budget is None:
+        _default_budget = LLMBudget()
+    return _default_budget
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from langchain_core.messages import (AIMessage, AIMessageChunk, HumanMessage, convert_to_messages, messages_from_dict,
+                                     messages_to_dict)
+
+# "off" calls the model directly, "read_write" serves hits and stores misses,
+# "record" always calls the model and stores the answer, "replay" never calls the model for cached nodes.
+# Replay covers the Supervisor, email and context summary calls only: the ApolloAgent and research
+# ReAct agents still call the live model, so a replayed run is not fully offline
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "read_write")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+# Nodes whose calls can be cached: plain prompt-in, answer-out calls. The ReAct agents need a model with
+# bind_tools, which CachedChatModel does not provide, so they cannot be cached
+CACHEABLE_NODES = {"supervisor", "email_generator", "context_summary"}
+# Nodes whose model calls go through the cache, a subset of CACHEABLE_NODES
+LLM_CACHE_NODES = {node.strip() for node in os.getenv("LLM_CACHE_NODES", ",".join(sorted(CACHEABLE_NODES))).split(",") if node.strip()}
+if LLM_CACHE_NODES - CACHEABLE_NODES:
+    print(f"LLM_CACHE_NODES: ignoring {', '.join(sorted(LLM_CACHE_NODES - CACHEABLE_NODES))}; "
+          f"only {', '.join(sorted(CACHEABLE_NODES))} can be cached")
+
+_default_store = None
+
+
+class LLMResponseStore:
+    """SQLite store of model responses addressed by request hash, with least-recently-used eviction."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_accessed ON llm_responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Returns the stored response message for `key`, or None."""
+        row = self._conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return messages_from_dict(json.loads(row[0]))[0]
+
+    def put(self, key: str, response):
+        """Stores a response message and evicts the least recently used entries past `max_entries`."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?)",
+            (key, json.dumps(messages_to_dict([response])), time.time()),
+        )
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE key IN ("
+            " SELECT key FROM llm_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    def delete(self, key: str):
+        """Removes a stored response, e.g. one the caller could not parse."""
+        self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def get_response_store() -> LLMResponseStore:
+    """Returns the process-wide response store, opening it on first use."""
+    global _default_store
+    if _default_store is None:
+        _default_store = LLMResponseStore()
+    return _default_store
+
+
+class CachedChatModel:
+    """
+    Wraps a chat model so identical requests are answered from disk.
+
+    The cache key is a SHA-256 of the model name, its parameters, any call
+    kwargs and the serialized messages. Every other attribute is delegated to
+    the wrapped model. It is not a BaseChatModel and cannot bind tools, so it
+    serves plain calls only (see CACHEABLE_NODES).
+    """
+
+    def __init__(self, model, store: LLMResponseStore, mode: str = LLM_CACHE_MODE):
+        self.model = model
+        self.store = store
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def cache_key(self, input, **kwargs) -> str:
+        """Hashes everything that can change the model's answer."""
+        messages = [HumanMessage(content=input)] if isinstance(input, str) else convert_to_messages(input)
+        model_name = getattr(self.model, "model_name", None) or getattr(self.model, "deployment_name", None)
+        try:
+            params = dict(self.model._identifying_params)
+        except Exception:
+            params = {}
+        payload = json.dumps(
+            {"model": model_name, "params": params, "kwargs": kwargs, "messages": messages_to_dict(messages)},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        if self.mode == "off":
+            return await self.model.ainvoke(input, config, **kwargs)
+
+        key = self.cache_key(input, **kwargs)
+        if self.mode in ("read_write", "replay"):
+            cached = self.store.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            if self.mode == "replay":
+                raise LookupError(f"No recorded LLM response for request {key[:12]} in replay mode")
+
+        self.misses += 1
+        response = await self.model.ainvoke(input, config, **kwargs)
+        self.store.put(key, response)
+        return response
+
+    async def astream(self, input, config=None, **kwargs):
+        """
+        Streams the answer; a hit comes back as a single chunk. A miss is stored
+        only once the stream ran to completion: a caller that closes it early
+        (e.g. the Supervisor after an "end" route) read a truncated answer that
+        a later call with the same key must not get back.
+        """
+        if self.mode == "off":
+            async for chunk in self.model.astream(input, config, **kwargs):
+                yield chunk
+            return
+
+        key = self.cache_key(input, **kwargs)
+        if self.mode in ("read_write", "replay"):
+            cached = self.store.get(key)
+            if cached is not None:
+                self.hits += 1
+                yield AIMessageChunk(content=cached.content, usage_metadata=getattr(cached, "usage_metadata", None))
+                return
+            if self.mode == "replay":
+                raise LookupError(f"No recorded LLM response for request {key[:12]} in replay mode")
+
+        self.misses += 1
+        stream = self.model.astream(input, config, **kwargs)
+        answer = None
+        finished = False
+        try:
+            async for chunk in stream:
+                answer = chunk if answer is None else answer + chunk
+                yield chunk
+            finished = True
+        finally:
+            await stream.aclose()
+            if finished and answer is not None and answer.content:
+                self.store.put(key, AIMessage(content=answer.content, usage_metadata=answer.usage_metadata))
+
+    def forget(self, input, **kwargs):
+        """Drops the cached answer for a request so the next call reaches the model."""
+        if self.mode == "read_write":
+            self.store.delete(self.cache_key(input, **kwargs))
+
+
+def forget_response(model, input, **kwargs):
+    """Drops a cached answer if `model` is cached; a no-op for plain models."""
+    if isinstance(model, CachedChatModel):
+        model.forget(input, **kwargs)
+
+
+def cached_llm(model, node: str, mode: str = LLM_CACHE_MODE, store: LLMResponseStore = None):
+    """
+    Returns `model` wrapped with the response cache when caching is enabled for
+    `node` (see LLM_CACHE_NODES), otherwise the model itself. Raises
+    ValueError for a node outside CACHEABLE_NODES, e.g. a ReAct agent, whose
+    tool-calling turns the wrapper cannot serve.
+    """
+    if node not in CACHEABLE_NODES:
+        raise ValueError(f"LLM calls of node {node!r} cannot be cached; cacheable nodes: {', '.join(sorted(CACHEABLE_NODES))}")
+    if mode == "off" or node not in LLM_CACHE_NODES:
+        return model
+    try:
+        return CachedChatModel(model, store or get_response_store(), mode=mode)
+    except Exception as e:
+        print(f"Error opening LLM response cache, calling the model directly: {e}")
+        return model
@@ -1,44 +1,79 @@
-import asyncio
-import json
+import contextlib
+import os
 import pathlib
-import re
+import time
+from typing import Annotated
 from typing_extensions import TypedDict
-from langchain_mcp_adapters.tools import load_mcp_tools
 from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from LLMConfig import llm
-from mcp_utils import get_mcp_clients
-from roleAgents import ApolloAgent, ResearchAgent
+from apollo_extractor import apollo_results_tool, extracted_leads, offered_people
+from checkpointing import CHECKPOINT_PATH, new_run_id, open_checkpointer, resume_point, run_config
+from context_compaction import ContextCompactor, compaction_node_factory, context_messages, render_history
+from fast_research import FastResearcher
+from instrumentation import RUN_REPORT_DIR, RunMetrics
+from lead_index import LeadIndex, dedup_node_factory
+from lead_sink import LeadSink
+from lead_utils import (apply_lead_patches, compact_leads, empty_lead, leads_from_state, patches_from_agent_output,
+                        patches_from_answer, patches_from_records)
+from llm_budget import AGENT_MAX_RETRIES, LLMBudget, call_with_retry, get_llm_budget, is_rate_limit
+from llm_cache import cached_llm, forget_response
+from mcp_utils import PLAYWRIGHT_POOL_SIZE, PlaywrightSessionPool, get_session_pool
+from pipeline import PIPELINE_MODE, LeadPipeline
+from research_cache import ResearchCache
+from resources import get_mcp_client, get_model
+from research_stage import research_fanout, research_lead_node_factory, research_merge_node
+from roleAgents import ApolloAgent
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from roleFunctions import email_generator
-import pandas as pd
+from structured_output import astream_structured
+from supervisor_rules import SupervisorRules, SupervisorStats, rule_based_route
 
-# Initialize Azure model from LLMConfig
-azure_model = llm()
-
-# Initialize MCP clients for interacting with web automation tools
-mcp_clients = get_mcp_clients()
+# Number of leads a run starts with and asks Apollo to fill
+LEAD_COUNT = int(os.getenv("LEAD_COUNT", "5"))
 
 
 # Define the structure of the GraphState dictionary
 class GraphState(TypedDict):
     subgraph_messages: list  # List of messages exchanged so far
     next_agent: str          # Name of the next agent to execute
-    information_list: any    # Collected information / data
-
-def extract_json(text: str) -> str:
-    """Extract JSON content from a string using regex."""
-    try:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        return match.group(0) if match else text
-    except Exception as e:
-        print(f"Error extracting JSON: {e}")
-        return text
-
-
-def supervisor_node_factory(model, prompt: str, log_path: str = None) -> RunnableLambda:
-    """Creates a RunnableLambda node for the Supervisor agent."""
-    system_prompt = prompt
+    information_list: Annotated[list, apply_lead_patches]  # Leads keyed by lead_id; nodes return field-level patches
+    long_term_summary: str   # Rolling summary of the messages compacted out of subgraph_messages
+    dedup_accepted: dict     # lead_id -> identities of the leads the dedup node accepted this run
+    dedup_rounds: int        # Replacement rounds the dedup node has asked ApolloAgent for
+    research_attempts: dict  # lead_id -> research passes the lead stayed pending through
+
+# Appended to the Supervisor prompt so it answers with patches instead of the whole list
+SUPERVISOR_OUTPUT_FORMAT = (
+    "\n\n**Output Format:**\n"
+    "{\n"
+    "  \"next_agent\": \"<ApolloAgent | ResearchAgent | EmailGenerator | end>\",\n"
+    "  \"message\": \"<instruction or update for the next agent>\",\n"
+    "  \"lead_patches\": [{\"lead_id\": \"<lead_id>\", \"set\": {\"<field>\": \"<corrected value>\"}}]\n"
+    "}\n"
+    "Only include `lead_patches` for fields you are correcting; never repeat unchanged leads or fields."
+)
+
+# What the Supervisor's answer is validated against; also used for native structured output
+SUPERVISOR_SCHEMA = {
+    "title": "supervisor_decision",
+    "description": "The agent to run next, an instruction for it and corrections to the leads.",
+    "type": "object",
+    "properties": {
+        "next_agent": {"type": "string", "enum": ["ApolloAgent", "ResearchAgent", "EmailGenerator", "end"]},
+        "message": {"type": "string"},
+        "lead_patches": {"type": "array", "items": {"type": "object"}},
+    },
+    "required": ["next_agent"],
+}
+
+
+def supervisor_node_factory(model, prompt: str, log_path: str = None, rules: SupervisorRules = None) -> RunnableLambda:
+    """
+    Creates a RunnableLambda node for the Supervisor agent. When `rules` is given,
+    routing that can be read straight off `information_list` is decided locally
+    and only ambiguous cases reach the LLM.
+    """
+    system_prompt = prompt + SUPERVISOR_OUTPUT_FORMAT
 
     async def supervisor_node(state: GraphState) -> GraphState:
         # Extract existing state information
@@ -47,34 +82,69 @@ def supervisor_node_factory(model, prompt: str, log_path: str = None) -> Runnabl
             information_list = state["information_list"]
         except Exception as e:
             print(f"Error reading state in supervisor_node: {e}")
-            return {"subgraph_messages": [], "next_agent": "end", "information_list": []}
+            return {"subgraph_messages": [], "next_agent": "end"}
+
+        # Fast path: decide obvious routing without an LLM round trip
+        decision = rules.route(information_list) if rules is not None else None
+        if decision is not None:
+            next_agent, reason = decision
+            rules.stats.record(next_agent, by_rule=True)
+            print(f"Supervisor rule -> {next_agent} ({reason})\n")
+            messages.append(AIMessage(content=f"Supervisor: routing to {next_agent} because {reason}."))
+            return {"subgraph_messages": messages, "next_agent": next_agent}
 
         # Prepare system message for the Supervisor agent
         system_message = SystemMessage(content=system_prompt)
+        summary = state.get("long_term_summary")
+        prompt_text = (
+            system_message.content
+            + "\n\nCurrent information_list:\n" + compact_leads(leads_from_state(information_list))
+            + (f"\n\nSummary of the earlier steps:\n{summary}" if summary else "")
+            + "\n\nLast agent update:\n" + render_history(messages)
+        )
+
+        def announce_route(name, value):
+            if name == "next_agent":
+                print(f"Supervisor -> {value}")
+
+        def route_is_final(name, value):
+            # "end" needs no message or patches: stop reading as soon as it is parsed
+            return name == "next_agent" and value == "end"
 
         try:
-            # Call the model with the system prompt and recent agent updates
-            response = await model.ainvoke(
-                system_message.content
-                + "\n\nLast agent update:\n" + str(messages)
+            # Stream the answer and stop as soon as the decision is complete
+            answer = await call_with_retry(
+                lambda: astream_structured(model, prompt_text, SUPERVISOR_SCHEMA, on_field=announce_route,
+                                           stop_after=route_is_final),
+                label="Supervisor",
             )
+        except ValueError as e:
+            print(f"Error parsing supervisor response: {e}")
+            forget_response(model, prompt_text)
+            answer = None
         except Exception as e:
             print(f"Error invoking supervisor model: {e}")
-            return {"subgraph_messages": messages, "next_agent": "end", "information_list": information_list}
-
-        # Parse the response as JSON
-        try:
-            content = extract_json(response.content)
-            parsed = json.loads(content)
+            # Keep the run going on the deterministic route rather than ending it
+            decision = rule_based_route(information_list)
+            if decision is None:
+                return {"subgraph_messages": messages, "next_agent": "end"}
+            print(f"Supervisor fallback -> {decision[0]} ({decision[1]})\n")
+            messages.append(AIMessage(content=f"Supervisor: routing to {decision[0]} because {decision[1]}."))
+            return {"subgraph_messages": messages, "next_agent": decision[0]}
+
+        if answer is not None:
+            parsed = answer.value
             print("response ->", parsed, "\n")
-            next_agent = parsed.get("next_agent", "end")
+            next_agent = parsed["next_agent"]
             assistant_msg = parsed.get("message", "")
-            updated_state = parsed.get("updated_state", {})
-        except Exception as e:
-            print(f"Error parsing supervisor response: {e} \n{response}")
+            patches = patches_from_answer(parsed, leads_from_state(information_list))
+        else:
             next_agent = "end"
             assistant_msg = "Could not parse response, ending."
-            updated_state = information_list
+            patches = []
+
+        if rules is not None:
+            rules.stats.record(next_agent, by_rule=False, answer=answer)
 
         # Append AI response to messages
         try:
@@ -84,13 +154,18 @@ def supervisor_node_factory(model, prompt: str, log_path: str = None) -> Runnabl
             messages = [AIMessage(content=assistant_msg)]
 
         # Return updated state for next execution
-        return {"subgraph_messages": messages, "next_agent": next_agent, "information_list": updated_state}
+        return {"subgraph_messages": messages, "next_agent": next_agent, "information_list": patches}
 
     return RunnableLambda(supervisor_node)
 
 
-def agent_node(agent: RunnableLambda) -> RunnableLambda:
-    """Wraps an agent node so it can be executed in the workflow graph."""
+def agent_node(build_agent, session_pool: PlaywrightSessionPool, name: str, auth_origin: str = None) -> RunnableLambda:
+    """
+    Wraps an agent node so it can be executed in the workflow graph. The agent
+    is bound to a browser session leased from the pool for the duration of its run;
+    `name` pins the agent to the same session on every call. When the session is
+    already signed in to `auth_origin` the agent is told to skip the login.
+    """
     async def run_agent(state: GraphState) -> GraphState:
         # Extract current state information
         try:
@@ -98,44 +173,149 @@ def agent_node(agent: RunnableLambda) -> RunnableLambda:
             information_list = state.get("information_list", [])
         except Exception as e:
             print(f"Error reading state in agent_node: {e}")
-            return {"subgraph_messages": [], "next_agent": "supervisor", "information_list": []}
+            return {"subgraph_messages": [], "next_agent": "supervisor"}
+
+        # Tell the agent which lead ids to patch
+        leads = leads_from_state(information_list)
+        lead_context = HumanMessage(content=(
+            "Current information_list:\n" + compact_leads(leads) + "\n"
+            "Report lead data as `lead_patches` keyed by these lead_id values."
+        ))
 
         # Execute the agent and append its response
+        patches = []
         try:
-            response = await agent.ainvoke({"messages": messages})
-            updated_messages = messages + [response["messages"][-1]]
-            messages = updated_messages[-10:]  # Keep last 10 messages for context
-            last_response = response["messages"][-1]
+            async with session_pool.lease(affinity=name) as slot:
+                agent = slot.agent_for(name, build_agent)
+                authenticated = auth_origin in slot.authenticated
+                agent_messages = context_messages(messages, state.get("long_term_summary")) + [lead_context]
+                if authenticated:
+                    agent_messages = agent_messages + [HumanMessage(content=(
+                        f"This browser session may already be signed in to {auth_origin}. "
+                        "Open it and skip the login step if the dashboard loads; otherwise log in as instructed."
+                    ))]
+                started = time.perf_counter()
+
+                async def invoke():
+                    # Every attempt is a new conversation, so page snapshots start over in full
+                    slot.start_conversation()
+                    return await agent.ainvoke({"messages": agent_messages})
+
+                response = await call_with_retry(
+                    invoke, retry_on=is_rate_limit, max_retries=AGENT_MAX_RETRIES, label=name)
+                session_pool.metrics.record_agent_run(name, authenticated, time.perf_counter() - started)
+
+                last_response = response["messages"][-1]
+                # Leads read by the results extractor fill the open slots first; the answer text adds or corrects the rest
+                patches = patches_from_records(extracted_leads(response["messages"]), leads)
+                patches += patches_from_agent_output(last_response.content, apply_lead_patches(leads, patches))
+
+                # Keep the signed-in browser state for the next run
+                if auth_origin and patches:
+                    await session_pool.mark_authenticated(slot, auth_origin)
+            # compact_context folds older messages into long_term_summary
+            messages = messages + [last_response]
         except Exception as e:
             print(f"Error running agent: {e}")
             last_response = AIMessage(content="Agent failed")
             messages.append(last_response)
 
-        return {"subgraph_messages": messages, "next_agent": "supervisor", "information_list": information_list}
+        return {"subgraph_messages": messages, "next_agent": "supervisor", "information_list": patches}
 
     return RunnableLambda(run_agent)
 
 
-async def run_agent(prompt: str):
-    """Main async function to run the agent workflow."""
+def route_supervisor(state: GraphState):
+    """Routes the Supervisor's decision, fanning ResearchAgent out into one branch per lead."""
+    if state["next_agent"] == "ResearchAgent":
+        return research_fanout(state)
+    return state["next_agent"]
+
+
+async def run_agent(prompt: str, pool_size: int = PLAYWRIGHT_POOL_SIZE, research_cache: ResearchCache = None,
+                    use_supervisor_rules: bool = True, run_id: str = None, resume: bool = False,
+                    lead_count: int = LEAD_COUNT,
+                    checkpoint_path: str = CHECKPOINT_PATH, use_fast_research: bool = True,
+                    lead_sink: LeadSink = None, excel_path: str = None, metrics: RunMetrics = None,
+                    live_metrics: bool = False, report_dir: str = RUN_REPORT_DIR,
+                    lead_index: LeadIndex = None, use_dedup: bool = True, llm_budget: LLMBudget = None,
+                    pipeline: bool = PIPELINE_MODE, context_compactor: ContextCompactor = None):
+    """
+    Main async function to run the agent workflow.
+
+    GraphState is checkpointed after every node under `run_id`. With
+    `resume=True` the run continues from its last completed node instead of
+    starting again from the Apollo login.
+
+    Completed leads are streamed to `lead_sink` (by default a LeadSink for
+    this run id) after every step; `excel_path` adds an Excel export of every
+    final lead at the end. The returned state then carries `excel_path`, or
+    None if the export failed.
+
+    Node, LLM and MCP tool timings are collected by `metrics` and written to
+    `report_dir` as JSON and Prometheus text when the run ends; `live_metrics`
+    prints a one-line summary after every step.
+
+    With `use_dedup`, leads ApolloAgent returns are checked against
+    `lead_index` (contacts emailed in earlier runs) and duplicates are sent
+    back to ApolloAgent for replacement before any research is done.
+
+    `llm_budget` caps concurrent model calls; pass the same one to several
+    concurrent runs to share a single budget between them.
+
+    Before every Supervisor turn `context_compactor` folds older messages
+    into `long_term_summary` once the history passes its token budget, so
+    prompts stay bounded however many loops the run takes.
+
+    With `pipeline=True` the Supervisor graph is replaced by a LeadPipeline:
+    Apollo, research and email run as concurrent stages, so the first leads
+    are researched and emailed while Apollo is still extracting the rest.
+    Pipelined runs are not checkpointed and cannot be resumed.
+    """
+    run_id = run_id or new_run_id()
+    last_state = None
+    config = run_config(run_id)
+    supervisor_rules = SupervisorRules(SupervisorStats()) if use_supervisor_rules else None
+    if pipeline and resume:
+        print("Pipelined runs are not checkpointed; resuming in graph mode.")
+        pipeline = False
+    lead_pipeline = None
     try:
-        # Start a Playwright session via MCP client
-        async with mcp_clients.session("playwright") as session:
-            # Load tools for agents
-            try:
-                all_tools = await load_mcp_tools(session)
-            except Exception as e:
-                print(f"Error loading MCP tools: {e}")
-                all_tools = []
-
-            # Initialize agents
-            try:
-                Apollo_agent = ApolloAgent(tools=all_tools).agent
-                Research_agent = ResearchAgent(tools=all_tools).agent
-            except Exception as e:
-                print(f"Error initializing agents: {e}")
-                return
+        # Company research from earlier runs, keyed by website domain
+        if research_cache is None:
+            research_cache = ResearchCache()
+    except Exception as e:
+        print(f"Error opening research cache: {e}")
+    try:
+        # Contacts and companies emailed in earlier runs
+        if use_dedup and lead_index is None:
+            lead_index = LeadIndex()
+    except Exception as e:
+        print(f"Error opening lead index, deduplication disabled: {e}")
+        lead_index = None
+
+    # Per-node and per-tool timings, collected through LangChain callbacks
+    metrics = metrics or RunMetrics(run_id)
+    llm_budget = llm_budget or get_llm_budget()
+    stream_config = {**config, "callbacks": [metrics, llm_budget]}
+
+    # Append-only output of finished leads, safe to reopen on resume
+    if lead_sink is None:
+        lead_sink = LeadSink(run_id)
+
+    # Pooled HTTP client for reading static company sites without a browser
+    # The model and MCP client are built on first use and shared with later runs
+    azure_model = get_model()
+    fast_researcher = FastResearcher(azure_model) if use_fast_research else None
+    context_compactor = context_compactor or ContextCompactor(cached_llm(azure_model, node="context_summary"))
+    session_pool = None
+    # People the Apollo extractor offered in this run, so replacement rounds skip them; not shared with other runs
+    offered_token = offered_people.set(set())
 
+    try:
+        # Open the checkpoint store (graph runs only) and borrow the warm pool of Playwright sessions
+        async with (contextlib.nullcontext() if pipeline else open_checkpointer(checkpoint_path)) as checkpointer:
+            session_pool = await get_session_pool(get_mcp_client(), size=pool_size)
             # Supervisor system prompt instructions
             try:
                 supervisor_system_prompt = (
@@ -143,68 +323,127 @@ async def run_agent(prompt: str):
                     "... [prompt truncated for brevity, full content remains in code] ..."
                 )
 
-                # Build the workflow graph
-                workflow = StateGraph(GraphState)
-                workflow.add_node("supervisor", supervisor_node_factory(azure_model, supervisor_system_prompt))
-                workflow.add_node("ApolloAgent", agent_node(Apollo_agent))
-                workflow.add_node("ResearchAgent", agent_node(Research_agent))
-                workflow.add_node("EmailGenerator", email_generator())
-
-                # Set workflow entry point
-                workflow.set_entry_point("supervisor")
-
-                # Define conditional transitions based on supervisor's decision
-                workflow.add_conditional_edges(
-                    "supervisor",
-                    lambda state: state["next_agent"],
-                    {
-                        "ApolloAgent": "ApolloAgent",
-                        "ResearchAgent": "ResearchAgent",
-                        "EmailGenerator": "EmailGenerator",
-                        "end": END,
-                    }
-                )
-
-                # Add edges for each agent back to supervisor
-                workflow.add_edge("ApolloAgent", "supervisor")
-                workflow.add_edge("ResearchAgent", "supervisor")
-                workflow.add_edge("EmailGenerator", "supervisor")
-
-                app = workflow.compile()
+                apollo_node = agent_node(
+                    lambda slot: ApolloAgent(tools=slot.tools + [apollo_results_tool(slot.call_tool)]).agent,
+                    session_pool, "ApolloAgent", auth_origin=ApolloAgent.origin)
+                research_node = research_lead_node_factory(session_pool, cache=research_cache, fast_researcher=fast_researcher)
+                if pipeline:
+                    lead_pipeline = LeadPipeline(
+                        apollo_node, research_node, email_generator(mode="per_lead"), lead_sink, lead_index=lead_index,
+                        run_id=run_id, config={"callbacks": [metrics, llm_budget]}, browser_sessions=session_pool.size,
+                        on_lead_done=(lambda lead: print(metrics.step_summary(), "\n")) if live_metrics else None,
+                    )
+                else:
+                    # Build the workflow graph
+                    workflow = StateGraph(GraphState)
+                    workflow.add_node("supervisor", supervisor_node_factory(
+                        cached_llm(azure_model, node="supervisor"), supervisor_system_prompt, rules=supervisor_rules))
+                    workflow.add_node("ApolloAgent", apollo_node)
+                    workflow.add_node("research_lead", research_node)
+                    workflow.add_node("research_merge", research_merge_node())
+                    workflow.add_node("EmailGenerator", email_generator())
+                    workflow.add_node("compact_context", compaction_node_factory(context_compactor))
+                    if lead_index is not None:
+                        workflow.add_node("dedup", dedup_node_factory(lead_index, run_id=run_id))
+
+                    # Set workflow entry point
+                    workflow.set_entry_point("supervisor")
+
+                    # Define conditional transitions based on supervisor's decision
+                    workflow.add_conditional_edges(
+                        "supervisor",
+                        route_supervisor,
+                        {
+                            "ApolloAgent": "ApolloAgent",
+                            "research_lead": "research_lead",
+                            "research_merge": "research_merge",
+                            "EmailGenerator": "EmailGenerator",
+                            "end": END,
+                        }
+                    )
+
+                    # Add edges for each agent back to supervisor, compacting the history on the way
+                    if lead_index is not None:
+                        # Duplicates go straight back to ApolloAgent for replacements
+                        workflow.add_edge("ApolloAgent", "dedup")
+                        workflow.add_conditional_edges(
+                            "dedup",
+                            lambda state: state["next_agent"],
+                            {"ApolloAgent": "ApolloAgent", "supervisor": "compact_context"},
+                        )
+                    else:
+                        workflow.add_edge("ApolloAgent", "compact_context")
+                    workflow.add_edge("research_lead", "research_merge")
+                    workflow.add_edge("research_merge", "compact_context")
+                    workflow.add_edge("EmailGenerator", "compact_context")
+                    workflow.add_edge("compact_context", "supervisor")
+
+                    app = workflow.compile(checkpointer=checkpointer)
             except Exception as e:
                 print(f"Error setting up workflow: {e}")
                 return
 
-            # Initialize empty records for 5 leads
             try:
-                initial_list = [{
-                    "name": "",
-                    "designation": "",
-                    "employee count": "",
-                    "email": "",
-                    "linkedIn link": "",
-                    "company name": "",
-                    "company website link": "",
-                    "company details": "",
-                    "company type": "",
-                    "personalized email body": "",
-                    "personalized email subject": ""
-                } for _ in range(5)]
-
-                # Initialize the workflow state
-                state: GraphState = {
-                    "subgraph_messages": [HumanMessage(content=prompt)],
-                    "next_agent": "supervisor",
-                    "information_list": initial_list,
-                    "long_term_summary": 'Start from logging in to the website.And ensuring that all the filters are applied and reflect on it.'
-                }
-
-                last_state = None
-                # Stream workflow execution asynchronously
-                async for cur_state in app.astream(state, {"recursion_limit": 1000}):
-                    print("Execution in progress...\n")
-                    last_state = cur_state  # store the last state
+                if lead_pipeline is not None:
+                    print(f"Starting pipelined run {run_id}\n")
+                    state = None
+                elif resume:
+                    # Continue the checkpointed run; LangGraph restarts at the pending nodes
+                    point = await resume_point(app, config)
+                    if point is None:
+                        print(f"Run {run_id} has no unfinished checkpoint to resume.")
+                        return None
+                    print(f"Resuming run {run_id} after step {point[0]}, next: {', '.join(point[1])}\n")
+                    state = None
+                else:
+                    print(f"Starting run {run_id}\n")
+
+                    # Initialize empty records for the requested leads, each with a stable lead_id
+                    initial_list = [empty_lead() for _ in range(lead_count)]
+
+                    # Initialize the workflow state
+                    state: GraphState = {
+                        "subgraph_messages": [HumanMessage(content=prompt)],
+                        "next_agent": "supervisor",
+                        "information_list": initial_list,
+                        "long_term_summary": 'Start from logging in to the website.And ensuring that all the filters are applied and reflect on it.'
+                    }
 
+                if lead_pipeline is not None:
+                    # Each stage writes finished leads to the sink itself
+                    last_state = await lead_pipeline.run(prompt, lead_count)
+                    print(lead_pipeline.summary(), "\n")
+                else:
+                    # Stream workflow execution asynchronously
+                    # stream_mode="values" yields the full merged state after every step
+                    async for cur_state in app.astream(state, stream_config, stream_mode="values"):
+                        print(metrics.step_summary() if live_metrics else "Execution in progress...", "\n")
+                        # Persist leads as soon as they are researched and emailed
+                        new_leads = lead_sink.write_completed(cur_state.get("information_list"))
+                        if new_leads:
+                            print(f"Saved {len(new_leads)} completed leads\n")
+                            if lead_index is not None:
+                                for lead in new_leads:
+                                    lead_index.add(lead, run_id)
+
+                    # Nodes stream patches, so read the merged final state from the checkpoint
+                    last_state = (await app.aget_state(config)).values
+
+                if research_cache is not None:
+                    stats = research_cache.stats()
+                    print(f"Research cache: {stats['hits']} hits, {stats['misses']} misses\n")
+                if lead_index is not None:
+                    stats = lead_index.stats()
+                    print(f"Lead index: {stats['duplicates']} duplicates skipped, "
+                          f"{stats['filter_skips']} of {stats['lookups']} lookups answered in memory\n")
+                if supervisor_rules is not None:
+                    print(supervisor_rules.stats.summary(), "\n")
+                if lead_pipeline is None:
+                    print(context_compactor.stats.summary(), "\n")
+                print(session_pool.metrics.summary(), "\n")
+                if fast_researcher is not None:
+                    print(f"Fast research: {fast_researcher.stats()}\n")
+                print(lead_sink.summary(), "\n")
 
                 return last_state  # Return final state after execution
 
@@ -213,8 +452,42 @@ async def run_agent(prompt: str):
                 return None
 
     except Exception as e:
-        print(f"Error starting Playwright MCP session: {e}")
+        print(f"Error starting Playwright MCP sessions: {e}")
         return None
+    finally:
+        offered_people.reset(offered_token)
+        if fast_researcher is not None:
+            await fast_researcher.aclose()
+        exported = None
+        try:
+            # Write the last Parquet batch and the optional Excel export, unfinished leads included
+            exported = lead_sink.close(excel_path, last_state.get("information_list") if last_state else None)
+        except Exception as e:
+            print(f"Error closing lead sink: {e}")
+        if isinstance(last_state, dict):
+            last_state["excel_path"] = exported
+        try:
+            components = {"leads_written": len(lead_sink.written_ids)}
+            if research_cache is not None:
+                components["research_cache"] = research_cache.stats()
+            if lead_index is not None:
+                components["lead_index"] = lead_index.stats()
+            if supervisor_rules is not None:
+                components["supervisor"] = supervisor_rules.stats.stats()
+            components["context"] = context_compactor.stats.stats()
+            if fast_researcher is not None:
+                components["fast_research"] = fast_researcher.stats()
+            if session_pool is not None:
+                components["session_pool"] = session_pool.metrics.stats()
+                components["mcp_tools"] = session_pool.tool_policy.stats()
+                components["snapshots"] = session_pool.snapshot_stats.stats()
+            if lead_pipeline is not None:
+                components["pipeline"] = lead_pipeline.stats()
+            components["llm_budget"] = llm_budget.stats()
+            json_report, prom_report = metrics.write_reports(report_dir, components)
+            print(f"Run report written to {json_report} and {prom_report}\n")
+        except Exception as e:
+            print(f"Error writing run report: {e}")
 
 
 # Load human instructions from JSON file
@@ -227,27 +500,7 @@ except Exception as e:
 
 
 if __name__ == "__main__":
-    try:
-        # Run the agent workflow with human instructions
-        final_state = asyncio.run(run_agent(human_instructions))
-        print("final state ->", final_state, "\n")
-
-        # Extract final information list from supervisor
-        final_values = final_state.get("supervisor", {}).get(
-            "information_list", {}).get("information_list", [])
-        print("final data ->", final_values, "\n")
-
-        # Convert all values to strings for consistency
-        for record in final_values:
-            for key, value in record.items():
-                record[key] = str(value) if value is not None else ""
-
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(final_values)
-
-        # Save the leads data to an Excel file
-        excel_file = "leads_data.xlsx"
-        df.to_excel(excel_file, index=False)
-        print(f"✅ Excel file '{excel_file}' created with all values as strings!")
-    except Exception as e:
-        print(f"Error running main async function: {e}")
+    # Kept so `python main.py --leads 10` still works; the options live in cli.py
+    import sys
+    from cli import main as cli_main
+    sys.exit(cli_main(["run", *sys.argv[1:]]))
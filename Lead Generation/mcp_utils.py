@@ -1,18 +1,33 @@
-from langchain_mcp_adapters.client import MultiServerMCPClient
+import asyncio
+import json
+import os
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from snapshot_compression import SnapshotCompressor, SnapshotStats
 
-def get_mcp_clients():
+# Default Playwright MCP endpoint and number of browser sessions opened for parallel work
+PLAYWRIGHT_MCP_URL = os.getenv("PLAYWRIGHT_MCP_URL", "http://localhost:8931/mcp")
+PLAYWRIGHT_POOL_SIZE = int(os.getenv("PLAYWRIGHT_POOL_SIZE", "3"))
+
+
+def get_mcp_clients(url: str = PLAYWRIGHT_MCP_URL):
     """
     Initializes and returns a MultiServerMCPClient instance for interacting
     with multiple MCP servers, currently configured for Playwright automation.
-    
+
     Returns:
         MultiServerMCPClient instance if successful, None otherwise.
     """
     try:
+        # Imported here so loading this module stays cheap until a client is needed
+        from langchain_mcp_adapters.client import MultiServerMCPClient
+
         # Create MCP client with a single Playwright server configuration
         mcp_clients = MultiServerMCPClient({
             "playwright": {
-                "url": "http://localhost:8931/mcp",  # Local MCP server endpoint
+                "url": url,                          # MCP server endpoint
                 "transport": "streamable_http"       # Use streamable HTTP transport
             }
         })
@@ -21,3 +36,471 @@ def get_mcp_clients():
         # Catch initialization errors and return None
         print(f"Error initializing MultiServerMCPClient: {e}")
         return None
+
+
+# Browser storage (cookies / localStorage) saved from authenticated sessions and restored into new ones.
+# It holds the Apollo session cookies in plain text: the file is created readable by its owner only and
+# is git-ignored under its default name; keep any other path out of the repository as well
+PLAYWRIGHT_STORAGE_STATE = os.getenv("PLAYWRIGHT_STORAGE_STATE", "browser_storage_state.json")
+# Sessions idle longer than this are pinged before being handed out
+HEALTH_CHECK_INTERVAL = float(os.getenv("PLAYWRIGHT_HEALTH_CHECK_INTERVAL", "30"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("PLAYWRIGHT_HEALTH_CHECK_TIMEOUT", "5"))
+
+# Page scripts run through the browser_evaluate tool to read and write storage for the current origin
+_CAPTURE_STORAGE_JS = (
+    "() => ({origin: location.origin, cookies: document.cookie, "
+    "localStorage: Object.fromEntries(Object.entries(localStorage))})"
+)
+_RESTORE_STORAGE_JS = (
+    "() => {{ const state = {state}; "
+    "for (const [key, value] of Object.entries(state.localStorage || {{}})) localStorage.setItem(key, value); "
+    "for (const cookie of (state.cookies || '').split('; ')) if (cookie) document.cookie = cookie + '; path=/'; "
+    "return 'restored'; }}"
+)
+
+
+# Per-tool time limits in seconds; override with e.g. MCP_TOOL_TIMEOUTS="browser_navigate=60,browser_snapshot=15"
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "30"))
+MCP_TOOL_TIMEOUTS = {
+    "browser_navigate": 45.0,
+    "browser_snapshot": 20.0,
+    "browser_wait_for": 60.0,
+    **{
+        name.strip(): float(seconds)
+        for name, _, seconds in (item.partition("=") for item in os.getenv("MCP_TOOL_TIMEOUTS", "").split(","))
+        if name.strip() and seconds
+    },
+}
+MCP_TOOL_RETRIES = int(os.getenv("MCP_TOOL_RETRIES", "2"))
+# Tools that only read or navigate, so repeating them after a timeout cannot double an action
+RETRYABLE_TOOLS = {
+    "browser_navigate", "browser_snapshot", "browser_take_screenshot", "browser_tab_list",
+    "browser_console_messages", "browser_network_requests", "browser_wait_for",
+}
+
+
+class ToolCallPolicy:
+    """
+    MCP tool interceptor adding a per-tool timeout and, for read-only tools,
+    retries with jittered exponential backoff. A call that still fails is
+    returned to the agent as a tool error instead of aborting its run.
+    """
+
+    def __init__(self, timeouts: dict = None, default_timeout: float = MCP_TOOL_TIMEOUT,
+                 retries: int = MCP_TOOL_RETRIES, retryable: set = None):
+        self.timeouts = MCP_TOOL_TIMEOUTS if timeouts is None else timeouts
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.retryable = RETRYABLE_TOOLS if retryable is None else retryable
+        self.timeouts_hit = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def __call__(self, request, handler):
+        timeout = self.timeouts.get(request.name, self.default_timeout)
+        attempts = self.retries + 1 if request.name in self.retryable else 1
+        for attempt in range(attempts):
+            try:
+                return await asyncio.wait_for(handler(request), timeout)
+            except (asyncio.TimeoutError, OSError) as e:
+                error = e
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts_hit += 1
+            if attempt + 1 < attempts:
+                self.retried += 1
+                delay = min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                print(f"{request.name} failed ({type(error).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.failed += 1
+        reason = f"timed out after {timeout:g}s" if isinstance(error, asyncio.TimeoutError) else f"failed: {error}"
+        from mcp.types import CallToolResult, TextContent
+        return CallToolResult(
+            content=[TextContent(type="text", text=f"Error: {request.name} {reason}. Try again or take another approach.")],
+            isError=True,
+        )
+
+    def stats(self) -> dict:
+        return {"timeouts": self.timeouts_hit, "retried": self.retried, "failed": self.failed}
+
+
+def _tool_text(result) -> str:
+    """Joins the text parts of an MCP tool result."""
+    return "\n".join(getattr(part, "text", "") for part in getattr(result, "content", []) or [])
+
+
+class PoolMetrics:
+    """Startup and login time the warm pool saved, compared with opening everything cold."""
+
+    def __init__(self):
+        self.session_starts = 0
+        self.session_start_seconds = 0.0
+        self.session_reuses = 0
+        self.health_check_failures = 0
+        self.tool_list_loads = 0
+        self.restored_origins = 0
+        self._agent_seconds = {}  # affinity -> {"cold": [...], "warm": [...]}
+
+    def record_session_start(self, seconds: float):
+        self.session_starts += 1
+        self.session_start_seconds += seconds
+
+    def record_agent_run(self, affinity: str, authenticated: bool, seconds: float):
+        """Records an agent run that started signed out (cold) or with a reused login (warm)."""
+        runs = self._agent_seconds.setdefault(affinity, {"cold": [], "warm": []})
+        runs["warm" if authenticated else "cold"].append(seconds)
+
+    @property
+    def startup_seconds_saved(self) -> float:
+        if not self.session_starts:
+            return 0.0
+        return self.session_reuses * self.session_start_seconds / self.session_starts
+
+    @property
+    def login_seconds_saved(self) -> float:
+        """Warm runs times the measured gap between an average cold and warm run."""
+        saved = 0.0
+        for runs in self._agent_seconds.values():
+            if runs["cold"] and runs["warm"]:
+                gap = sum(runs["cold"]) / len(runs["cold"]) - sum(runs["warm"]) / len(runs["warm"])
+                saved += len(runs["warm"]) * max(0.0, gap)
+        return saved
+
+    def stats(self) -> dict:
+        return {
+            "session_starts": self.session_starts,
+            "session_reuses": self.session_reuses,
+            "startup_seconds_saved": round(self.startup_seconds_saved, 3),
+            "login_seconds_saved": round(self.login_seconds_saved, 3),
+            "tool_list_loads": self.tool_list_loads,
+            "restored_origins": self.restored_origins,
+            "health_check_failures": self.health_check_failures,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Session pool: {self.session_starts} sessions started, {self.session_reuses} reused "
+            f"(~{self.startup_seconds_saved:.1f}s startup saved), tool list loaded {self.tool_list_loads}x, "
+            f"{self.restored_origins} storage states restored, ~{self.login_seconds_saved:.1f}s login saved, "
+            f"{self.health_check_failures} unhealthy sessions replaced"
+        )
+
+
+class SessionSlot:
+    """One open Playwright MCP session together with its tools and the agents built on them."""
+
+    def __init__(self, index, session, tools, snapshots: SnapshotCompressor = None):
+        self.index = index
+        self.session = session
+        self.tools = tools
+        self.snapshots = snapshots
+        self.affinity = None
+        self.authenticated = set()  # Origins this browser is (likely) signed in to
+        self.uses = 0
+        self.last_used = time.monotonic()
+        self._agents = {}
+        self._stop = None
+        self._task = None
+
+    def agent_for(self, name, build_agent):
+        """Returns the agent `name` bound to this session, building it with `build_agent(slot)` on first use."""
+        if name not in self._agents:
+            self._agents[name] = build_agent(self)
+        return self._agents[name]
+
+    async def call_tool(self, name: str, arguments: dict) -> str:
+        """
+        Runs an MCP tool directly on this session and returns its text, for
+        code that drives the browser itself. Snapshots come back uncompressed
+        and never enter an agent's history.
+        """
+        timeout = MCP_TOOL_TIMEOUTS.get(name, MCP_TOOL_TIMEOUT)
+        result = await asyncio.wait_for(self.session.call_tool(name, arguments), timeout)
+        text = _tool_text(result)
+        if getattr(result, "isError", False):
+            raise RuntimeError(f"{name} failed: {text}")
+        return text
+
+    def start_conversation(self):
+        """Call before each agent run on this session; its snapshots are then sent in full again."""
+        if self.snapshots is not None:
+            self.snapshots.start_conversation()
+
+
+class PlaywrightSessionPool:
+    """
+    Keeps a fixed number of Playwright MCP sessions warm and leases them to
+    agents one at a time, so several leads can drive a browser concurrently.
+
+    The MCP tool list is fetched once and bound to every session. Each session
+    is held open by its own background task, so a pool started by one run can
+    be reused by later runs in the same event loop (see get_session_pool).
+    Cookies and localStorage of authenticated origins are saved to
+    `storage_state_path` (mode 0600) and restored into new sessions; HttpOnly
+    cookies are not visible to page scripts, so a restored login is treated
+    as a hint.
+    """
+
+    def __init__(self, mcp_clients, size: int = PLAYWRIGHT_POOL_SIZE, server_name: str = "playwright",
+                 storage_state_path: str = PLAYWRIGHT_STORAGE_STATE):
+        self.mcp_clients = mcp_clients
+        self.size = max(1, size)
+        self.server_name = server_name
+        self.storage_state_path = storage_state_path
+        self.metrics = PoolMetrics()
+        self.slots = []
+        self._busy = set()
+        self._condition = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._tool_specs = None
+        self._loop = None
+        self.tool_policy = ToolCallPolicy()
+        self.snapshot_stats = SnapshotStats()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def started(self) -> bool:
+        return bool(self.slots)
+
+    async def start(self):
+        """
+        Opens every session; a no-op if the pool is already warm. Concurrent
+        callers wait for the first one to finish opening the pool.
+        """
+        if self.started:
+            return
+        async with self._start_lock:
+            if self.started:
+                return
+            self._loop = asyncio.get_running_loop()
+            try:
+                for index in range(self.size):
+                    self.slots.append(await self._open_slot(index))
+            except BaseException:
+                await self.close()
+                raise
+
+    async def close(self):
+        """Saves authenticated storage state, then closes every session."""
+        for slot in self.slots:
+            if slot.authenticated:
+                await self.save_storage_state(slot)
+        slots, self.slots = self.slots, []
+        for slot in slots:
+            await self._close_slot(slot)
+
+    async def _hold_session(self, ready: asyncio.Future, stop: asyncio.Event):
+        """Background task owning one MCP session, so it is opened and closed in the same task."""
+        try:
+            async with self.mcp_clients.session(self.server_name) as session:
+                ready.set_result(session)
+                await stop.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"Playwright MCP session closed with an error: {e}")
+
+    async def _open_slot(self, index: int) -> SessionSlot:
+        started = time.perf_counter()
+        ready = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        task = asyncio.create_task(self._hold_session(ready, stop))
+        session = await ready
+
+        # Fetch the tool list once and bind the same definitions to every session
+        if self._tool_specs is None:
+            self._tool_specs = (await session.list_tools()).tools
+            self.metrics.tool_list_loads += 1
+        from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+        # Snapshots are diffed per browser session, so each session gets its own compressor
+        snapshots = SnapshotCompressor(self.snapshot_stats)
+        tools = [
+            convert_mcp_tool_to_langchain_tool(session, tool, tool_interceptors=[self.tool_policy, snapshots])
+            for tool in self._tool_specs
+        ]
+
+        slot = SessionSlot(index, session, tools, snapshots)
+        slot._stop, slot._task = stop, task
+        await self._restore_storage_state(slot)
+        self.metrics.record_session_start(time.perf_counter() - started)
+        return slot
+
+    async def _close_slot(self, slot: SessionSlot):
+        if slot._stop is not None:
+            slot._stop.set()
+        if slot._task is not None:
+            try:
+                await slot._task
+            except BaseException as e:
+                print(f"Error closing Playwright MCP session {slot.index}: {e}")
+
+    async def _healthy(self, slot: SessionSlot) -> bool:
+        """Pings a session that has been idle for a while."""
+        if time.monotonic() - slot.last_used < HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            await asyncio.wait_for(slot.session.send_ping(), HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            print(f"Playwright MCP session {slot.index} failed its health check: {e}")
+            return False
+
+    async def _replace_slot(self, slot: SessionSlot) -> SessionSlot:
+        """Closes an unhealthy session and opens a fresh one in its place."""
+        self.metrics.health_check_failures += 1
+        await self._close_slot(slot)
+        fresh = await self._open_slot(slot.index)
+        fresh.affinity = slot.affinity
+        self.slots[self.slots.index(slot)] = fresh
+        return fresh
+
+    def _pick(self, affinity):
+        """
+        Chooses an idle slot, keeping slots tagged with an affinity for the agent
+        that owns them: while the pool has untagged slots, other leases wait for
+        one of those rather than navigate e.g. the signed-in Apollo tab away.
+        Only when every slot is tagged (a pool of one) are tagged slots shared.
+        """
+        idle = [slot for slot in self.slots if slot.index not in self._busy]
+        if affinity is not None:
+            tagged = [slot for slot in self.slots if slot.affinity == affinity]
+            if tagged:
+                return tagged[0] if tagged[0].index not in self._busy else None
+        untagged = [slot for slot in self.slots if slot.affinity is None]
+        if untagged:
+            free = [slot for slot in untagged if slot.index not in self._busy]
+            if free and affinity is not None:
+                free[0].affinity = affinity
+            return free[0] if free else None
+        return idle[0] if idle else None
+
+    @asynccontextmanager
+    async def lease(self, affinity: str = None):
+        """
+        Waits for a free, healthy session and holds it for the duration of the block.
+
+        Args:
+            affinity: Optional owner tag; the same owner always gets the same
+                browser session back (e.g. to stay logged in to Apollo).
+        """
+        await self.start()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._pick(affinity) is not None)
+            slot = self._pick(affinity)
+            self._busy.add(slot.index)
+        index = slot.index
+        try:
+            if not await self._healthy(slot):
+                slot = await self._replace_slot(slot)
+            if slot.uses:
+                self.metrics.session_reuses += 1
+            slot.uses += 1
+            yield slot
+        finally:
+            slot.last_used = time.monotonic()
+            async with self._condition:
+                self._busy.discard(index)
+                self._condition.notify_all()
+
+    def _load_storage_state(self) -> dict:
+        try:
+            with open(self.storage_state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error reading browser storage state: {e}")
+            return {}
+
+    async def save_storage_state(self, slot: SessionSlot):
+        """Captures cookies and localStorage of the slot's current page and writes them to disk."""
+        try:
+            result = await slot.session.call_tool("browser_evaluate", {"function": _CAPTURE_STORAGE_JS})
+            text = _tool_text(result)
+            state, _ = json.JSONDecoder().raw_decode(text[text.index("{"):])
+            if not state.get("origin") or state["origin"] == "null":
+                return
+            saved = self._load_storage_state()
+            saved[state["origin"]] = state
+            directory = os.path.dirname(self.storage_state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.storage_state_path}.tmp"
+            # Session cookies: readable by the owner only, also when a stale temp file was left behind
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.chmod(tmp_path, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.storage_state_path)
+        except Exception as e:
+            print(f"Error saving browser storage state: {e}")
+
+    async def _restore_storage_state(self, slot: SessionSlot):
+        """Loads saved cookies and localStorage into a new session, one origin at a time."""
+        for origin, state in self._load_storage_state().items():
+            try:
+                await slot.session.call_tool("browser_navigate", {"url": origin})
+                await slot.session.call_tool(
+                    "browser_evaluate", {"function": _RESTORE_STORAGE_JS.format(state=json.dumps(state))})
+                slot.authenticated.add(origin)
+                self.metrics.restored_origins += 1
+            except Exception as e:
+                print(f"Error restoring browser storage state for {origin}: {e}")
+
+    async def mark_authenticated(self, slot: SessionSlot, origin: str):
+        """Records that `slot` is signed in to `origin` and persists its storage state."""
+        slot.authenticated.add(origin)
+        await self.save_storage_state(slot)
+
+
+# Warm pools shared by every run in the process, keyed by client and size
+_shared_pools = {}
+# Guards _shared_pools; asyncio locks belong to one event loop, so there is one per loop
+_registry_locks = weakref.WeakKeyDictionary()
+
+
+def _registry_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    if loop not in _registry_locks:
+        _registry_locks[loop] = asyncio.Lock()
+    return _registry_locks[loop]
+
+
+async def get_session_pool(mcp_clients, size: int = PLAYWRIGHT_POOL_SIZE) -> PlaywrightSessionPool:
+    """
+    Returns the process-wide warm pool for these MCP clients, starting it on
+    first use. Concurrent first calls (e.g. the campaigns of a batch) get the
+    same pool, opened once.
+    """
+    key = (id(mcp_clients), size)
+    async with _registry_lock():
+        pool = _shared_pools.get(key)
+        if pool is not None and pool._loop is not asyncio.get_running_loop():
+            # A pool started under a previous event loop cannot be reused
+            pool = None
+        if pool is None:
+            pool = PlaywrightSessionPool(mcp_clients, size=size)
+            pool._loop = asyncio.get_running_loop()  # Marks the pool as starting on this loop
+            _shared_pools[key] = pool
+    await pool.start()
+    return pool
+
+
+async def close_session_pools():
+    """Closes every shared pool, saving authenticated browser state first."""
+    for pool in list(_shared_pools.values()):
+        if pool._loop is asyncio.get_running_loop():
+            print(pool.metrics.summary())
+            await pool.close()
+    _shared_pools.clear()
@@ -0,0 +1,284 @@
+import asyncio
+import os
+import time
+from langchain_core.messages import HumanMessage
+from apollo_extractor import lead_listener
+from lead_index import DEDUP_MAX_REPLACEMENT_ROUNDS, lead_identities
+from lead_utils import apply_lead_patches, empty_lead, lead_key, lead_value, normalize_lead
+from llm_budget import AGENT_MAX_RETRIES, retry_delay
+from research_stage import leads_pending_research
+from roleFunctions import EMAIL_CONCURRENCY, needs_email
+
+# Run Apollo, research and email as concurrent stages connected by queues instead of the Supervisor graph
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "false").lower() in ("1", "true", "yes")
+# Leads waiting between two stages before the earlier stage pauses
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "25"))
+PIPELINE_RESEARCH_WORKERS = int(os.getenv("PIPELINE_RESEARCH_WORKERS", "8"))
+PIPELINE_EMAIL_WORKERS = int(os.getenv("PIPELINE_EMAIL_WORKERS", str(EMAIL_CONCURRENCY)))
+# Times a lead whose research hit the model's rate limit is put back on the research queue
+PIPELINE_RESEARCH_REQUEUES = int(os.getenv("PIPELINE_RESEARCH_REQUEUES", str(AGENT_MAX_RETRIES)))
+
+
+class StageStats:
+    """Work done by one pipeline stage and how deep its input queue got."""
+
+    def __init__(self):
+        self.leads = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue = 0
+        self.first_output_seconds = None
+
+    def stats(self) -> dict:
+        return {
+            "leads": self.leads,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "max_queue": self.max_queue,
+            "first_output_seconds": self.first_output_seconds,
+        }
+
+
+class LeadPipeline:
+    """
+    Streaming alternative to the Supervisor graph. ApolloAgent pushes every
+    lead onto the research queue as soon as extract_apollo_leads accepts it;
+    research workers take leads from there and hand them to the email queue,
+    and email workers write each finished lead to the sink. Both queues are
+    bounded, so a slow stage holds back the one before it instead of piling
+    up leads, and the run takes about as long as its slowest stage.
+
+    The stages are the graph's own nodes: `apollo_node` (agent_node), the
+    per-lead `research_node` and a per-lead `email_node`. Leads are checked
+    against `lead_index` as they arrive and ApolloAgent is asked for
+    replacements, like the dedup node does. A lead whose research hit the
+    rate limit is put back on the research queue after a backoff, as the
+    graph leaves it pending for a later pass. There is no Supervisor pass and
+    no checkpointing; finished leads are persisted by the sink.
+    """
+
+    def __init__(self, apollo_node, research_node, email_node, lead_sink, lead_index=None, run_id: str = "",
+                 config: dict = None, browser_sessions: int = 1, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 research_workers: int = PIPELINE_RESEARCH_WORKERS, email_workers: int = PIPELINE_EMAIL_WORKERS,
+                 max_rounds: int = DEDUP_MAX_REPLACEMENT_ROUNDS, research_requeues: int = PIPELINE_RESEARCH_REQUEUES,
+                 on_lead_done=None):
+        self.apollo_node = apollo_node
+        self.research_node = research_node
+        self.email_node = email_node
+        self.lead_sink = lead_sink
+        self.lead_index = lead_index
+        self.run_id = run_id
+        self.config = config or {}
+        self.browser_sessions = browser_sessions
+        self.queue_size = queue_size
+        self.research_workers = max(1, research_workers)
+        self.email_workers = max(1, email_workers)
+        self.max_rounds = max_rounds
+        self.research_requeues = research_requeues
+        self.on_lead_done = on_lead_done
+        self.leads = {}  # lead_id -> latest version of every accepted lead
+        self.messages = []
+        self.duplicates = 0
+        self.apollo_rounds = 0
+        self.requeued = {}  # lead_id -> times its research was put back after a rate limit
+        self._requeue_tasks = set()
+        self.stages = {"apollo": StageStats(), "research": StageStats(), "email": StageStats()}
+        self.completed = 0
+        self.first_completed_seconds = None
+        self._started = time.perf_counter()
+
+    def _node_config(self, node: str) -> dict:
+        """Runs a node the way the graph would, so RunMetrics attributes its calls to `node`."""
+        metadata = {**self.config.get("metadata", {}), "langgraph_node": node}
+        return {**self.config, "run_name": node, "metadata": metadata}
+
+    def _elapsed(self) -> float:
+        return round(time.perf_counter() - self._started, 3)
+
+    def _output(self, stage: str, seconds: float):
+        stats = self.stages[stage]
+        stats.leads += 1
+        stats.busy_seconds += seconds
+        if stats.first_output_seconds is None:
+            stats.first_output_seconds = self._elapsed()
+
+    async def run(self, prompt: str, lead_count: int) -> dict:
+        """Runs all stages until `lead_count` leads went through; returns a final state like the graph's."""
+        self._started = time.perf_counter()
+        # With a single browser session ApolloAgent keeps it while it waits on a full queue, and
+        # research could never get one; leave the research queue unbounded then
+        research_queue = asyncio.Queue(self.queue_size if self.browser_sessions > 1 else 0)
+        email_queue = asyncio.Queue(self.queue_size)
+        workers = [asyncio.create_task(self._research_worker(research_queue, email_queue)) for _ in range(self.research_workers)]
+        workers += [asyncio.create_task(self._email_worker(email_queue)) for _ in range(self.email_workers)]
+        try:
+            await self._produce(prompt, lead_count, research_queue)
+            await research_queue.join()
+            await email_queue.join()
+        finally:
+            for worker in workers + list(self._requeue_tasks):
+                worker.cancel()
+            await asyncio.gather(*workers, *self._requeue_tasks, return_exceptions=True)
+        return {"subgraph_messages": self.messages, "next_agent": "end", "information_list": list(self.leads.values())}
+
+    async def _produce(self, prompt: str, lead_count: int, research_queue: asyncio.Queue):
+        """Runs ApolloAgent, in replacement rounds if needed, and queues every new unique lead it finds."""
+        self.messages = [HumanMessage(content=prompt)]
+        offered = set()   # lead_key of every lead Apollo returned, accepted or not
+        accepted = set()  # identities of the leads accepted in this run
+        domains = self.lead_index.domains if self.lead_index is not None else False
+
+        async def accept(record: dict):
+            lead = normalize_lead({key: value for key, value in record.items() if key != "lead_id"})
+            key = lead_key(lead)
+            if key in offered or len(self.leads) >= lead_count or not lead_value(lead, "email"):
+                return
+            offered.add(key)
+            identities = lead_identities(lead, domains)
+            reason = self.lead_index.duplicate_reason(lead, exclude_run=self.run_id) if self.lead_index is not None else None
+            if reason is None:
+                clash = next((identity for identity in identities if identity in accepted), None)
+                reason = f"{clash[0]} {clash[1]} repeated in this run" if clash else None
+            if reason:
+                self.duplicates += 1
+                print(f"Deduplication: skipping {lead_value(lead, 'name')} ({reason})")
+                return
+            accepted.update(identities)
+            self.leads[lead["lead_id"]] = lead
+            self._output("apollo", 0.0)
+            await research_queue.put(lead)
+            self.stages["research"].max_queue = max(self.stages["research"].max_queue, research_queue.qsize())
+
+        for round_index in range(self.max_rounds + 1):
+            remaining = lead_count - len(self.leads)
+            if remaining <= 0:
+                break
+            if round_index:
+                self.messages = self.messages + [HumanMessage(content=(
+                    f"{remaining} more leads are needed; {self.duplicates} leads found so far were contacted before "
+                    f"or repeat another lead. ApolloAgent: find {remaining} new verified leads for the empty lead_ids "
+                    "and do not return people or companies you already returned."
+                ))]
+            empties = [empty_lead() for _ in range(remaining)]
+            self.apollo_rounds += 1
+            started = time.perf_counter()
+            token = lead_listener.set(accept)
+            try:
+                result = await self.apollo_node.ainvoke(
+                    {"subgraph_messages": self.messages, "next_agent": "ApolloAgent", "information_list": empties},
+                    self._node_config("ApolloAgent"),
+                )
+                self.messages = result.get("subgraph_messages") or self.messages
+                # Leads the agent wrote into its answer instead of extracting them were not streamed yet
+                for lead in apply_lead_patches(empties, result.get("information_list")):
+                    await accept(lead)
+            except Exception as e:
+                print(f"Error running ApolloAgent in the pipeline: {e}")
+                self.stages["apollo"].errors += 1
+            finally:
+                lead_listener.reset(token)
+                self.stages["apollo"].busy_seconds += time.perf_counter() - started
+
+    async def _research_worker(self, research_queue: asyncio.Queue, email_queue: asyncio.Queue):
+        while True:
+            lead = await research_queue.get()
+            started = time.perf_counter()
+            requeued = False
+            try:
+                if leads_pending_research([lead]):
+                    result = await self.research_node.ainvoke({"lead": lead}, self._node_config("research_lead"))
+                    if not result.get("information_list"):
+                        # Rate limited: the lead is still pending, research it again after a backoff
+                        requeued = self._requeue(lead, research_queue)
+                        if requeued:
+                            continue
+                    lead = apply_lead_patches([lead], result.get("information_list"))[0]
+                self._output("research", time.perf_counter() - started)
+                if needs_email(lead):
+                    await email_queue.put(lead)
+                    self.stages["email"].max_queue = max(self.stages["email"].max_queue, email_queue.qsize())
+                else:
+                    # No website, inaccessible or still unresearched: nothing to email
+                    self._finish(lead)
+            except Exception as e:
+                print(f"Error researching {lead_value(lead, 'company website link')} in the pipeline: {e}")
+                self.stages["research"].errors += 1
+                self._finish(lead)
+            finally:
+                if not requeued:
+                    research_queue.task_done()
+
+    def _requeue(self, lead: dict, research_queue: asyncio.Queue) -> bool:
+        """
+        Puts a rate-limited lead back on the research queue after a backoff.
+        Its queue item stays open until then, so the run does not end early.
+        Returns False once the lead used up its requeues.
+        """
+        attempt = self.requeued.get(lead["lead_id"], 0)
+        if attempt >= self.research_requeues:
+            return False
+        self.requeued[lead["lead_id"]] = attempt + 1
+        delay = retry_delay(attempt)
+        print(f"Research of {lead_value(lead, 'company website link')} was rate limited; retrying in {delay:.1f}s")
+
+        async def put_back():
+            try:
+                await asyncio.sleep(delay)
+                await research_queue.put(lead)
+            finally:
+                research_queue.task_done()
+
+        task = asyncio.create_task(put_back())
+        self._requeue_tasks.add(task)
+        task.add_done_callback(self._requeue_tasks.discard)
+        return True
+
+    async def _email_worker(self, email_queue: asyncio.Queue):
+        while True:
+            lead = await email_queue.get()
+            started = time.perf_counter()
+            try:
+                result = await self.email_node.ainvoke(
+                    {"subgraph_messages": [], "information_list": [lead]}, self._node_config("EmailGenerator"))
+                lead = apply_lead_patches([lead], result.get("information_list"))[0]
+                self._output("email", time.perf_counter() - started)
+            except Exception as e:
+                print(f"Error drafting the email for {lead_value(lead, 'company name')} in the pipeline: {e}")
+                self.stages["email"].errors += 1
+            finally:
+                self._finish(lead)
+                email_queue.task_done()
+
+    def _finish(self, lead: dict):
+        """Stores a lead that left the pipeline and persists it if it is complete."""
+        self.leads[lead["lead_id"]] = lead
+        try:
+            written = self.lead_sink.write_completed([lead])
+            if written:
+                self.completed += 1
+                if self.first_completed_seconds is None:
+                    self.first_completed_seconds = self._elapsed()
+                if self.lead_index is not None:
+                    self.lead_index.add(lead, self.run_id)
+        except Exception as e:
+            print(f"Error saving lead {lead.get('lead_id')}: {e}")
+        if self.on_lead_done is not None:
+            self.on_lead_done(lead)
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "duplicates": self.duplicates,
+            "apollo_rounds": self.apollo_rounds,
+            "research_requeues": sum(self.requeued.values()),
+            "first_completed_seconds": self.first_completed_seconds,
+            "stages": {name: stage.stats() for name, stage in self.stages.items()},
+        }
+
+    def summary(self) -> str:
+        stages = ", ".join(
+            f"{name} {stage.leads} leads (first after {stage.first_output_seconds}s, max queue {stage.max_queue})"
+            for name, stage in self.stages.items()
+        )
+        return (f"Pipeline: {self.completed} leads completed, first after {self.first_completed_seconds}s; {stages}; "
+                f"{self.duplicates} duplicates skipped in {self.apollo_rounds} Apollo rounds")
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import time
+from lead_utils import normalize_domain
+
+# Location and limits of the on-disk company research cache
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH", "research_cache.sqlite")
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", str(30 * 24 * 3600)))
+RESEARCH_CACHE_FAILURE_TTL = float(os.getenv("RESEARCH_CACHE_FAILURE_TTL", str(24 * 3600)))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+
+class ResearchCache:
+    """
+    SQLite cache of company research keyed by normalized website domain, so a
+    company researched in an earlier campaign skips the browser and the LLM.
+
+    Successful research lives for `ttl_seconds`; inaccessible or blocked sites
+    only for `failure_ttl_seconds`, since those are often transient. When the
+    cache grows past `max_entries` the least recently used domains are evicted.
+    """
+
+    def __init__(self, path: str = RESEARCH_CACHE_PATH, ttl_seconds: float = RESEARCH_CACHE_TTL,
+                 failure_ttl_seconds: float = RESEARCH_CACHE_FAILURE_TTL,
+                 max_entries: int = RESEARCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS company_research ("
+            " domain TEXT PRIMARY KEY,"
+            " company_details TEXT NOT NULL,"
+            " company_type TEXT NOT NULL,"
+            " website_inaccessible INTEGER NOT NULL,"
+            " security_error INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS company_research_accessed ON company_research (accessed_at)")
+        self._conn.commit()
+
+    def get(self, website: str):
+        """Returns the cached research fields for a website, or None on a miss or expired entry."""
+        domain = normalize_domain(website)
+        row = None
+        if domain:
+            row = self._conn.execute(
+                "SELECT company_details, company_type, website_inaccessible, security_error, expires_at"
+                " FROM company_research WHERE domain = ?", (domain,)
+            ).fetchone()
+
+        now = time.time()
+        if row is None or row[4] <= now:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute("UPDATE company_research SET accessed_at = ? WHERE domain = ?", (now, domain))
+        self._conn.commit()
+        updates = {
+            "company details": row[0],
+            "website_inaccessible": bool(row[2]),
+            "security_error": bool(row[3]),
+        }
+        if row[1]:
+            updates["company type"] = row[1]
+        return updates
+
+    def put(self, website: str, updates: dict):
+        """Stores the research outcome for a website's domain, then applies TTL and size eviction."""
+        domain = normalize_domain(website)
+        if not domain:
+            return
+
+        failed = bool(updates.get("website_inaccessible") or updates.get("security_error"))
+        now = time.time()
+        expires_at = now + (self.failure_ttl_seconds if failed else self.ttl_seconds)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO company_research VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                domain,
+                str(updates.get("company details", "")),
+                str(updates.get("company type", "")),
+                int(bool(updates.get("website_inaccessible"))),
+                int(bool(updates.get("security_error"))),
+                expires_at,
+                now,
+            ),
+        )
+        self.evict(now)
+        self._conn.commit()
+
+    def evict(self, now: float = None):
+        """Drops expired entries, then the least recently used ones beyond `max_entries`."""
+        now = time.time() if now is None else now
+        self._conn.execute("DELETE FROM company_research WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM company_research WHERE domain IN ("
+            " SELECT domain FROM company_research ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        """Hit and miss counts for the current run."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._conn.close()
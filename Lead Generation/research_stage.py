@@ -0,0 +1,166 @@
+import json
+import os
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.types import Send
+from lead_utils import extract_json, lead_patch, lead_value, leads_from_state
+from llm_budget import AGENT_MAX_RETRIES, call_with_retry, is_rate_limit
+from roleAgents import LeadResearchAgent
+
+# Fields the research stage is allowed to write back onto a lead
+RESEARCH_FIELDS = ("company details", "company type", "website_inaccessible", "security_error")
+# Research passes a lead may stay pending through (empty answers, rate limits) before it is given up on
+RESEARCH_MAX_ATTEMPTS = int(os.getenv("RESEARCH_MAX_ATTEMPTS", "3"))
+
+
+def leads_pending_research(information_list) -> list:
+    """Returns the leads that have a website but no research outcome yet."""
+    pending = []
+    for lead in leads_from_state(information_list):
+        if not lead_value(lead, "company website link"):
+            continue
+        if lead_value(lead, "company details") or lead.get("website_inaccessible") or lead.get("security_error"):
+            continue
+        pending.append(lead)
+    return pending
+
+
+def research_fanout(state) -> list:
+    """
+    Maps the Supervisor's ResearchAgent decision onto one `research_lead`
+    branch per pending lead; LangGraph runs the branches concurrently and the
+    `information_list` reducer applies each branch's patch by lead_id.
+    """
+    sends = [Send("research_lead", {"lead": lead}) for lead in leads_pending_research(state["information_list"])]
+    return sends or "research_merge"
+
+
+def parse_research_output(text: str):
+    """
+    Turns the research agent's final answer into the lead fields it is allowed
+    to update, or None when the answer cannot be parsed; that says nothing
+    about the website, so it must not be cached as an outcome.
+    """
+    try:
+        parsed = json.loads(extract_json(text))
+        if not isinstance(parsed, dict):
+            raise ValueError("answer is not a JSON object")
+    except Exception as e:
+        print(f"Error parsing research output: {e}")
+        return None
+
+    updates = {
+        "company details": str(parsed.get("company_details") or parsed.get("company details") or ""),
+        "website_inaccessible": bool(parsed.get("website_inaccessible", False)),
+        "security_error": bool(parsed.get("security_error", False)),
+    }
+    company_type = parsed.get("company_type") or parsed.get("company type")
+    if company_type:
+        updates["company type"] = str(company_type)
+    return updates
+
+
+def research_lead_node_factory(session_pool, model=None, cache=None, fast_researcher=None) -> RunnableLambda:
+    """
+    Creates the per-lead research node, which borrows one browser session from the pool.
+    When a ResearchCache is given, a fresh cached entry for the website's domain is
+    returned directly, skipping both the browser and the LLM. When a FastResearcher
+    is given, static sites are read over plain HTTP and only JS-heavy, blocked or
+    CAPTCHA pages reach the Playwright agent.
+    """
+
+    def build_agent(slot):
+        if model is None:
+            return LeadResearchAgent(tools=slot.tools).agent
+        return LeadResearchAgent(tools=slot.tools, model=model).agent
+
+    def patch(lead: dict, updates: dict) -> dict:
+        fields = {field: updates[field] for field in RESEARCH_FIELDS if field in updates}
+        return {"information_list": [lead_patch(lead["lead_id"], **fields)]}
+
+    async def research_lead(payload: dict) -> dict:
+        lead = payload["lead"]
+        website = lead_value(lead, "company website link")
+
+        # Reuse research from an earlier run of the same domain
+        cached = cache.get(website) if cache is not None else None
+        if cached is not None:
+            return patch(lead, cached)
+
+        # Cheap HTTP fetch + one summary call before driving a browser
+        if fast_researcher is not None:
+            updates = await fast_researcher.research(lead)
+            if updates is not None:
+                if cache is not None:
+                    cache.put(website, updates)
+                return patch(lead, updates)
+
+        task = (
+            f"Research this company.\n"
+            f"company_name: {lead_value(lead, 'company name')}\n"
+            f"company_website: {website}\n"
+            f"company_type: {lead_value(lead, 'company type')}"
+        )
+
+        try:
+            async with session_pool.lease() as slot:
+                agent = slot.agent_for("research", build_agent)
+
+                async def invoke():
+                    slot.start_conversation()
+                    return await agent.ainvoke({"messages": [HumanMessage(content=task)]})
+
+                response = await call_with_retry(
+                    invoke, retry_on=is_rate_limit, max_retries=AGENT_MAX_RETRIES, label="research_lead")
+            updates = parse_research_output(response["messages"][-1].content)
+            if updates is None:
+                # A malformed answer: give up on the lead for this run only, without caching it for the domain
+                updates = {"company details": "", "website_inaccessible": True}
+            elif cache is not None:
+                cache.put(website, updates)
+        except Exception as e:
+            print(f"Error researching {website}: {e}")
+            if is_rate_limit(e):
+                # Not the website's fault: leave the lead pending for a later research pass
+                return {"information_list": []}
+            updates = {"company details": "", "website_inaccessible": True}
+
+        return patch(lead, updates)
+
+    return RunnableLambda(research_lead)
+
+
+def research_merge_node(max_attempts: int = RESEARCH_MAX_ATTEMPTS) -> RunnableLambda:
+    """
+    Creates the node that runs once all research branches finished and reports the outcome to the Supervisor.
+
+    Every lead still pending after a research pass (an empty answer, or a
+    rate limit) counts an attempt in the `research_attempts` state; after
+    `max_attempts` passes it is marked website_inaccessible, so the
+    Supervisor cannot keep sending ResearchAgent back to the same leads.
+    """
+
+    async def research_merge(state: dict) -> dict:
+        messages = state.get("subgraph_messages", [])
+        attempts = dict(state.get("research_attempts") or {})
+        patches = []
+        for lead in leads_pending_research(state.get("information_list", [])):
+            attempts[lead["lead_id"]] = attempts.get(lead["lead_id"], 0) + 1
+            if attempts[lead["lead_id"]] >= max_attempts:
+                patches.append(lead_patch(lead["lead_id"], website_inaccessible=True))
+        leads = [lead for lead in leads_from_state(state.get("information_list", [])) if lead_value(lead, "company website link")]
+
+        researched = sum(1 for lead in leads if lead_value(lead, "company details"))
+        skipped = sum(1 for lead in leads if lead.get("website_inaccessible") or lead.get("security_error"))
+        given_up = f" ({len(patches)} given up after {max_attempts} attempts)" if patches else ""
+        summary = AIMessage(content=(
+            f"ResearchAgent researched {len(leads)} company websites in parallel: "
+            f"{researched} summarized, {len(patches) + skipped} inaccessible or blocked{given_up}."
+        ))
+
+        update = {"subgraph_messages": messages + [summary], "next_agent": "supervisor", "research_attempts": attempts}
+        if patches:
+            update["information_list"] = patches
+        return update
+
+    return RunnableLambda(research_merge)
@@ -0,0 +1,42 @@
+"""
+Process-wide clients, built on first use instead of at import time.
+
+Importing the workflow modules no longer constructs an LLM client or the MCP
+client; `get_model()` and `get_mcp_client()` build them the first time a run
+needs them and hand the same instance to every later caller. Models are
+keyed by their `LLMConfig.llm()` arguments, so each configuration gets one
+client shared by the Supervisor, the agents and the email generator.
+"""
+from llm_budget import rate_limited
+from mcp_utils import PLAYWRIGHT_MCP_URL, get_mcp_clients
+
+_models = {}
+_mcp_clients = {}
+
+
+def get_model(**config):
+    """Returns the shared chat model for `config` (LLMConfig.llm keyword arguments), paced by the rate limiter."""
+    key = tuple(sorted(config.items()))
+    if key not in _models:
+        # Provider SDKs are only imported once a model is actually needed
+        from LLMConfig import llm
+        _models[key] = rate_limited(llm(**config))
+    return _models[key]
+
+
+def get_mcp_client(url: str = PLAYWRIGHT_MCP_URL):
+    """Returns the shared MultiServerMCPClient for `url`, or None if it cannot be created."""
+    if _mcp_clients.get(url) is None:
+        _mcp_clients[url] = get_mcp_clients(url)
+    return _mcp_clients[url]
+
+
+def loaded() -> dict:
+    """What has been built so far, for startup checks and run reports."""
+    return {"models": len(_models), "mcp_clients": sum(client is not None for client in _mcp_clients.values())}
+
+
+def reset():
+    """Forgets the built clients so the next call constructs them again (e.g. after changing settings)."""
+    _models.clear()
+    _mcp_clients.clear()
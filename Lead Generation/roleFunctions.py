@@ -1,27 +1,149 @@
 from langchain_core.runnables import RunnableLambda
-from LLMConfig import llm
 from langchain_core.messages import AIMessage, HumanMessage
+from context_compaction import context_messages
+from instrumentation import record_retry
+from lead_utils import compact_leads, lead_patch, lead_value, leads_from_state, patches_from_agent_output
+from llm_budget import ainvoke_with_retry, get_rate_limiter, is_rate_limit, retry_delay
+from llm_cache import cached_llm, forget_response
+from resources import get_model
+from structured_output import astream_structured
+import asyncio
 import json
-import re
+import os
+
+# "per_lead" runs one small LLM call per lead; "batch" sends every lead in a single prompt
+EMAIL_GENERATION_MODE = os.getenv("EMAIL_GENERATION_MODE", "per_lead")
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "5"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "2"))
+
+# Lead fields the per-lead email calls are allowed to write
+EMAIL_FIELDS = {
+    "personalized_email_subject": "personalized email subject",
+    "personalized_email_body": "personalized email body",
+}
+
+# What a per-lead email answer is validated against; also used for native structured output
+EMAIL_SCHEMA = {
+    "title": "outreach_email",
+    "description": "A personalized outreach email for one lead.",
+    "type": "object",
+    "properties": {
+        "personalized_email_subject": {"type": "string", "minLength": 1},
+        "personalized_email_body": {"type": "string", "minLength": 1},
+    },
+    "required": ["personalized_email_subject", "personalized_email_body"],
+}
+
+
+def needs_email(lead: dict) -> bool:
+    """True when a lead has usable research and no email drafted yet."""
+    if lead.get("website_inaccessible") or lead.get("security_error"):
+        return False
+    if not lead_value(lead, "company details"):
+        return False
+    return not lead_value(lead, "personalized email body")
+
+
+def email_generator(mode: str = EMAIL_GENERATION_MODE, concurrency: int = EMAIL_CONCURRENCY,
+                    max_retries: int = EMAIL_MAX_RETRIES) -> RunnableLambda:
+    """
+    Creates a RunnableLambda node for generating personalized outreach emails.
+
+    Args:
+        mode: "per_lead" drafts each email in its own concurrent call, "batch" drafts all in one call.
+        concurrency: Maximum number of per-lead calls in flight at once.
+        max_retries: Extra attempts for a lead whose call fails or returns unusable output.
+    """
+
+    # Initialize the LLM model, answering repeated prompts from the response cache
+    azure_model = cached_llm(get_model(), node="email_generator")
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    def lead_prompt(lead: dict) -> str:
+        """Prompt for a single lead, carrying only the fields the email needs."""
+        lead_context = {
+            "name": lead_value(lead, "name"),
+            "designation": lead_value(lead, "designation"),
+            "company name": lead_value(lead, "company name"),
+            "company type": lead_value(lead, "company type"),
+            "employee count": lead_value(lead, "employee count"),
+            "company details": lead_value(lead, "company details"),
+        }
+        return f"""
+            You are **EmailAgent**, an AI sales outreach specialist representing a **hardware computer store**.
 
+            **Goal:**
+            Write one personalized, professional B2B outreach email to the lead below showing how our hardware expertise
+            can help their business achieve higher efficiency and reliability.
 
-def email_generator() -> RunnableLambda:
-    """Creates a RunnableLambda node for generating personalized outreach emails."""
-    
-    # Initialize the LLM model
-    azure_model = llm()
+            **Lead:**
+            {json.dumps(lead_context, ensure_ascii=False)}
 
-    def extract_json(text: str) -> str:
-        """Extract JSON content from a string using regex."""
-        try:
-            match = re.search(r"\{.*\}", text, re.DOTALL)
-            return match.group(0) if match else text
-        except Exception as e:
-            print(f"Error extracting JSON: {e}")
-            return text
+            **Instructions:**
+            - Carefully read `company details` to understand the company’s domain, pain points, and context.
+            - Tailor the email to how our hardware solutions or computer systems can **help their business rise higher**.
+            - Keep the email **concise (120–150 words)**, **persuasive**, and **goal-driven**, in a professional yet approachable tone.
+            - End with a **clear call-to-action**, such as scheduling a short call, demo, or free consultation.
+            - Do **not fabricate** details or make unrealistic promises.
+
+            **Output Format:**
+            {{
+            "personalized_email_subject": "<short, compelling subject line>",
+            "personalized_email_body": "<customized, persuasive outreach email>"
+            }}
+            """
+
+    async def draft_email(lead: dict) -> dict:
+        """Drafts one lead's email, retrying only this lead on failure. Returns {} if every attempt fails."""
+        for attempt in range(max_retries + 1):
+            try:
+                request = [HumanMessage(content=lead_prompt(lead))]
+                try:
+                    # Streamed, so any remarks the model adds after the JSON are not waited for
+                    async with semaphore:
+                        answer = await astream_structured(azure_model, request, EMAIL_SCHEMA)
+                except ValueError:
+                    # Do not let a cached unusable answer be served to the retry
+                    forget_response(azure_model, request)
+                    raise
+                return {field: str(answer.value[key]).strip() for key, field in EMAIL_FIELDS.items()}
+            except Exception as e:
+                print(f"Error drafting email for {lead_value(lead, 'company name')} (attempt {attempt + 1}): {e}")
+                if is_rate_limit(e):
+                    # Slow every caller down, not just this lead
+                    get_rate_limiter().penalize(e)
+                if attempt < max_retries:
+                    await record_retry("email_generator", lead_id=lead.get("lead_id"))
+                    # Jittered exponential backoff (at least the provider's Retry-After) before retrying this lead only
+                    await asyncio.sleep(retry_delay(attempt, e, cap=8.0))
+        return {}
+
+    async def run_per_lead(state):
+        """Drafts each pending lead's email in its own call and merges only the email fields back."""
+        messages = state.get("subgraph_messages", [])
+        leads = leads_from_state(state.get("information_list", []))
+
+        pending = [lead for lead in leads if needs_email(lead)]
+        drafts = await asyncio.gather(*(draft_email(lead) for lead in pending))
+        patches = [lead_patch(lead["lead_id"], **email) for lead, email in zip(pending, drafts) if email]
+
+        failed = len(pending) - len(patches)
+        assistant_msg = (
+            f"Personalized outreach emails generated for {len(patches)} of {len(pending)} leads"
+            + (f"; {failed} failed after {max_retries + 1} attempts and can be retried." if failed else ".")
+        )
+        updated_messages = messages + [AIMessage(content=assistant_msg)]
+
+        return {
+            "subgraph_messages": updated_messages,
+            "next_agent": "supervisor",
+            "information_list": patches
+        }
 
     async def run_agent(state):
         """Async function to generate personalized emails for each company."""
+        if mode == "per_lead":
+            return await run_per_lead(state)
         
         # Extract current workflow state
         try:
@@ -29,7 +151,7 @@ def email_generator() -> RunnableLambda:
             information_list = state.get("information_list", [])
         except Exception as e:
             print(f"Error reading state in agent_node: {e}")
-            return {"subgraph_messages": [], "next_agent": "supervisor", "information_list": []}
+            return {"subgraph_messages": [], "next_agent": "supervisor"}
 
         # Prepare the prompt for the email generation model
         prompt = f"""
@@ -41,6 +163,9 @@ def email_generator() -> RunnableLambda:
             **Goal:**
             For each company in `information_list`, generate a personalized, professional B2B outreach email that highlights how our hardware expertise can help them achieve higher efficiency and reliability.
 
+            **information_list:**
+            {compact_leads(leads_from_state(information_list))}
+
             **Instructions:**
             - Skip companies where `company_details` is missing or `website_inaccessible` is true.
             - Carefully read `company_details` to understand the company’s domain, pain points, and context before drafting the email.
@@ -51,50 +176,42 @@ def email_generator() -> RunnableLambda:
             - Do **not fabricate** details or make unrealistic promises.
 
             **Output Requirements:**
-            For each valid company, add or update:
+            For each valid company, return one patch keyed by its `lead_id` that sets only:
             - "personalized_email_subject": "<short, compelling subject line>"
             - "personalized_email_body": "<customized, persuasive outreach email>"
 
-            All other fields must remain unchanged.
+            Do not repeat any other field.
 
             **Output Format:**
             {{
             "next_agent": "Supervisor",
             "message": "Personalized outreach emails have been generated successfully.",
-            "updated_state": {{
-                "information_list": [<updated information_list attributes with the values>]
-            }}
+            "lead_patches": [
+                {{"lead_id": "<lead_id>", "set": {{"personalized_email_subject": "...", "personalized_email_body": "..."}}}}
+            ]
             }}
             """
 
         try:
             # Call the LLM with the prepared messages and prompt
-            response = await azure_model.ainvoke(messages + [HumanMessage(content=prompt)])
+            response = await ainvoke_with_retry(
+                azure_model, context_messages(messages, state.get("long_term_summary")) + [HumanMessage(content=prompt)])
 
-            # Default fallback for updated information_list
-            updated_info_list = information_list
+            # Only the two email fields may change; everything else stays as the other agents left it
+            patches = patches_from_agent_output(
+                response.content, leads_from_state(information_list), fields=set(EMAIL_FIELDS.values()))
+            if not patches:
+                print("Error parsing lead_patches from model output")
 
-            try:
-                # Extract JSON from response and parse
-                content = extract_json(response.content)
-                parsed = json.loads(content)
-                next_agent = parsed.get("next_agent", "Supervisor")
-                assistant_msg = parsed.get("message", "")
-                updated_info_list = parsed.get("updated_state", {}).get(
-                    "information_list", information_list)
-            except Exception as e:
-                print(f"Error parsing updated_state from model output: {e}")
-
-            # Keep last AI message in the message history
+            # Keep last AI message in the message history; compact_context folds older messages into the summary
             last_response = AIMessage(content=response.content)
             updated_messages = messages + [last_response]
-            updated_messages = updated_messages[-10:]  # keep only the last 10 messages for context
 
             # Return the updated workflow state
             return {
                 "subgraph_messages": updated_messages,
-                "next_agent": next_agent,
-                "information_list": updated_info_list
+                "next_agent": "supervisor",
+                "information_list": patches
             }
 
         except Exception as e:
@@ -102,8 +219,7 @@ def email_generator() -> RunnableLambda:
             # Return fallback state in case of failure
             return {
                 "subgraph_messages": messages,
-                "next_agent": "supervisor",
-                "information_list": state.get("information_list", [])
+                "next_agent": "supervisor"
             }
 
     # Return a RunnableLambda wrapping the async agent function
@@ -0,0 +1,266 @@
+import difflib
+import os
+import re
+import time
+
+# Playwright accessibility snapshots are compressed before they reach the agents' message history
+SNAPSHOT_COMPRESSION = os.getenv("SNAPSHOT_COMPRESSION", "true").lower() in ("1", "true", "yes")
+# Siblings of one role kept before the rest are summarized (Apollo shows 25 results per page)
+SNAPSHOT_MAX_LIST_ITEMS = int(os.getenv("SNAPSHOT_MAX_LIST_ITEMS", "30"))
+# Longest name or text kept for a single node
+SNAPSHOT_MAX_TEXT = int(os.getenv("SNAPSHOT_MAX_TEXT", "160"))
+# Hard cap on one compressed snapshot
+SNAPSHOT_MAX_CHARS = int(os.getenv("SNAPSHOT_MAX_CHARS", "40000"))
+# Send only the changed lines when the same page is snapshotted again, unless the diff is this large
+SNAPSHOT_DIFF = os.getenv("SNAPSHOT_DIFF", "true").lower() in ("1", "true", "yes")
+SNAPSHOT_DIFF_MAX_RATIO = float(os.getenv("SNAPSHOT_DIFF_MAX_RATIO", "0.5"))
+
+# Layout wrappers without a name or text; their children are kept one level up
+UNWRAP_ROLES = {"generic", "group", "none", "presentation", "section", "div"}
+# Nodes dropped with their subtree
+PRUNE_ROLES = {"separator"}
+# Nodes the agent can act on, kept even without a name
+INTERACTIVE_ROLES = {
+    "button", "link", "checkbox", "radio", "textbox", "combobox", "searchbox", "option", "menuitem",
+    "menuitemcheckbox", "tab", "switch", "slider", "spinbutton", "listbox",
+}
+# Attributes that only describe presentation
+NOISE_ATTRIBUTES = {"[cursor=pointer]"}
+# Roles whose name only repeats the text of their children (a table row's name is all of its cells)
+REDUNDANT_NAME_ROLES = {"row"}
+
+_YAML_BLOCK = re.compile(r"```yaml\n(.*?)\n?```", re.DOTALL)
+_PAGE_URL = re.compile(r"^- Page URL: (\S+)", re.MULTILINE)
+_NODE = re.compile(
+    r'^(?P<role>[^\s":\[]+)'
+    r'(?: "(?P<name>(?:[^"\\]|\\.)*)")?'
+    r'(?P<attrs>(?: \[[^\]]*\])*)'
+    r'(?P<colon>:)?'
+    r'(?: (?P<value>.*))?$'
+)
+
+
+class SnapshotNode:
+    """One line of a Playwright aria snapshot and the lines nested under it."""
+
+    __slots__ = ("role", "name", "attrs", "colon", "value", "raw", "children")
+
+    def __init__(self, text: str):
+        match = _NODE.match(text)
+        self.children = []
+        self.raw = None if match else text
+        if match:
+            self.role = match.group("role")
+            self.name = match.group("name")
+            self.attrs = [attr for attr in re.findall(r" \[[^\]]*\]", match.group("attrs")) if attr.strip() not in NOISE_ATTRIBUTES]
+            self.colon = bool(match.group("colon"))
+            self.value = match.group("value")
+        else:
+            self.role, self.name, self.attrs, self.colon, self.value = "", None, [], False, None
+
+    def render(self, max_text: int, has_children: bool) -> str:
+        if self.raw is not None:
+            return _truncate(self.raw, max_text)
+        name = f' "{_truncate(self.name, max_text)}"' if self.name is not None else ""
+        value = f" {_truncate(self.value, max_text)}" if self.value else ""
+        colon = ":" if self.colon and (value or has_children) else ""
+        return f"{self.role}{name}{''.join(self.attrs)}{colon}{value}"
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def parse_snapshot(yaml_text: str) -> list:
+    """Parses the YAML list of an aria snapshot into a tree of SnapshotNodes."""
+    roots = []
+    stack = []  # (indent, node)
+    for line in yaml_text.splitlines():
+        stripped = line.lstrip(" ")
+        if not stripped:
+            continue
+        indent = len(line) - len(stripped)
+        node = SnapshotNode(stripped[2:] if stripped.startswith("- ") else stripped)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        (stack[-1][1].children if stack else roots).append(node)
+        stack.append((indent, node))
+    return roots
+
+
+class SnapshotLimits:
+    """How aggressively snapshots are compressed; defaults come from the SNAPSHOT_* settings."""
+
+    def __init__(self, max_list_items: int = SNAPSHOT_MAX_LIST_ITEMS, max_text: int = SNAPSHOT_MAX_TEXT,
+                 max_chars: int = SNAPSHOT_MAX_CHARS):
+        self.max_list_items = max_list_items
+        self.max_text = max_text
+        self.max_chars = max_chars
+
+
+def _keep(nodes: list, parent_name: str = None) -> list:
+    """Drops pruned, empty and repeated nodes and hoists the children of anonymous wrappers."""
+    kept = []
+    for node in nodes:
+        if node.role in PRUNE_ROLES:
+            continue
+        if node.role in REDUNDANT_NAME_ROLES and node.children:
+            node.name = None
+        text = node.value if node.name is None else node.name if not node.value else None
+        if text and not node.children and node.role not in INTERACTIVE_ROLES and (
+                text == parent_name or (kept and text == kept[-1].name)):
+            continue  # e.g. `cell "Owner"` holding `generic: Owner`, a checkbox's label or a logo named like its cell
+        anonymous = node.name is None and not node.value and node.raw is None
+        if anonymous and node.role in UNWRAP_ROLES:
+            kept.extend(_keep(node.children, parent_name))
+            continue
+        if anonymous and not node.children and node.role not in INTERACTIVE_ROLES:
+            continue  # e.g. an unnamed img
+        kept.append(node)
+    return kept
+
+
+def _render(nodes: list, depth: int, limits: SnapshotLimits, lines: list):
+    """Appends the lines of already filtered `nodes`, cutting long runs of siblings with the same role."""
+    seen = {}
+    for node in nodes:
+        seen[node.role] = seen.get(node.role, 0) + 1
+        if seen[node.role] > limits.max_list_items:
+            if seen[node.role] == limits.max_list_items + 1:
+                omitted = sum(1 for other in nodes if other.role == node.role) - limits.max_list_items
+                lines.append(f"{'  ' * depth}- text: … {omitted} more {node.role} items not shown")
+            continue
+        children = _keep(node.children, node.name)
+        lines.append(f"{'  ' * depth}- {node.render(limits.max_text, bool(children))}")
+        _render(children, depth + 1, limits, lines)
+
+
+def compress_snapshot(yaml_text: str, limits: SnapshotLimits = None) -> list:
+    """Returns the compressed snapshot as a list of YAML lines."""
+    limits = limits or SnapshotLimits()
+    lines = []
+    _render(_keep(parse_snapshot(yaml_text)), 0, limits, lines)
+    size = 0
+    for index, line in enumerate(lines):
+        size += len(line) + 1
+        if size > limits.max_chars:
+            return lines[:index] + [f"- text: … snapshot cut at {limits.max_chars} characters, {len(lines) - index} lines not shown"]
+    return lines
+
+
+def snapshot_diff(before: list, after: list) -> list:
+    """Changed lines between two compressed snapshots, with one line of context, in unified diff style."""
+    diff = []
+    for line in difflib.unified_diff(before, after, n=1, lineterm=""):
+        if line.startswith(("---", "+++")):
+            continue
+        diff.append("..." if line.startswith("@@") else line)
+    return diff
+
+
+class SnapshotStats:
+    """Size of the snapshots before and after compression, shared by every session of a pool."""
+
+    def __init__(self):
+        self.snapshots = 0
+        self.full = 0
+        self.diffs = 0
+        self.unchanged = 0
+        self.chars_in = 0
+        self.chars_out = 0
+        self.seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "snapshots": self.snapshots,
+            "full": self.full,
+            "diffs": self.diffs,
+            "unchanged": self.unchanged,
+            "chars_in": self.chars_in,
+            "chars_out": self.chars_out,
+            # Rough count at ~4 characters per token
+            "estimated_tokens_saved": (self.chars_in - self.chars_out) // 4,
+            "ratio": round(self.chars_out / self.chars_in, 3) if self.chars_in else None,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+class SnapshotCompressor:
+    """
+    MCP tool interceptor that shrinks the page snapshots returned by the
+    Playwright tools before they enter an agent's message history.
+
+    Layout-only wrappers and empty nodes are dropped, long texts and long runs
+    of sibling items are cut, and a repeat snapshot of a page the agent has
+    already seen in full is sent as a diff against that snapshot. Each browser
+    session has its own compressor; call `start_conversation()` whenever a
+    new agent conversation starts on the session, since a diff is only useful
+    while the full snapshot it refers to is still in the agent's context.
+    """
+
+    def __init__(self, stats: SnapshotStats = None, limits: SnapshotLimits = None, enabled: bool = SNAPSHOT_COMPRESSION,
+                 diff: bool = SNAPSHOT_DIFF, diff_max_ratio: float = SNAPSHOT_DIFF_MAX_RATIO):
+        self.stats = stats or SnapshotStats()
+        self.limits = limits or SnapshotLimits()
+        self.enabled = enabled
+        self.diff = diff
+        self.diff_max_ratio = diff_max_ratio
+        self._baselines = {}  # Page URL -> lines of the last full snapshot sent for it
+        self._latest = {}     # Page URL -> lines of the last snapshot, full or diffed
+
+    def start_conversation(self):
+        """Forgets the snapshots sent so far, so the next one of every page is sent in full."""
+        self._baselines.clear()
+        self._latest.clear()
+
+    def compress_text(self, text: str) -> str:
+        """Compresses every snapshot block in one tool result text."""
+        match = _PAGE_URL.search(text)
+        page = match.group(1) if match else ""
+
+        def replace(block):
+            started = time.perf_counter()
+            lines = compress_snapshot(block.group(1), self.limits)
+            full = "```yaml\n" + "\n".join(lines) + "\n```"
+            baseline = self._baselines.get(page) if self.diff else None
+            output = full
+            if baseline is not None and self._latest.get(page) == lines:
+                output = "(unchanged since the previous snapshot of this page)"
+                self.stats.unchanged += 1
+            elif baseline is not None:
+                diff = snapshot_diff(baseline, lines)
+                candidate = (
+                    "(only the lines that changed since the last full snapshot of this page; the rest is as shown there)\n"
+                    "```diff\n" + "\n".join(diff) + "\n```"
+                )
+                if len(candidate) <= len(full) * self.diff_max_ratio:
+                    output = candidate
+                    self.stats.diffs += 1
+            if output is full:
+                self._baselines[page] = lines
+                self.stats.full += 1
+            self._latest[page] = lines
+            self.stats.snapshots += 1
+            self.stats.chars_in += len(block.group(0))
+            self.stats.chars_out += len(output)
+            self.stats.seconds += time.perf_counter() - started
+            return output
+
+        return _YAML_BLOCK.sub(replace, text)
+
+    async def __call__(self, request, handler):
+        result = await handler(request)
+        content = getattr(result, "content", None)
+        if not self.enabled or getattr(result, "isError", False) or not isinstance(content, list):
+            return result
+        try:
+            parts = []
+            for part in content:
+                text = getattr(part, "text", None)
+                if text and "```yaml" in text:
+                    part = part.model_copy(update={"text": self.compress_text(text)})
+                parts.append(part)
+            return result.model_copy(update={"content": parts})
+        except Exception as e:
+            print(f"Error compressing {request.name} snapshot, passing it through: {e}")
+            return result
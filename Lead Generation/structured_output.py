@@ -0,0 +1,277 @@
+import json
+import os
+import time
+
+# Read supervisor and email answers while they stream instead of after the whole completion
+STRUCTURED_STREAMING = os.getenv("STRUCTURED_STREAMING", "true").lower() in ("1", "true", "yes")
+# Ask again through the model's native structured output (function calling) when an answer has no valid JSON
+STRUCTURED_NATIVE_FALLBACK = os.getenv("STRUCTURED_NATIVE_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float),
+    "null": type(None),
+}
+
+
+def schema_errors(value, schema: dict, path: str = "$") -> list:
+    """
+    Checks `value` against the subset of JSON Schema the node schemas use
+    (type, enum, minLength, required, properties, items) and returns the
+    problems found; an empty list means the value is valid.
+    """
+    if not schema:
+        return []
+    expected = schema.get("type")
+    if expected and not (isinstance(value, _TYPES[expected]) and not (expected in ("integer", "number") and isinstance(value, bool))):
+        return [f"{path} should be {expected}, got {type(value).__name__}"]
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path} should be one of {schema['enum']}, got {value!r}")
+    if isinstance(value, str) and len(value.strip()) < schema.get("minLength", 0):
+        errors.append(f"{path} is empty")
+    if isinstance(value, dict):
+        for field in schema.get("required", []):
+            if field not in value:
+                errors.append(f"{path}.{field} is missing")
+        for field, field_schema in schema.get("properties", {}).items():
+            if field in value:
+                errors.extend(schema_errors(value[field], field_schema, f"{path}.{field}"))
+    if isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            errors.extend(schema_errors(item, schema["items"], f"{path}[{index}]"))
+    return errors
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for the first valid JSON object in a model's answer.
+
+    Text is fed chunk by chunk as it streams in. `feed` returns the top-level
+    fields of the object that were completed by that chunk, so a caller can
+    act on e.g. `next_agent` before the rest of the answer has arrived.
+    Prose, code fences and braces inside strings are skipped; an object that
+    does not parse or does not match `schema` is dropped and scanning goes
+    on with the next one, so an example or draft object before the real
+    answer does no harm.
+    """
+
+    def __init__(self, schema: dict = None):
+        self.schema = schema
+        self.text = ""
+        self.fields = {}
+        self.result = None
+        self.result_text = None
+        self.rejected = []  # Why earlier objects were not accepted
+        self._pos = 0
+        self._reset()
+
+    def _reset(self):
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self.fields = {}
+        self.invalid = []  # Schema problems of fields of the object being parsed
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def _field_schema(self, key: str) -> dict:
+        return ((self.schema or {}).get("properties") or {}).get(key)
+
+    def _finish_value(self, end: int, completed: list):
+        if self._key is None or self._value_start is None:
+            return
+        try:
+            value = json.loads(self.text[self._value_start:end])
+        except ValueError:
+            value = None
+        else:
+            errors = schema_errors(value, self._field_schema(self._key) or {}, f"$.{self._key}")
+            if errors:
+                self.invalid.extend(errors)
+            else:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> list:
+        """Adds streamed text; returns the (field, value) pairs completed by it."""
+        completed = []
+        self.text += chunk or ""
+        text = self.text
+        i = self._pos
+        while i < len(text) and not self.done:
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        try:
+                            self._key = json.loads(text[self._key_start:i + 1])
+                        except ValueError:
+                            self._key = None
+                        self._key_start = None
+            elif self._start is None:
+                if char == "{":
+                    self._start, self._depth = i, 1
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = i
+                elif self._depth == 1 and self._value_start is None:
+                    self._value_start = i
+            elif char in "{[":
+                if self._depth == 1 and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(i, completed)
+                    self._close_object(i)
+            elif self._depth == 1:
+                if char == ",":
+                    self._finish_value(i, completed)
+                elif char not in " \t\r\n:" and self._key is not None and self._value_start is None:
+                    self._value_start = i  # number, true, false or null
+            i += 1
+        self._pos = i
+        return completed
+
+    def _close_object(self, end: int):
+        try:
+            parsed = json.loads(self.text[self._start:end + 1])
+            errors = schema_errors(parsed, self.schema) if self.schema else ([] if isinstance(parsed, dict) else ["not an object"])
+        except ValueError as e:
+            parsed, errors = None, [str(e)]
+        if errors:
+            self.rejected.append("; ".join(errors))
+            self._reset()
+        else:
+            self.result = parsed
+            self.result_text = self.text[self._start:end + 1]
+
+
+def first_json_object(text: str, schema: dict = None):
+    """The first JSON object in `text` that parses (and matches `schema`), or None."""
+    parser = JSONStreamParser(schema)
+    parser.feed(text or "")
+    return parser.result
+
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content or "")
+
+
+def supports_native_structured_output(model) -> bool:
+    """True when the model (under any cache wrapper) implements tool calling, which with_structured_output needs."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from llm_cache import CachedChatModel
+
+    if isinstance(model, CachedChatModel):
+        model = model.model
+    bind_tools = getattr(type(model), "bind_tools", None)
+    return isinstance(model, BaseChatModel) and bind_tools is not None and bind_tools is not BaseChatModel.bind_tools
+
+
+class StructuredAnswer:
+    """A parsed answer: the object (or the fields read before an early stop) and how it was obtained."""
+
+    def __init__(self, value: dict, text: str, via: str, first_field_seconds: float = None, seconds: float = 0.0):
+        self.value = value
+        self.text = text
+        self.via = via  # "stream", "early_stop", "completion" or "native"
+        self.first_field_seconds = first_field_seconds
+        self.seconds = seconds
+
+
+async def astream_structured(model, input, schema: dict, on_field=None, stop_after=None,
+                             streaming: bool = STRUCTURED_STREAMING,
+                             native_fallback: bool = STRUCTURED_NATIVE_FALLBACK) -> StructuredAnswer:
+    """
+    Calls `model` and returns its answer parsed into an object matching `schema`.
+
+    The answer is streamed through a JSONStreamParser: `on_field(name, value)`
+    is called for every top-level field as soon as it is complete, and the
+    stream is closed once the object is complete, without waiting for any
+    prose the model adds after it. `stop_after(name, value)` may end the
+    stream even earlier, once the fields read so far are all the caller
+    needs; the answer then holds just those fields. A field that breaks the
+    schema (e.g. an unknown route) ends the stream at once.
+
+    When the answer holds no valid object and the model supports native
+    structured output, the request is repeated through
+    `with_structured_output(schema)`. Raises ValueError if that is not
+    possible or fails as well.
+    """
+    started = time.perf_counter()
+    parser = JSONStreamParser(schema)
+    first_field_seconds = None
+    invalid = None
+    if streaming:
+        stream = model.astream(input)
+        try:
+            async for chunk in stream:
+                for name, value in parser.feed(_chunk_text(chunk)):
+                    if first_field_seconds is None:
+                        first_field_seconds = time.perf_counter() - started
+                    if on_field is not None:
+                        on_field(name, value)
+                    if stop_after is not None and stop_after(name, value):
+                        return StructuredAnswer(dict(parser.fields), parser.text, "early_stop", first_field_seconds,
+                                                time.perf_counter() - started)
+                if parser.done:
+                    break
+                if parser.invalid:
+                    # e.g. a next_agent outside the allowed routes: no need to read the rest
+                    invalid = list(parser.invalid)
+                    break
+        finally:
+            await stream.aclose()
+        via = "stream"
+    else:
+        response = await model.ainvoke(input)
+        parser.feed(_chunk_text(response))
+        via = "completion"
+
+    if parser.done:
+        if on_field is not None and not streaming:
+            for name, value in parser.result.items():
+                on_field(name, value)
+        return StructuredAnswer(parser.result, parser.text, via, first_field_seconds, time.perf_counter() - started)
+
+    problem = "; ".join(invalid or parser.rejected) or "no JSON object in the answer"
+    if native_fallback and supports_native_structured_output(model):
+        print(f"Structured output: {problem}; asking again with native structured output")
+        try:
+            value = await model.with_structured_output(schema).ainvoke(input)
+        except Exception as e:
+            raise ValueError(f"{problem}; native structured output failed: {e}") from e
+        errors = schema_errors(value, schema) if value is not None else ["no answer"]
+        if not errors:
+            if on_field is not None:
+                for name, field_value in value.items():
+                    on_field(name, field_value)
+            return StructuredAnswer(value, parser.text, "native", None, time.perf_counter() - started)
+        problem = f"{problem}; native structured output: {'; '.join(errors)}"
+    raise ValueError(f"Unusable model answer ({problem}): {parser.text[:200]!r}")
@@ -0,0 +1,101 @@
+import json
+from lead_utils import lead_value, leads_from_state
+from research_stage import leads_pending_research
+from roleFunctions import needs_email
+
+
+class SupervisorStats:
+    """Counts how the Supervisor made each routing decision during a run."""
+
+    def __init__(self):
+        self.rule_decisions = 0
+        self.llm_calls = 0
+        self.decisions = {}
+        self.route_seconds = []   # Time until next_agent was parsed from each streamed answer
+        self.answer_seconds = []  # Time until each answer was complete or cut short
+        self.answers = {}         # How the answers were read: stream, early_stop, completion or native
+
+    def record(self, next_agent: str, by_rule: bool, answer=None):
+        if by_rule:
+            self.rule_decisions += 1
+        else:
+            self.llm_calls += 1
+        self.decisions[next_agent] = self.decisions.get(next_agent, 0) + 1
+        if answer is not None:
+            if answer.first_field_seconds is not None:
+                self.route_seconds.append(answer.first_field_seconds)
+            self.answer_seconds.append(answer.seconds)
+            self.answers[answer.via] = self.answers.get(answer.via, 0) + 1
+
+    def stats(self) -> dict:
+        def mean(values):
+            return round(sum(values) / len(values), 3) if values else None
+
+        return {"rule_decisions": self.rule_decisions, "llm_calls": self.llm_calls, "decisions": dict(self.decisions),
+                "answers": dict(self.answers), "mean_route_seconds": mean(self.route_seconds),
+                "mean_answer_seconds": mean(self.answer_seconds)}
+
+    def summary(self) -> str:
+        total = self.rule_decisions + self.llm_calls
+        return (
+            f"Supervisor: {total} decisions, {self.rule_decisions} made by rules "
+            f"({self.llm_calls} LLM calls, {self.rule_decisions} avoided) {self.decisions}"
+        )
+
+
+def progress_fingerprint(information_list) -> str:
+    """Summarizes how far each lead has got, to detect an agent that made no progress."""
+    stages = []
+    for lead in leads_from_state(information_list):
+        stages.append((
+            bool(lead_value(lead, "email")),
+            bool(lead_value(lead, "company details")),
+            bool(lead.get("website_inaccessible") or lead.get("security_error")),
+            bool(lead_value(lead, "personalized email body")),
+        ))
+    return json.dumps(stages)
+
+
+def rule_based_route(information_list):
+    """
+    Reads the next agent straight off `information_list`.
+
+    Returns (next_agent, reason) when the decision is unambiguous, or None when
+    it needs the LLM Supervisor, e.g. when only some leads were found.
+    """
+    leads = leads_from_state(information_list)
+    with_email = [lead for lead in leads if lead_value(lead, "email")]
+
+    if not with_email:
+        return "ApolloAgent", "no lead has an email yet"
+    if len(with_email) < len(leads):
+        # Partially filled lead list: whether to re-run Apollo is a judgement call
+        return None
+    if leads_pending_research(leads):
+        return "ResearchAgent", "some company websites have not been researched"
+    if any(needs_email(lead) for lead in leads):
+        return "EmailGenerator", "researched leads are missing their outreach emails"
+    return "end", "every lead is researched and has an outreach email"
+
+
+class SupervisorRules:
+    """
+    Deterministic fast path for the Supervisor. Falls back to the LLM when the
+    rules are unsure, or when they would send work back to an agent whose last
+    run left the leads unchanged (a re-run decision).
+    """
+
+    def __init__(self, stats: SupervisorStats = None):
+        self.stats = stats or SupervisorStats()
+        self._last_route = None
+        self._last_fingerprint = None
+
+    def route(self, information_list):
+        """Returns (next_agent, reason) or None to defer to the LLM."""
+        decision = rule_based_route(information_list)
+        fingerprint = progress_fingerprint(information_list)
+        if decision is not None and decision[0] == self._last_route and fingerprint == self._last_fingerprint:
+            decision = None
+        self._last_route = decision[0] if decision else None
+        self._last_fingerprint = fingerprint
+        return decision
@@ -0,0 +1,83 @@
+import asyncio
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from lead_index import BloomFilter, LeadIndex, dedup_node_factory
+from lead_utils import apply_lead_patches, empty_lead
+
+
+def lead(lead_id: str, email: str, website: str = "") -> dict:
+    return {**empty_lead(lead_id), "email": email, "company website link": website}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"email:owner{i}@company{i}.example" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"email:other{i}@elsewhere.example" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_filter_hit_is_confirmed_in_sqlite(tmp_path):
+    index = LeadIndex(str(tmp_path / "index.sqlite"), capacity=100, domains=False)
+    index.add(lead("lead-1", "ada@acme.example"), run_id="run-1")
+    # Simulate a false positive: the filter says yes, SQLite has no such row
+    index._filter.add("email:ghost@acme.example")
+
+    assert index.contains("email", "ghost@acme.example") is False
+    assert index.contains("email", "ada@acme.example") is True
+    assert index.contains("email", "bob@bolt.example") is False
+    assert index.stats()["lookups"] == 3
+    assert index.stats()["filter_skips"] == 1  # Only the unknown address was answered in memory
+
+
+def test_entries_of_the_current_run_are_not_duplicates(tmp_path):
+    index = LeadIndex(str(tmp_path / "index.sqlite"), capacity=100)
+    index.add(lead("lead-1", "ada@acme.example", "https://www.acme.example/about"), run_id="run-1")
+
+    assert index.duplicate_reason(lead("lead-2", "ada@acme.example"), exclude_run="run-1") is None
+    assert index.duplicate_reason(lead("lead-2", "bob@acme.example", "http://acme.example"), exclude_run="run-2") == "domain acme.example"
+
+
+def test_filter_is_rebuilt_when_full_and_reloaded_from_disk(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    index = LeadIndex(path, capacity=4, domains=False)
+    for i in range(10):
+        index.add(lead(f"lead-{i}", f"owner{i}@company{i}.example"), run_id="run-1")
+
+    assert index._filter.capacity >= 10
+    assert all(index.contains("email", f"owner{i}@company{i}.example") for i in range(10))
+    index.close()
+
+    reopened = LeadIndex(path, capacity=4, domains=False)
+    assert reopened._filter.capacity >= 20  # Sized for what is already stored
+    assert all(reopened.contains("email", f"owner{i}@company{i}.example") for i in range(10))
+    reopened.close()
+
+
+def test_dedup_rounds_survive_a_resume(tmp_path):
+    index = LeadIndex(str(tmp_path / "index.sqlite"), capacity=100, domains=False)
+    state = {"subgraph_messages": [], "information_list": [lead("lead-1", "ada@acme.example"),
+                                                           lead("lead-2", "ada@acme.example")]}
+
+    def step(state):
+        # A fresh node each time, as after resuming from a checkpoint: only the graph state carries over
+        update = asyncio.run(dedup_node_factory(index, run_id="run-1", max_rounds=1).ainvoke(state))
+        information_list = apply_lead_patches(state["information_list"], update.get("information_list"))
+        return {**state, **update, "information_list": information_list}
+
+    state = step(state)
+    assert state["next_agent"] == "ApolloAgent" and state["dedup_rounds"] == 1
+    assert state["dedup_accepted"] == {"lead-1": ["email:ada@acme.example"]}
+
+    # Apollo refilled the slot with the same person again; the round limit is already used up
+    state["information_list"] = apply_lead_patches(state["information_list"], [{"lead_id": "lead-2", "email": "ada@acme.example"}])
+    state = step(state)
+    assert state["next_agent"] == "supervisor"
+    assert [lead["lead_id"] for lead in state["information_list"]] == ["lead-1"]
+    index.close()
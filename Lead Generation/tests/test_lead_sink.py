@@ -0,0 +1,36 @@
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from lead_sink import EXCEL_COLUMNS, LeadSink
+from lead_utils import empty_lead
+
+
+def test_excel_export_keeps_unfinished_leads(tmp_path):
+    from openpyxl import load_workbook
+
+    complete = {**empty_lead("lead-1"), "name": "Ada Owner", "email": "ada@acme.example",
+                "company details": "Rugged PCs", "personalized email body": "Hi Ada"}
+    inaccessible = {**empty_lead("lead-2"), "name": "Bob Owner", "email": "bob@blocked.example",
+                    "company website link": "https://blocked.example", "website_inaccessible": True}
+    sink = LeadSink("run-1", output_dir=str(tmp_path), parquet=False)
+    assert [lead["lead_id"] for lead in sink.write_completed([complete, inaccessible])] == ["lead-1"]
+
+    path = sink.close(str(tmp_path / "leads.xlsx"), [complete, inaccessible])
+
+    assert path == str(tmp_path / "leads.xlsx")
+    rows = list(load_workbook(path).active.iter_rows(values_only=True))
+    assert list(rows[0]) == EXCEL_COLUMNS
+    by_id = {row[0]: dict(zip(EXCEL_COLUMNS, row)) for row in rows[1:]}
+    assert by_id["lead-1"]["status"] == "complete"
+    assert by_id["lead-2"]["status"] == "website inaccessible"
+    assert by_id["lead-2"]["email"] == "bob@blocked.example"
+    # Only completed leads are streamed
+    assert sink.written_ids == {"lead-1"}
+
+
+def test_close_without_excel_path_exports_nothing(tmp_path):
+    sink = LeadSink("run-2", output_dir=str(tmp_path), parquet=False)
+    assert sink.close(None, [empty_lead("lead-1")]) is None
+    assert not list(tmp_path.glob("*.xlsx"))
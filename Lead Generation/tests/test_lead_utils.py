@@ -0,0 +1,90 @@
+import json
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from lead_utils import apply_lead_patches, compact_leads, empty_lead, lead_patch, patches_from_answer
+
+
+def leads():
+    return [
+        {**empty_lead("lead-1"), "name": "Ada Owner", "email": "ada@acme.example", "company name": "Acme"},
+        empty_lead("lead-2"),
+    ]
+
+
+def test_patch_sets_fields_and_keeps_the_rest():
+    updated = apply_lead_patches(leads(), [lead_patch("lead-1", company_details="Rugged PCs", email="")])
+
+    assert updated[0]["company details"] == "Rugged PCs"  # snake_case alias mapped onto the field
+    assert updated[0]["email"] == "ada@acme.example"      # a blank value never clears data
+    assert updated[1] == empty_lead("lead-2")
+
+
+def test_patch_drops_unknown_leads_and_fields():
+    current = leads()
+    updated = apply_lead_patches(current, [lead_patch("lead-9", name="Nobody"), lead_patch("lead-1", favourite_color="red")])
+
+    assert updated == current
+    assert "favourite_color" not in updated[0]
+
+
+def test_flags_are_stored_as_booleans():
+    updated = apply_lead_patches(leads(), [lead_patch("lead-1", website_inaccessible="yes")])
+
+    assert updated[0]["website_inaccessible"] is True
+
+
+def test_remove_and_insert():
+    updated = apply_lead_patches(leads(), [
+        {"lead_id": "lead-2", "remove": True},
+        {"lead_id": "lead-9", "remove": True},  # Unknown: nothing to remove
+        {"lead_id": "lead-3", "full_name": "Bob Owner", "email": "bob@bolt.example"},
+        {"lead_id": "lead-1", "name": "Ada Replaced"},
+    ])
+
+    assert [lead["lead_id"] for lead in updated] == ["lead-1", "lead-3"]
+    assert updated[1]["name"] == "Bob Owner"
+    # A whole record replaces the lead with its id
+    assert updated[0]["name"] == "Ada Replaced" and updated[0]["email"] == ""
+
+
+def test_reducer_does_not_mutate_its_input():
+    current = leads()
+    apply_lead_patches(current, [lead_patch("lead-1", name="Changed"), {"lead_id": "lead-2", "remove": True}])
+
+    assert current == leads()
+
+
+def test_lead_patches_answer_is_restricted_to_fields():
+    answer = {"lead_patches": [
+        {"lead_id": "lead-1", "set": {"personalized_email_body": "Hi Ada", "email": "evil@example.com"}},
+        "not a patch",
+    ]}
+
+    patches = patches_from_answer(answer, leads(), fields={"personalized email body"})
+
+    assert patches == [lead_patch("lead-1", personalized_email_body="Hi Ada")]
+
+
+def test_updated_state_records_map_by_id_identity_then_open_slot():
+    answer = {"updated_state": {"information_list": [
+        {"lead_id": "made-up", "email": "ada@acme.example", "company_type": "Reseller"},  # Identity of lead-1
+        {"lead_id": "also-made-up", "name": "Bob Owner", "email": "bob@bolt.example"},    # Next lead without email
+        {"lead_id": "extra", "name": "Carol Owner", "email": "carol@c.example"},          # No slot left
+    ]}}
+
+    patches = patches_from_answer(answer, leads())
+
+    assert [patch["lead_id"] for patch in patches] == ["lead-1", "lead-2"]
+    assert patches[0]["set"]["company type"] == "Reseller"
+    assert patches[1]["set"]["name"] == "Bob Owner"
+    assert patches_from_answer(["not", "an", "object"], leads()) == []
+
+
+def test_compact_leads_keeps_only_filled_fields():
+    compact = json.loads(compact_leads(apply_lead_patches(leads(), [lead_patch("lead-1", security_error=False)])))
+
+    assert compact == [{"lead_id": "lead-1", "name": "Ada Owner", "email": "ada@acme.example", "company name": "Acme"},
+                       {"lead_id": "lead-2"}]
@@ -0,0 +1,62 @@
+import pathlib
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import research_cache
+from research_cache import ResearchCache
+
+RESEARCHED = {"company details": "Rugged PCs", "company type": "Reseller",
+              "website_inaccessible": False, "security_error": False}
+BLOCKED = {"company details": "", "website_inaccessible": False, "security_error": True}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(research_cache, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_hit_by_domain_and_miss(tmp_path, clock):
+    cache = ResearchCache(str(tmp_path / "cache.sqlite"))
+    cache.put("https://www.Acme.example/about", RESEARCHED)
+
+    assert cache.get("http://acme.example") == RESEARCHED
+    assert cache.get("https://bolt.example") is None
+    assert cache.get("") is None
+    assert cache.stats() == {"hits": 1, "misses": 2}
+    cache.close()
+
+
+def test_entries_expire_after_their_ttl(tmp_path, clock):
+    cache = ResearchCache(str(tmp_path / "cache.sqlite"), ttl_seconds=100, failure_ttl_seconds=10)
+    cache.put("https://acme.example", RESEARCHED)
+    cache.put("https://blocked.example", BLOCKED)
+
+    clock[0] += 11  # Failures are kept for a shorter time
+    assert cache.get("https://blocked.example") is None
+    assert cache.get("https://acme.example") == RESEARCHED
+
+    clock[0] += 90
+    assert cache.get("https://acme.example") is None
+    cache.close()
+
+
+def test_least_recently_used_domains_are_evicted(tmp_path, clock):
+    cache = ResearchCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("https://a.example", RESEARCHED)
+    clock[0] += 1
+    cache.put("https://b.example", RESEARCHED)
+    clock[0] += 1
+    assert cache.get("https://a.example") is not None  # a is now more recently used than b
+    clock[0] += 1
+    cache.put("https://c.example", RESEARCHED)
+
+    assert cache.get("https://b.example") is None
+    assert cache.get("https://a.example") is not None
+    assert cache.get("https://c.example") is not None
+    cache.close()
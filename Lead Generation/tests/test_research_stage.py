@@ -0,0 +1,26 @@
+import asyncio
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from lead_utils import apply_lead_patches, empty_lead
+from research_stage import leads_pending_research, research_merge_node
+
+
+def test_leads_left_pending_are_given_up_after_max_attempts():
+    lead = {**empty_lead("lead-1"), "email": "ada@acme.example", "company website link": "https://acme.example"}
+    state = {"subgraph_messages": [], "information_list": [lead]}
+    merge = research_merge_node(max_attempts=3)
+
+    for attempt in range(1, 4):
+        # Each pass the research branch came back empty, so the lead is still pending
+        assert leads_pending_research(state["information_list"])
+        update = asyncio.run(merge.ainvoke(state))
+        assert update["research_attempts"] == {"lead-1": attempt}
+        state = {**state, "research_attempts": update["research_attempts"],
+                 "information_list": apply_lead_patches(state["information_list"], update.get("information_list"))}
+
+    assert not leads_pending_research(state["information_list"])
+    assert state["information_list"][0]["website_inaccessible"] is True
+    assert "1 given up after 3 attempts" in update["subgraph_messages"][-1].content
@@ -0,0 +1,68 @@
+import asyncio
+import pathlib
+import sys
+import types
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import mcp_utils
+
+
+class FakeMCPClients:
+    """Stands in for MultiServerMCPClient; opening a session takes a moment, like a real browser."""
+
+    def __init__(self):
+        self.sessions_opened = 0
+        self.tool_lists = 0
+
+    @asynccontextmanager
+    async def session(self, server_name):
+        await asyncio.sleep(0.01)
+        self.sessions_opened += 1
+        yield types.SimpleNamespace(list_tools=self._list_tools)
+
+    async def _list_tools(self):
+        self.tool_lists += 1
+        await asyncio.sleep(0.01)
+        return types.SimpleNamespace(tools=[])
+
+
+def test_concurrent_get_session_pool_opens_the_pool_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # No saved browser storage state to restore
+    clients = FakeMCPClients()
+
+    async def run():
+        try:
+            pools = await asyncio.gather(*(mcp_utils.get_session_pool(clients, size=3) for _ in range(4)))
+            return pools, [slot.index for slot in pools[0].slots]
+        finally:
+            await mcp_utils.close_session_pools()
+
+    pools, indices = asyncio.run(run())
+
+    assert all(pool is pools[0] for pool in pools)
+    assert indices == [0, 1, 2]
+    assert clients.sessions_opened == 3
+    assert clients.tool_lists == 1
+
+
+def test_untagged_lease_does_not_take_a_slot_another_agent_owns():
+    pool = mcp_utils.PlaywrightSessionPool(None, size=2)
+    pool.slots = [mcp_utils.SessionSlot(index, None, []) for index in range(2)]
+    apollo, other = pool.slots
+
+    assert pool._pick("ApolloAgent") is apollo
+    pool._busy.add(other.index)
+    # The only idle slot is Apollo's signed-in browser: wait for the untagged one instead
+    assert pool._pick(None) is None
+    pool._busy.discard(other.index)
+    assert pool._pick(None) is other
+
+
+def test_single_slot_pool_is_shared():
+    pool = mcp_utils.PlaywrightSessionPool(None, size=1)
+    pool.slots = [mcp_utils.SessionSlot(0, None, [])]
+
+    assert pool._pick("ApolloAgent") is pool.slots[0]
+    assert pool._pick(None) is pool.slots[0]
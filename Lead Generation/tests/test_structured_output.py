@@ -0,0 +1,84 @@
+import json
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from structured_output import JSONStreamParser, first_json_object, schema_errors
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "next_agent": {"type": "string", "enum": ["ApolloAgent", "ResearchAgent", "EmailGenerator", "end"]},
+        "message": {"type": "string"},
+        "lead_patches": {"type": "array", "items": {"type": "object"}},
+    },
+    "required": ["next_agent"],
+}
+
+DECISION = {"next_agent": "ResearchAgent", "message": "Research the {new} leads",
+            "lead_patches": [{"lead_id": "lead-1", "set": {"company_name": "Acme {Rugged} \"Systems\""}}]}
+
+
+def parse(text: str, chunk_size: int = None):
+    parser = JSONStreamParser(SCHEMA)
+    step = chunk_size or len(text) or 1
+    fields = [field for start in range(0, len(text), step) for field in parser.feed(text[start:start + step])]
+    return parser, fields
+
+
+def test_object_inside_prose_and_code_fence():
+    text = "Here is my decision:\n```json\n" + json.dumps(DECISION, indent=2) + "\n```\nLet me know!"
+
+    parser, _ = parse(text)
+
+    assert parser.result == DECISION
+    assert json.loads(parser.result_text) == DECISION
+
+
+def test_braces_and_escapes_inside_strings():
+    answer = {"next_agent": "end", "message": "} { \\\" ] ["}
+
+    assert first_json_object(json.dumps(answer), SCHEMA) == answer
+
+
+def test_streamed_one_character_at_a_time_matches_whole_text():
+    text = "Thinking... " + json.dumps(DECISION) + " and some trailing prose {not json}"
+
+    whole, _ = parse(text)
+    streamed, fields = parse(text, chunk_size=1)
+
+    assert streamed.result == whole.result == DECISION
+    # Top-level fields are reported as soon as each one is complete, in order
+    assert [name for name, _ in fields] == ["next_agent", "message", "lead_patches"]
+    assert dict(fields) == DECISION
+
+
+def test_example_object_before_the_answer_is_skipped():
+    text = 'Format: {"next_agent": "<ApolloAgent | end>"}\nAnswer: ' + json.dumps(DECISION)
+
+    parser, _ = parse(text)
+
+    assert parser.result == DECISION
+    assert len(parser.rejected) == 1
+
+
+def test_invalid_field_is_flagged_before_the_object_ends():
+    parser = JSONStreamParser(SCHEMA)
+    parser.feed('{"next_agent": "Planner", "message": "pl')
+
+    assert parser.invalid and not parser.done
+
+
+def test_unusable_answers_give_none():
+    assert first_json_object('{"next_agent": "ApolloAgent", "message": "find lea', SCHEMA) is None
+    assert first_json_object("I think we should research the leads next.", SCHEMA) is None
+    assert first_json_object('{"next_agent": "Planner"}', SCHEMA) is None
+
+
+def test_schema_errors():
+    assert schema_errors(DECISION, SCHEMA) == []
+    assert schema_errors({"message": "hi", "lead_patches": "none"}, SCHEMA) == [
+        "$.next_agent is missing", "$.lead_patches should be array, got str"]
+    assert schema_errors({"next_agent": True}, {"type": "object", "properties": {"next_agent": {"type": "integer"}}}) == [
+        "$.next_agent should be integer, got bool"]